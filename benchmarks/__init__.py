@@ -0,0 +1,46 @@
+"""
+Microbenchmarks of pymarsys' hot paths.
+
+Run them from the root of the repository with:
+    $ python -m benchmarks
+    $ python -m benchmarks --save before.json
+    $ python -m benchmarks --compare before.json
+
+End-to-end throughput against a local Emarsys stub server is measured with:
+    $ python -m benchmarks.loadtest --concurrency 1,8,32 --latency 0.05
+
+and import time with:
+    $ python -m benchmarks.import_time
+"""
+from contextlib import contextmanager
+import inspect
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """
+    Register a benchmark. The decorated function does the setup and returns
+    the callable which is actually timed. Benchmarks needing a teardown,
+    e.g. to remove HTTP mocks, are generators yielding the callable instead:
+    the code after the yield runs once the benchmark is done.
+    """
+    BENCHMARKS.append(func)
+    return func
+
+
+@contextmanager
+def prepared(func):
+    """
+    Set a benchmark up, and tear it down on exit.
+    :param func: Registered benchmark.
+    :return: Context manager giving the callable to time.
+    """
+    target = func()
+    if not inspect.isgenerator(target):
+        yield target
+        return
+    try:
+        yield next(target)
+    finally:
+        target.close()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+
+from . import BENCHMARKS, prepared
+from . import bench_connections, bench_contact, bench_json  # noqa: F401
+
+
+def run_benchmark(func, repeat):
+    """
+    Time a registered benchmark.
+    :return: Dictionary with the best and median time per call, in seconds.
+    """
+    with prepared(func) as target:
+        timer = timeit.Timer(target)
+        number, _ = timer.autorange()
+        timings = [t / number
+                   for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'best': min(timings),
+        'median': statistics.median(timings),
+        'loops': number,
+    }
+
+
+def format_time(seconds):
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * factor >= 1:
+            return '{:.2f} {}'.format(seconds * factor, unit)
+    return '{:.0f} ns'.format(seconds * 1e9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-k', dest='keyword', default='',
+                        help='only run benchmarks containing this keyword')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', help='write the results to a JSON file')
+    parser.add_argument('--compare',
+                        help='compare with results saved with --save')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)['results']
+
+    results = {}
+    for func in BENCHMARKS:
+        name = '{}.{}'.format(func.__module__.split('.')[-1], func.__name__)
+        if args.keyword not in name:
+            continue
+        result = run_benchmark(func, args.repeat)
+        results[name] = result
+
+        line = '{:<55} {:>12} (median {})'.format(
+            name,
+            format_time(result['best']),
+            format_time(result['median'])
+        )
+        if name in baseline:
+            line += '  x{:.2f}'.format(
+                baseline[name]['best'] / result['best']
+            )
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as fd:
+            json.dump(
+                {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'results': results,
+                },
+                fd,
+                indent=2,
+                sort_keys=True
+            )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import asyncio
+from urllib.parse import urljoin
+
+from aioresponses import aioresponses
+import responses
+
+from pymarsys.connections import AsyncConnection, SyncConnection
+
+from . import benchmark
+from .fixtures import (
+    EMARSYS_URI,
+    TEST_SECRET,
+    TEST_USERNAME,
+    PayloadConnection,
+    make_contacts,
+    make_update_response,
+)
+
+CONTACT_ENDPOINT = 'api/v2/contact/'
+
+
+@benchmark
+def build_authentication_variables():
+    return PayloadConnection().build_authentication_variables
+
+
+@benchmark
+def build_headers():
+    connection = PayloadConnection()
+    return lambda: connection.build_headers({'Accept': 'application/json'})
+
+
+@benchmark
+def sync_make_call_1000_contacts():
+    contacts = make_contacts(1000)
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as mock:
+        mock.add(
+            responses.PUT,
+            urljoin(EMARSYS_URI, CONTACT_ENDPOINT),
+            json=make_update_response(1000),
+            status=200,
+            content_type='application/json'
+        )
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI)
+        payload = {'key_id': 3, 'contacts': contacts}
+        yield lambda: connection.make_call('PUT', CONTACT_ENDPOINT,
+                                           payload=payload)
+        connection.close()
+
+
+@benchmark
+def async_make_call_1000_contacts():
+    contacts = make_contacts(1000)
+    payload = {'key_id': 3, 'contacts': contacts}
+    url = urljoin(EMARSYS_URI, CONTACT_ENDPOINT)
+    loop = asyncio.new_event_loop()
+
+    async def make_connection():
+        return AsyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI)
+
+    connection = loop.run_until_complete(make_connection())
+    try:
+        with aioresponses() as mock:
+            def run():
+                mock.put(url, status=200, payload=make_update_response(1000))
+                return loop.run_until_complete(
+                    connection.make_call('PUT', CONTACT_ENDPOINT,
+                                         payload=payload)
+                )
+            yield run
+    finally:
+        loop.run_until_complete(connection.close())
+        loop.close()
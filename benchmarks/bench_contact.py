@@ -0,0 +1,25 @@
+from pymarsys.contact import Contact
+
+from . import benchmark
+from .fixtures import PayloadConnection, make_contacts
+
+
+@benchmark
+def create():
+    contacts = Contact(PayloadConnection())
+    contact = make_contacts(1, width=20)[0]
+    return lambda: contacts.create(contact, key_id=3)
+
+
+@benchmark
+def create_many_1000_contacts():
+    contacts = Contact(PayloadConnection())
+    batch = make_contacts(1000)
+    return lambda: contacts.create_many(batch, key_id=3)
+
+
+@benchmark
+def update_many_1000_contacts():
+    contacts = Contact(PayloadConnection())
+    batch = make_contacts(1000)
+    return lambda: contacts.update_many(3, batch, upsert=True)
@@ -0,0 +1,34 @@
+import json
+
+from pymarsys.contact_batch import ContactBatch
+from pymarsys.encoding import encode_payload
+
+from . import benchmark
+from .fixtures import make_contacts, make_update_response
+
+
+@benchmark
+def encode_1000_contacts():
+    payload = {'key_id': 3, 'contacts': make_contacts(1000)}
+    return lambda: json.dumps(payload)
+
+
+@benchmark
+def encode_1000_wide_contacts():
+    payload = {'key_id': 3, 'contacts': make_contacts(1000, width=50)}
+    return lambda: json.dumps(payload)
+
+
+@benchmark
+def decode_10000_ids_response():
+    body = json.dumps(make_update_response(10000))
+    return lambda: json.loads(body)
+
+
+@benchmark
+def encode_1000_contacts_batch():
+    payload = {
+        'key_id': 3,
+        'contacts': ContactBatch.from_dicts(make_contacts(1000)),
+    }
+    return lambda: encode_payload(payload)
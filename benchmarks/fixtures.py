@@ -0,0 +1,41 @@
+from pymarsys.connections import BaseConnection
+
+TEST_USERNAME = 'bench_username'
+TEST_SECRET = 'bench_secret'
+EMARSYS_URI = 'https://api.emarsys.net/'
+
+
+class PayloadConnection(BaseConnection):
+    """
+    Connection which does not send anything and returns the payload it was
+    given, to time the work done by the endpoints alone.
+    """
+    def __init__(self, username=TEST_USERNAME, secret=TEST_SECRET,
+                 uri=EMARSYS_URI):
+        super().__init__(username, secret, uri)
+
+    def make_call(self, method, endpoint, headers=None, payload=None,
+                  params=None):
+        return payload
+
+
+def make_contacts(count, width=5):
+    """
+    Build a list of contacts with an email and `width` other text fields.
+    """
+    return [
+        dict(
+            {'3': 'squirrel{}@squirrelmail.com'.format(i)},
+            **{str(field): 'value {} {}'.format(i, field)
+               for field in range(100, 100 + width)}
+        )
+        for i in range(count)
+    ]
+
+
+def make_update_response(count):
+    return {
+        'data': {'ids': [str(589058827 + i) for i in range(count)]},
+        'replyCode': 0,
+        'replyText': 'OK',
+    }
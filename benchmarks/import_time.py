@@ -0,0 +1,86 @@
+"""
+Import-time benchmark of pymarsys, based on `python -X importtime`.
+
+Usage example:
+    $ python -m benchmarks.import_time --runs 10
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = (
+    ('import pymarsys', 'import pymarsys'),
+    ('sync connection',
+     'from pymarsys import SyncConnection; SyncConnection("u", "s")'),
+    ('async connection',
+     'import asyncio\n'
+     'from pymarsys import AsyncConnection\n'
+     'async def main():\n'
+     '    connection = AsyncConnection("u", "s")\n'
+     '    connection.transport.session\n'
+     '    await connection.close()\n'
+     'asyncio.get_event_loop().run_until_complete(main())'),
+)
+
+HEAVY_PACKAGES = ('aiohttp', 'requests', 'httpx', 'asyncio')
+
+LINE_PATTERN = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$'
+)
+
+
+def measure(statement):
+    """
+    Run a statement in a fresh interpreter with -X importtime.
+    :return: Total import time in microseconds, interpreter startup
+    included, and the set of imported top-level packages.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True
+    )
+    total = 0
+    packages = set()
+    for line in process.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_time, cumulative, indent, module = match.groups()
+        packages.add(module.split('.')[0])
+        if len(indent) == 1:
+            total += int(cumulative)
+    return total, packages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    startup = statistics.median(
+        measure('pass')[0] for _ in range(args.runs)
+    )
+    print('{:<20} {:>12} {:>12}  {}'.format(
+        'scenario', 'median ms', 'best ms', 'heavy packages imported'
+    ))
+    for name, statement in SCENARIOS:
+        totals = []
+        packages = set()
+        for _ in range(args.runs):
+            total, packages = measure(statement)
+            totals.append(total - startup)
+        print('{:<20} {:>12.1f} {:>12.1f}  {}'.format(
+            name,
+            statistics.median(totals) / 1000,
+            min(totals) / 1000,
+            ', '.join(sorted(packages.intersection(HEAVY_PACKAGES))) or '-'
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+End-to-end load test of SyncConnection and AsyncConnection against the local
+stub server, for several concurrency levels and batch sizes.
+
+Usage example:
+    $ python -m benchmarks.loadtest --contacts 50000 --batch-sizes 100,1000 \
+        --concurrency 1,8,32 --latency 0.05
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import resource
+import time
+import tracemalloc
+
+from pymarsys.connections import ApiCallError, AsyncConnection, SyncConnection
+
+from .fixtures import TEST_SECRET, TEST_USERNAME, make_contacts
+from .stub_server import StubConfig, StubServer
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * len(values))))
+    return values[index]
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Result:
+    def __init__(self, mode, concurrency, batch_size):
+        self.mode = mode
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.latencies = []
+        self.contacts = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.memory_peak = None
+
+    def record(self, started, size, failed):
+        self.latencies.append(time.perf_counter() - started)
+        if failed:
+            self.errors += 1
+        else:
+            self.contacts += size
+
+    def row(self):
+        return (
+            '{:<6} {:>5} {:>6} {:>12.0f} {:>9.1f} {:>9.1f} {:>7} {:>10}'
+            .format(
+                self.mode,
+                self.concurrency,
+                self.batch_size,
+                self.contacts / self.elapsed if self.elapsed else 0,
+                percentile(self.latencies, 50) * 1000,
+                percentile(self.latencies, 99) * 1000,
+                self.errors,
+                '-' if self.memory_peak is None
+                else '{:.1f}'.format(self.memory_peak / 1024 ** 2),
+            )
+        )
+
+
+HEADER = '{:<6} {:>5} {:>6} {:>12} {:>9} {:>9} {:>7} {:>10}'.format(
+    'mode', 'conc', 'batch', 'contacts/s', 'p50 ms', 'p99 ms', 'errors',
+    'peak MiB',
+)
+
+
+def run_sync(uri, contacts, batch_size, concurrency):
+    result = Result('sync', concurrency, batch_size)
+    connection = SyncConnection(TEST_USERNAME, TEST_SECRET, uri)
+
+    def send(batch):
+        started = time.perf_counter()
+        try:
+            connection.make_call(
+                'PUT',
+                'api/v2/contact/',
+                payload={'key_id': 3, 'contacts': batch}
+            )
+        except ApiCallError:
+            result.record(started, len(batch), failed=True)
+        else:
+            result.record(started, len(batch), failed=False)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, chunks(contacts, batch_size)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_async(uri, contacts, batch_size, concurrency):
+    result = Result('async', concurrency, batch_size)
+
+    async def send(connection, semaphore, batch):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await connection.make_call(
+                    'PUT',
+                    'api/v2/contact/',
+                    payload={'key_id': 3, 'contacts': batch}
+                )
+            except ApiCallError:
+                result.record(started, len(batch), failed=True)
+            else:
+                result.record(started, len(batch), failed=False)
+
+    async def main():
+        connection = AsyncConnection(TEST_USERNAME, TEST_SECRET, uri)
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            send(connection, semaphore, batch)
+            for batch in chunks(contacts, batch_size)
+        ))
+        result.elapsed = time.perf_counter() - started
+        await connection.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+    return result
+
+
+RUNNERS = {'sync': run_sync, 'async': run_async}
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest')
+    parser.add_argument('--contacts', type=int, default=20000)
+    parser.add_argument('--width', type=int, default=5,
+                        help='number of fields per contact')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--batch-sizes', type=int_list, default=[1000])
+    parser.add_argument('--concurrency', type=int_list, default=[1, 8, 32])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='report the peak of memory allocated by Python '
+                             'during each scenario (slower)')
+    args = parser.parse_args(argv)
+
+    contacts = make_contacts(args.contacts, args.width)
+    config = StubConfig(args.latency, args.jitter, args.error_rate,
+                        args.rate_limit, seed=0)
+    print(HEADER)
+    with StubServer(config) as server:
+        for mode in args.modes.split(','):
+            for batch_size in args.batch_sizes:
+                for concurrency in args.concurrency:
+                    if args.trace_memory:
+                        tracemalloc.start()
+                    result = RUNNERS[mode](server.uri, contacts, batch_size,
+                                           concurrency)
+                    if args.trace_memory:
+                        result.memory_peak = tracemalloc.get_traced_memory()[1]
+                        tracemalloc.stop()
+                    print(result.row())
+    print('max RSS: {:.1f} MiB'.format(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Local aiohttp server mimicking the contact, field and contactlist endpoints
+of the Emarsys API, with configurable latency, error rate and rate limit.
+
+It can be run on its own:
+    $ python -m benchmarks.stub_server --port 8080 --latency 0.02
+or started in a background thread with `StubServer`.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+
+from aiohttp import web
+
+
+def reply(data, reply_code=0, reply_text='OK', status=200):
+    return web.json_response(
+        {'data': data, 'replyCode': reply_code, 'replyText': reply_text},
+        status=status
+    )
+
+
+class StubConfig:
+    """
+    Behaviour of the stub server.
+    :param latency: Mean latency added to every response, in seconds.
+    :param jitter: Latency is uniformly drawn in latency +/- jitter.
+    :param error_rate: Share of requests answered with a 500.
+    :param rate_limit: Maximum number of requests per second, requests above
+    it are answered with a 429. 0 means no limit.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+
+class StubEmarsys:
+    def __init__(self, config):
+        self.config = config
+        self.ids = itertools.count(100000000)
+        self.lists = {}
+        self.requests = 0
+        self.tokens = float(config.rate_limit)
+        self.last_refill = time.monotonic()
+
+    def rate_limited(self):
+        if not self.config.rate_limit:
+            return False
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.config.rate_limit),
+            self.tokens + (now - self.last_refill) * self.config.rate_limit
+        )
+        self.last_refill = now
+        if self.tokens < 1:
+            return True
+        self.tokens -= 1
+        return False
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests += 1
+        config = self.config
+        if config.latency or config.jitter:
+            jitter = config.random.uniform(-config.jitter, config.jitter)
+            await asyncio.sleep(max(0.0, config.latency + jitter))
+        if self.rate_limited():
+            return reply('', 6028, 'Rate limit exceeded', status=429)
+        if config.error_rate and config.random.random() < config.error_rate:
+            return reply('', 1, 'Internal error', status=500)
+        return await handler(request)
+
+    async def payload(self, request):
+        body = await request.read()
+        return json.loads(body.decode('utf-8')) if body else {}
+
+    async def create_contacts(self, request):
+        payload = await self.payload(request)
+        if 'contacts' in payload:
+            return reply(
+                {'ids': [next(self.ids) for _ in payload['contacts']]}
+            )
+        return reply({'id': next(self.ids)})
+
+    async def update_contacts(self, request):
+        payload = await self.payload(request)
+        if 'contacts' in payload:
+            return reply(
+                {'ids': [str(next(self.ids)) for _ in payload['contacts']]}
+            )
+        return reply({'id': str(next(self.ids))})
+
+    async def get_internal_id(self, request):
+        return reply({'id': str(next(self.ids))})
+
+    async def get_data(self, request):
+        payload = await self.payload(request)
+        fields = payload.get('fields') or [1, 2, 3]
+        return reply({
+            'errors': [],
+            'result': [
+                dict(
+                    {str(field): 'value' for field in fields},
+                    id=str(next(self.ids))
+                )
+                for _ in payload.get('keyValues', [])
+            ],
+        })
+
+    async def list_fields(self, request):
+        return reply([
+            {'id': 1, 'name': 'First Name', 'application_type': 'shorttext',
+             'string_id': 'first_name'},
+            {'id': 3, 'name': 'Email', 'application_type': 'longtext',
+             'string_id': 'email'},
+            {'id': 31, 'name': 'Opt-in', 'application_type': 'singlechoice',
+             'string_id': 'optin'},
+        ])
+
+    async def list_choice(self, request):
+        return reply([{'choice': 'True', 'id': '1'},
+                      {'choice': 'False', 'id': '2'}])
+
+    async def create_list(self, request):
+        payload = await self.payload(request)
+        list_id = len(self.lists) + 1
+        self.lists[list_id] = set(payload.get('external_ids') or [])
+        return reply({'id': list_id})
+
+    async def add_to_list(self, request):
+        payload = await self.payload(request)
+        members = self.lists.setdefault(int(request.match_info['list_id']),
+                                        set())
+        before = len(members)
+        members.update(payload.get('external_ids') or [])
+        return reply({'inserted_contacts': len(members) - before,
+                      'errors': []})
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware],
+                              client_max_size=1024 ** 3)
+        app.router.add_post('/api/v2/contact/', self.create_contacts)
+        app.router.add_put('/api/v2/contact/', self.update_contacts)
+        app.router.add_get('/api/v2/contact/', self.get_internal_id)
+        app.router.add_post('/api/v2/contact/getdata/', self.get_data)
+        app.router.add_get('/api/v2/field/', self.list_fields)
+        app.router.add_get('/api/v2/field/{field_id}/choice',
+                           self.list_choice)
+        app.router.add_post('/api/v2/contactlist/', self.create_list)
+        app.router.add_post('/api/v2/contactlist/{list_id}/add/',
+                            self.add_to_list)
+        return app
+
+
+class StubServer:
+    """
+    Run the stub server in a background thread.
+
+    Usage example:
+        >>> with StubServer(StubConfig(latency=0.02)) as server:
+        ...     connection = SyncConnection('username', 'secret', server.uri)
+    """
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.stub = StubEmarsys(config or StubConfig())
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.runner = None
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       daemon=True)
+
+    @property
+    def uri(self):
+        return 'http://{}:{}/'.format(self.host, self.port)
+
+    async def _start(self):
+        self.runner = web.AppRunner(self.stub.make_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(
+            self.runner.cleanup(),
+            self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.stub_server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0)
+    args = parser.parse_args(argv)
+    stub = StubEmarsys(StubConfig(args.latency, args.jitter, args.error_rate,
+                                  args.rate_limit))
+    web.run_app(stub.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
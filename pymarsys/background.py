@@ -0,0 +1,271 @@
+import atexit
+from collections import OrderedDict
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+from .bulk_write import BULK_CHUNK_SIZE, key_value
+from .connections import ApiCallError
+from .contact import Contact
+
+CREATE = 'create'
+UPDATE = 'update'
+BACKGROUND_MAX_DELAY = 0.5
+DRAIN_TIMEOUT = 10
+
+_FLUSH = object()
+_STOP = object()
+
+
+class _Submission:
+    __slots__ = ('kind', 'contact', 'options', 'future')
+
+    def __init__(self, kind, contact, options):
+        self.kind = kind
+        self.contact = contact
+        self.options = options
+        self.future = Future()
+
+
+class BackgroundWriter:
+    """
+    Write contacts from a background thread, so that synchronous code, e.g.
+    a web request handler, does not wait for Emarsys.
+
+    submit_update and submit_create only queue the contact and return a
+    Future. The worker thread collects the submissions for at most
+    max_delay seconds, or until batch_size are queued, and sends them with
+    bulk_update and bulk_create, over the pooled session of the connection.
+    Submissions of the same contact sent in the same batch are merged, later
+    values winning. The queue is drained when the interpreter exits, for at
+    most drain_timeout seconds.
+
+    Usage example:
+        >>> writer = BackgroundWriter(connection)
+        >>> future = writer.submit_update({3: 'squirrel@squirrelmail.com',
+        ...                                31: 1})
+        >>> future.result()
+        589058827
+
+    :param connection: SyncConnection used to write the contacts.
+    :param batch_size: Maximum number of contacts per batch.
+    :param max_delay: Maximum time a submission waits for others before
+    being sent, in seconds.
+    :param max_queued: Maximum number of queued submissions, submitting
+    blocks beyond it. 0 for no maximum.
+    :param drain_timeout: Maximum time spent sending the queued submissions
+    when the interpreter exits, in seconds.
+    :param bulk_options: Other options of bulk_update and bulk_create, e.g.
+    retries or chunk_size.
+    """
+    def __init__(self,
+                 connection,
+                 batch_size=BULK_CHUNK_SIZE,
+                 max_delay=BACKGROUND_MAX_DELAY,
+                 max_queued=0,
+                 drain_timeout=DRAIN_TIMEOUT,
+                 **bulk_options):
+        self.contacts = Contact(connection)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.drain_timeout = drain_timeout
+        self.bulk_options = bulk_options
+        self.last_error = None
+        self._queue = queue.Queue(max_queued)
+        # Guards _closed and the puts, so that nothing is queued after _STOP.
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='pymarsys-background-writer',
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self._drain_at_exit)
+
+    def _submit(self, kind, contact, options):
+        submission = _Submission(kind, contact, options)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('BackgroundWriter is closed.')
+            self._queue.put(submission)
+        return submission.future
+
+    def submit_update(self, contact, key_id=3, source_id=None, upsert=False):
+        """
+        Queue the update of a contact.
+        :param contact: Key-value pairs of the contact fields, including the
+        key field.
+        :param key_id: Key which identifies the contact.
+        :param source_id: ID assigned to a customer’s external application.
+        :param upsert: When True, the contact is created if it does not
+        exist.
+        :return: Future resolved with the internal id of the contact, or
+        failed with an ApiCallError.
+        """
+        return self._submit(UPDATE, contact, (key_id, source_id, upsert))
+
+    def submit_create(self, contact, key_id=3):
+        """
+        Queue the creation of a contact.
+        :param contact: Key-value pairs of the contact fields, including the
+        key field.
+        :param key_id: Key which identifies the contact.
+        :return: Future resolved with the internal id of the contact, or
+        failed with an ApiCallError.
+        """
+        return self._submit(CREATE, contact, (key_id,))
+
+    def pending(self):
+        """
+        :return: Approximate number of submissions not sent yet.
+        """
+        return self._queue.qsize()
+
+    def flush(self):
+        """
+        Send the queued submissions now and wait until they are written.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """
+        Send the queued submissions and stop the worker thread.
+        :param timeout: Maximum time to wait for the worker, in seconds.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        atexit.unregister(self._drain_at_exit)
+        self._thread.join(timeout)
+
+    def _drain_at_exit(self):
+        self.close(self.drain_timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _FLUSH or item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        batch = []
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item] if item is _FLUSH or item is _STOP \
+                    else self._collect(item)
+                submissions = [item for item in batch
+                               if isinstance(item, _Submission)]
+                try:
+                    self._send(submissions)
+                except Exception as err:
+                    self.last_error = err
+                    for submission in submissions:
+                        if not submission.future.done():
+                            submission.future.set_exception(err)
+                stop = batch[-1] is _STOP
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+                if stop:
+                    return
+        finally:
+            self._abandon(batch)
+
+    def _abandon(self, batch):
+        # Fail what is left when the worker exits, e.g. after a
+        # KeyboardInterrupt, so that no future or flush waits forever.
+        # Draining the queue unblocks a submitter stuck in put with the lock,
+        # and once the lock is taken with _closed set, nothing can be queued.
+        self._closed = True
+        error = RuntimeError('BackgroundWriter worker stopped.')
+        self._fail(batch, error)
+        while not self._lock.acquire(timeout=0.01):
+            self._fail(self._drain(), error)
+        try:
+            self._fail(self._drain(), error)
+        finally:
+            self._lock.release()
+
+    def _drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _fail(self, items, error):
+        for item in items:
+            if isinstance(item, _Submission) and not item.future.done():
+                item.future.set_exception(error)
+            self._queue.task_done()
+
+    def _send(self, submissions):
+        # Consecutive submissions with the same options are sent together,
+        # so that the writes of a contact are made in submission order.
+        start = 0
+        for index in range(1, len(submissions) + 1):
+            if index == len(submissions) or \
+                    (submissions[index].kind, submissions[index].options) != \
+                    (submissions[start].kind, submissions[start].options):
+                self._send_group(submissions[start:index])
+                start = index
+
+    def _send_group(self, submissions):
+        kind, options = submissions[0].kind, submissions[0].options
+        key_id = options[0]
+        contacts = OrderedDict()
+        futures = {}
+        for submission in submissions:
+            key = key_value(submission.contact, key_id)
+            contacts.setdefault(key, {}).update(submission.contact)
+            futures.setdefault(key, []).append(submission.future)
+
+        if kind == UPDATE:
+            result = self.contacts.bulk_update(
+                key_id,
+                list(contacts.values()),
+                source_id=options[1],
+                upsert=options[2],
+                **self.bulk_options
+            )
+        else:
+            result = self.contacts.bulk_create(
+                list(contacts.values()),
+                key_id,
+                **self.bulk_options
+            )
+
+        for key, key_futures in futures.items():
+            error = result.errors.get(key)
+            for future in key_futures:
+                if error is None:
+                    future.set_result(result.ids.get(key))
+                else:
+                    future.set_exception(ApiCallError(
+                        'Contact {} not written: {}'.format(key, error),
+                        status=error.get('status')
+                    ))
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
+import copy
+
 from .connections import BaseConnection
+from .request_spec import RequestSpec
 
 
 class BaseEndpoint(ABC):
@@ -11,5 +14,104 @@ class BaseEndpoint(ABC):
     def __init__(self, connection, endpoint):
         self.connection = connection
         self.endpoint = endpoint
+        self.deferred = False
         if not isinstance(self.connection, BaseConnection):
             raise TypeError('connection must be a BaseConnection object.')
+
+    def defer(self):
+        """
+        Get a copy of the endpoint whose methods return RequestSpec objects
+        instead of making calls, so that they can be executed later, e.g. in
+        bulk with `connection.execute(specs)`.
+        :return: Deferred copy of the endpoint.
+
+        Examples:
+        >>> specs = [
+        ...     client.contacts.defer().get_internal_id(3, email)
+        ...     for email in ('squirrel1@squirrelmail.com',
+        ...                   'squirrel2@squirrelmail.com')
+        ... ]
+        >>> client.connection.execute(specs)
+        [
+            {'data': {'id': '589058827'}, 'replyCode': 0, 'replyText': 'OK'},
+            {'data': {'id': '589058576'}, 'replyCode': 0, 'replyText': 'OK'}
+        ]
+        """
+        deferred = copy.copy(self)
+        deferred.deferred = True
+        return deferred
+
+    def make_call(self,
+                  method,
+                  endpoint,
+                  payload=None,
+                  params=None,
+                  idempotent=None,
+                  transform=None):
+        """
+        Describe a call as a RequestSpec, and run it through the connection
+        unless the endpoint is deferred.
+        :param method: HTTP method.
+        :param endpoint: Emarsys' api endpoint.
+        :param payload: HTTP payload.
+        :param params: HTTP params.
+        :param idempotent: Whether the call is a read without side effects.
+        Defaults to True for GET requests only.
+        :param transform: Function applied to the decoded response.
+        :return: The RequestSpec if the endpoint is deferred, the result of
+        the connection's run method otherwise.
+        """
+        spec = RequestSpec(
+            method,
+            endpoint,
+            payload=payload,
+            params=params,
+            idempotent=idempotent,
+            transform=transform
+        )
+        if self.deferred:
+            return spec
+        return self.connection.run(spec)
+
+    def make_calls(self, specs, aggregate, concurrency=None):
+        """
+        Execute several RequestSpecs through the connection, concurrently on
+        connections supporting it, and aggregate their results. Failed specs
+        do not abort the others: their exception is given to the aggregate
+        function in place of their result.
+        :param specs: List of RequestSpec objects.
+        :param aggregate: Function building the result from the list of
+        results of the specs.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: The list of specs if the endpoint is deferred, the result of
+        the connection's execute method otherwise.
+        """
+        if self.deferred:
+            return specs
+        options = {}
+        if concurrency is not None:
+            options['concurrency'] = concurrency
+        return self.connection.execute(
+            specs,
+            return_exceptions=True,
+            aggregate=aggregate,
+            **options
+        )
+
+    def drive(self, plan, concurrency=None):
+        """
+        Run a plan, a generator of RequestSpecs, through the connection. See
+        the connections' drive method.
+        :param plan: Generator of RequestSpecs.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: The result of the connection's drive method.
+        """
+        if self.deferred:
+            raise TypeError(
+                'Methods making several dependent calls cannot be deferred.'
+            )
+        if concurrency is None:
+            return self.connection.drive(plan)
+        return self.connection.drive(plan, concurrency=concurrency)
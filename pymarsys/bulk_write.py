@@ -0,0 +1,223 @@
+import sys
+
+from .circuit_breaker import CircuitOpenError
+from .connections import ApiCallError
+from .contact_batch import ContactBatch
+from .request_spec import Delay
+from .utils import chunked
+
+BULK_CHUNK_SIZE = 1000
+BULK_RETRIES = 2
+BULK_RETRY_DELAY = 1
+# Statuses of calls which would fail for any record: bad credentials,
+# missing permission or wrong endpoint.
+FATAL_STATUSES = (401, 403, 404)
+# Network errors of the optional HTTP libraries, besides OSError which covers
+# the requests ones. A library's errors can only be raised once it is
+# imported, so they are looked up in sys.modules rather than imported.
+NETWORK_ERRORS = (
+    ('asyncio', 'TimeoutError'),
+    ('aiohttp', 'ClientError'),
+    ('httpx', 'TransportError'),
+)
+
+
+class BulkWriteResult:
+    """
+    Outcome of a bulk write, record by record.
+
+    :param ids: Dictionary of the key values of the written contacts to their
+    internal ids.
+    :param errors: Dictionary of the key values of the rejected contacts to
+    their errors, {reply code: reply text} as reported by Emarsys,
+    {'call_error': message, 'status': HTTP status or None} when the call
+    itself kept failing, or {'validation': {field id: error}} when the
+    contact was not sent because of invalid values.
+    :param calls: Number of calls sent.
+    :param retries: Number of batches sent again after a transient failure.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.errors = {}
+        self.calls = 0
+        self.retries = 0
+
+    def __repr__(self):
+        return '<BulkWriteResult {} written, {} failed in {} calls>'.format(
+            len(self.ids),
+            len(self.errors),
+            self.calls
+        )
+
+    @property
+    def ok(self):
+        """
+        Whether every contact was written.
+        """
+        return not self.errors
+
+
+def key_value(contact, key_id):
+    """
+    :return: Value of the key field of a contact dictionary, whether its
+    field ids are integers or strings.
+    """
+    value = contact.get(key_id)
+    if value is None:
+        value = contact.get(str(key_id))
+    return str(value)
+
+
+def _network_errors():
+    errors = [OSError]
+    for module_name, name in NETWORK_ERRORS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            errors.append(getattr(module, name))
+    return tuple(errors)
+
+
+def is_transient(error):
+    """
+    :return: Whether a failed call is worth sending again as is: network
+    errors, rate limiting and server errors, but not open circuits.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, ApiCallError):
+        return error.status is None or error.status == 429 or \
+            error.status >= 500
+    return isinstance(error, _network_errors())
+
+
+def _unexpected(error):
+    # Errors which are neither reported by the API nor raised by the network,
+    # e.g. bugs of a hook or a transport.
+    return not isinstance(error, ApiCallError) and not is_transient(error)
+
+
+def is_fatal(error):
+    """
+    :return: Whether a failed call would fail the same way for any batch,
+    so that the whole write is aborted.
+    """
+    return isinstance(error, ApiCallError) and error.status in FATAL_STATUSES
+
+
+def _rejected(error):
+    return isinstance(error, ApiCallError) and error.status is not None \
+        and 400 <= error.status < 500 and error.status != 429
+
+
+def _record_errors(error, batch, key_id):
+    # Errors of the records of a batch rejected as a whole, as reported in
+    # the body of the response, e.g. with replyCode 2010 "No contacts were
+    # processed".
+    response = getattr(error, 'response', None)
+    if not _rejected(error) or response is None:
+        return {}
+    try:
+        data = response.data
+    except ValueError:
+        return {}
+    errors = data.get('errors') if isinstance(data, dict) else None
+    if not isinstance(errors, dict):
+        return {}
+    keys = (key_value(contact, key_id) for contact in batch)
+    return {key: errors[key] for key in keys if key in errors}
+
+
+def _without(batch, keys, key_id):
+    keep = [key_value(contact, key_id) not in keys for contact in batch]
+    if isinstance(batch, ContactBatch):
+        return ContactBatch(batch.field_ids, [
+            [value for value, kept in zip(column, keep) if kept]
+            for column in batch.columns
+        ])
+    return [contact for contact, kept in zip(batch, keep) if kept]
+
+
+def bulk_write_plan(contacts,
+                    make_spec,
+                    key_id,
+                    chunk_size=BULK_CHUNK_SIZE,
+                    retries=BULK_RETRIES,
+                    retry_delay=BULK_RETRY_DELAY,
+                    schema=None):
+    """
+    Plan writing contacts in batches, see the connections' drive method.
+    Batches are sent concurrently, round after round:
+    - per-record errors of accepted batches are collected,
+    - a batch rejected as a whole with a 4xx whose body holds per-record
+      errors has them collected too, and only its other records are sent
+      again,
+    - a batch rejected as a whole with another 4xx is split in two halves,
+      until the records responsible for the rejection are isolated,
+    - a 401, 403 or 404 aborts the write and is raised, as it would fail
+      for any record,
+    - a batch failing with a transient error is sent again, up to `retries`
+      times, after a delay doubling every round.
+    Only the failed subset of a batch is ever sent again.
+    :param contacts: List of contact dictionaries, or ContactBatch.
+    :param make_spec: Function building the RequestSpec writing a batch.
+    :param key_id: Key which identifies the contacts.
+    :param chunk_size: Maximum number of contacts per call.
+    :param retries: Number of times a batch is sent again after a transient
+    error.
+    :param retry_delay: Delay before the first retry, in seconds.
+    :param schema: FieldSchema checking the contacts first, invalid contacts
+    being reported without being sent. None sends them all.
+    :return: Generator of RequestSpecs returning a BulkWriteResult.
+    """
+    result = BulkWriteResult()
+    if schema is not None:
+        valid, invalid = schema.validate(contacts)
+        for index, fields in invalid.items():
+            result.errors[key_value(contacts[index], key_id)] = {
+                'validation': fields
+            }
+        contacts = valid
+    batches = [(batch, 0) for batch in chunked(contacts, chunk_size)]
+    delay = retry_delay
+    while batches:
+        responses = yield [make_spec(batch) for batch, _ in batches]
+        result.calls += len(batches)
+        next_batches = []
+        retrying = False
+        for (batch, attempt), response in zip(batches, responses):
+            if not isinstance(response, Exception):
+                data = response.get('data') or {}
+                errors = data.get('errors') or {}
+                result.errors.update(errors)
+                written = [key for key in
+                           (key_value(contact, key_id) for contact in batch)
+                           if key not in errors]
+                result.ids.update(zip(written, data.get('ids') or []))
+                continue
+            if is_fatal(response) or _unexpected(response):
+                raise response
+            errors = _record_errors(response, batch, key_id)
+            if errors:
+                result.errors.update(errors)
+                others = _without(batch, errors, key_id)
+                if len(others):
+                    next_batches.append((others, attempt))
+            elif _rejected(response) and len(batch) > 1:
+                middle = len(batch) // 2
+                next_batches.append((batch[:middle], attempt))
+                next_batches.append((batch[middle:], attempt))
+            elif is_transient(response) and attempt < retries:
+                next_batches.append((batch, attempt + 1))
+                result.retries += 1
+                retrying = True
+            else:
+                for contact in batch:
+                    result.errors[key_value(contact, key_id)] = {
+                        'call_error': str(response),
+                        'status': getattr(response, 'status', None),
+                    }
+        batches = next_batches
+        if retrying and retry_delay:
+            yield Delay(delay)
+            delay *= 2
+    return result
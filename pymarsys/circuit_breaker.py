@@ -0,0 +1,213 @@
+from collections import deque
+import threading
+import time
+
+from .connections import ApiCallError
+from .metrics import normalize_endpoint
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ApiCallError):
+    """
+    Raised instead of sending a call while the circuit of its endpoint is
+    open.
+    """
+
+
+class _Circuit:
+    __slots__ = ('state', 'calls', 'opened_at', 'probes')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.calls = deque()
+        self.opened_at = None
+        self.probes = set()
+
+
+class CircuitBreaker:
+    """
+    Stop sending calls to an endpoint which keeps failing or answering
+    slowly, so that workers fail fast during an outage instead of piling up
+    behind timeouts.
+
+    Calls are tracked per method and endpoint, numeric ids replaced by a
+    placeholder, over a sliding window. Once the window holds min_calls
+    calls and the share of failed calls, or of slow calls, reaches its
+    threshold, the circuit opens: calls raise a CircuitOpenError without
+    being sent. After open_duration seconds it half-opens and lets
+    half_open_calls probe calls through; it closes if they succeed and opens
+    again otherwise.
+
+    Failures are network errors and 5xx responses. 4xx responses are errors
+    of the call itself, not of the API, and count as successes. Calls
+    cancelled before they complete are not counted.
+
+    Usage example:
+        >>> breaker = CircuitBreaker(failure_threshold=0.5, open_duration=30)
+        >>> connection = SyncConnection('username', 'secret',
+        ...                             circuit_breaker=breaker)
+        >>> breaker.state('PUT', 'api/v2/contact/')
+        'closed'
+
+    :param failure_threshold: Share of failed calls opening the circuit.
+    :param slow_call_duration: Duration in seconds above which a call is
+    slow, None to ignore latency.
+    :param slow_call_threshold: Share of slow calls opening the circuit.
+    :param min_calls: Minimum number of calls in the window before the
+    circuit can open.
+    :param window: Duration of the sliding window, in seconds.
+    :param open_duration: Time the circuit stays open before half-opening,
+    in seconds.
+    :param half_open_calls: Number of probe calls let through while
+    half-open.
+    :param clock: Function returning the current time, in seconds.
+    """
+    def __init__(self,
+                 failure_threshold=0.5,
+                 slow_call_duration=None,
+                 slow_call_threshold=0.5,
+                 min_calls=10,
+                 window=60,
+                 open_duration=30,
+                 half_open_calls=1,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_threshold = slow_call_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, method, endpoint):
+        key = (method, normalize_endpoint(endpoint))
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit()
+        return circuit
+
+    def _refresh(self, circuit, now):
+        if circuit.state == OPEN and \
+                now - circuit.opened_at >= self.open_duration:
+            circuit.state = HALF_OPEN
+            circuit.probes = set()
+
+    def state(self, method, endpoint):
+        """
+        :return: State of the circuit of an endpoint: 'closed', 'open' or
+        'half_open'.
+        """
+        with self._lock:
+            circuit = self._circuit(method, endpoint)
+            self._refresh(circuit, self.clock())
+            return circuit.state
+
+    def reset(self):
+        """
+        Close all the circuits and forget the recorded calls.
+        """
+        with self._lock:
+            self._circuits.clear()
+
+    def before_request(self, call):
+        """
+        Called by the connection before a call is sent.
+        :param call: CallInfo of the call.
+        Raises a CircuitOpenError if the call should not be sent.
+        """
+        with self._lock:
+            circuit = self._circuit(call.method, call.endpoint)
+            now = self.clock()
+            self._refresh(circuit, now)
+            if circuit.state == CLOSED:
+                return
+            if circuit.state == HALF_OPEN and \
+                    len(circuit.probes) < self.half_open_calls:
+                circuit.probes.add(call)
+                return
+            retry_in = max(
+                0.0,
+                self.open_duration - (now - circuit.opened_at)
+            )
+        raise CircuitOpenError(
+            'Circuit open for {} {}, retry in {:.1f}s.'.format(
+                call.method,
+                normalize_endpoint(call.endpoint),
+                retry_in
+            )
+        )
+
+    def is_failure(self, call, error):
+        """
+        :return: Whether a failed call counts as a failure of the API.
+        """
+        return call.status is None or call.status >= 500
+
+    def on_request_end(self, call):
+        """
+        Called by the connection once a call succeeded.
+        """
+        self._record(call, False)
+
+    def on_error(self, call, error):
+        """
+        Called by the connection once a call failed.
+        """
+        self._record(call, self.is_failure(call, error))
+
+    def on_cancel(self, call):
+        """
+        Called by the connection when a call was interrupted before it
+        completed, e.g. cancelled by asyncio.wait_for or a stream closed
+        early. The call is not recorded, but its probe slot is freed so that
+        the circuit can be probed again.
+        """
+        with self._lock:
+            circuit = self._circuit(call.method, call.endpoint)
+            circuit.probes.discard(call)
+
+    def _record(self, call, failed):
+        slow = self.slow_call_duration is not None and \
+            (call.elapsed or 0) >= self.slow_call_duration
+        with self._lock:
+            circuit = self._circuit(call.method, call.endpoint)
+            now = self.clock()
+            if circuit.state == HALF_OPEN:
+                # Only the probes decide the state, not the calls sent
+                # before the circuit opened and ending late.
+                if call not in circuit.probes:
+                    return
+                circuit.probes.discard(call)
+                if failed or slow:
+                    self._open(circuit, now)
+                else:
+                    circuit.state = CLOSED
+                    circuit.probes = set()
+                    circuit.calls.clear()
+                return
+            if circuit.state == OPEN:
+                return
+
+            calls = circuit.calls
+            calls.append((now, failed, slow))
+            while calls and calls[0][0] <= now - self.window:
+                calls.popleft()
+            if len(calls) < self.min_calls:
+                return
+            failures = sum(entry[1] for entry in calls)
+            slow_calls = sum(entry[2] for entry in calls)
+            if failures >= self.failure_threshold * len(calls) or \
+                    slow_calls >= self.slow_call_threshold * len(calls):
+                self._open(circuit, now)
+
+    def _open(self, circuit, now):
+        circuit.state = OPEN
+        circuit.opened_at = now
+        circuit.probes = set()
+        circuit.calls.clear()
@@ -0,0 +1,460 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+import threading
+import time
+
+from .connections import EMARSYS_URI, AsyncConnection, SyncConnection
+from .transports import (
+    DEFAULT_CHUNK_SIZE,
+    AiohttpTransport,
+    BaseAsyncTransport,
+    BaseTransport,
+    RequestsTransport,
+    StreamedResponse,
+)
+
+DEFAULT_MAX_CONNECTIONS = 20
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the rate of the calls of an account.
+    :param rate: Average number of calls per second, greater than 0.
+    :param burst: Number of calls which can be made at once after a quiet
+    period, rate by default.
+    :param clock: Function returning the current time, in seconds.
+    """
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError(
+                'rate must be greater than 0, got {!r}.'.format(rate)
+            )
+        self.rate = rate
+        self.burst = max(1.0, rate if burst is None else burst)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token for a call.
+        :return: Time to wait before making the call, in seconds.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class _FairQueue:
+    # Waiters are queued per account and accounts served in turn, so that an
+    # account with many calls waiting does not delay the others.
+    def __init__(self, slots):
+        self.slots = slots
+        self.free = slots
+        self._waiting = OrderedDict()
+
+    def _enqueue(self, account, waiter):
+        self._waiting.setdefault(account, deque()).append(waiter)
+
+    def _discard(self, account, waiter):
+        waiters = self._waiting.get(account)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[account]
+
+    def _next_waiter(self):
+        account, waiters = next(iter(self._waiting.items()))
+        waiter = waiters.popleft()
+        if waiters:
+            self._waiting.move_to_end(account)
+        else:
+            del self._waiting[account]
+        return waiter
+
+    def waiting(self):
+        """
+        :return: Dictionary of the accounts to their number of waiting
+        calls.
+        """
+        return {account: len(waiters)
+                for account, waiters in self._waiting.items()}
+
+
+class FairScheduler(_FairQueue):
+    """
+    Share a number of call slots between the threads of several accounts.
+    When a slot is freed, it goes to the next account with calls waiting,
+    round-robin.
+    :param slots: Maximum number of calls in flight.
+    """
+    def __init__(self, slots):
+        super().__init__(slots)
+        self._lock = threading.Lock()
+
+    def acquire(self, account):
+        """
+        Wait for a free slot.
+        """
+        with self._lock:
+            if self.free and not self._waiting:
+                self.free -= 1
+                return
+            event = threading.Event()
+            self._enqueue(account, event)
+        event.wait()
+
+    def release(self):
+        """
+        Free a slot, handing it over to the next account waiting.
+        """
+        with self._lock:
+            if self._waiting:
+                self._next_waiter().set()
+            else:
+                self.free += 1
+
+
+class AsyncFairScheduler(_FairQueue):
+    """
+    Share a number of call slots between the coroutines of several
+    accounts, see FairScheduler.
+    :param slots: Maximum number of calls in flight.
+    """
+    async def acquire(self, account):
+        """
+        Wait for a free slot.
+        """
+        import asyncio
+        if self.free and not self._waiting:
+            self.free -= 1
+            return
+        future = asyncio.get_event_loop().create_future()
+        self._enqueue(account, future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over before the cancellation.
+                self.release()
+            else:
+                self._discard(account, future)
+            raise
+
+    def release(self):
+        """
+        Free a slot, handing it over to the next account waiting.
+        """
+        while self._waiting:
+            future = self._next_waiter()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+
+def _release_at_end(chunks, release):
+    # The slot of a stream is freed once its body is read, without waiting
+    # for the caller to close the response.
+    for chunk in chunks:
+        yield chunk
+    release()
+
+
+class _AsyncReleaseAtEnd:
+    """
+    Asynchronous counterpart of _release_at_end.
+    """
+    def __init__(self, chunks, release):
+        self._chunks = chunks.__aiter__()
+        self._release = release
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            await self._release()
+            raise
+
+
+class _AccountTransport(BaseTransport):
+    """
+    Transport of the connection of an account, sending its calls through
+    the shared transport once its rate limiter and the scheduler let it.
+    A streamed call keeps its scheduler slot until its body is read to the
+    end or its response is closed.
+    """
+    def __init__(self, account, transport, scheduler, limiter=None):
+        self.account = account
+        self.transport = transport
+        self.scheduler = scheduler
+        self.limiter = limiter
+
+    def _acquire(self):
+        if self.limiter is not None:
+            delay = self.limiter.reserve()
+            if delay:
+                time.sleep(delay)
+        self.scheduler.acquire(self.account)
+
+    def send(self, method, url, headers, data, params):
+        self._acquire()
+        try:
+            return self.transport.send(method, url, headers, data, params)
+        finally:
+            self.scheduler.release()
+
+    def stream(self, method, url, headers, data, params,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        self._acquire()
+        try:
+            response = self.transport.stream(method, url, headers, data,
+                                             params, chunk_size)
+        except BaseException:
+            self.scheduler.release()
+            raise
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                try:
+                    response.close()
+                finally:
+                    self.scheduler.release()
+
+        return StreamedResponse(response.status,
+                                _release_at_end(response.chunks, release),
+                                response.headers, response.reason, release)
+
+    def warmup(self, url, connections):
+        return self.transport.warmup(url, connections)
+
+    def close(self):
+        # The shared transport is closed by the manager.
+        pass
+
+
+class _AsyncAccountTransport(BaseAsyncTransport):
+    """
+    Asynchronous counterpart of _AccountTransport.
+    """
+    def __init__(self, account, transport, scheduler, limiter=None):
+        self.account = account
+        self.transport = transport
+        self.scheduler = scheduler
+        self.limiter = limiter
+
+    async def _acquire(self):
+        import asyncio
+        if self.limiter is not None:
+            delay = self.limiter.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        await self.scheduler.acquire(self.account)
+
+    async def send(self, method, url, headers, data, params):
+        await self._acquire()
+        try:
+            return await self.transport.send(method, url, headers, data,
+                                             params)
+        finally:
+            self.scheduler.release()
+
+    async def stream(self, method, url, headers, data, params,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+        await self._acquire()
+        try:
+            response = await self.transport.stream(method, url, headers, data,
+                                                   params, chunk_size)
+        except BaseException:
+            self.scheduler.release()
+            raise
+        released = []
+
+        async def release():
+            if not released:
+                released.append(True)
+                try:
+                    await response.aclose()
+                finally:
+                    self.scheduler.release()
+
+        return StreamedResponse(response.status,
+                                _AsyncReleaseAtEnd(response.chunks, release),
+                                response.headers, response.reason, release)
+
+    async def warmup(self, url, connections):
+        return await self.transport.warmup(url, connections)
+
+    async def close(self):
+        pass
+
+
+class BaseConnectionManager(ABC):
+    """
+    Hand out the connections of several Emarsys accounts, which share one
+    bounded pool of sockets. Every account can have its own rate limit, and
+    the calls waiting for the pool are served account by account, so that
+    the bulk import of an account does not starve the others.
+    """
+    connection_class = None
+    account_transport_class = None
+    scheduler_class = None
+
+    def __init__(self,
+                 max_connections=DEFAULT_MAX_CONNECTIONS,
+                 uri=EMARSYS_URI,
+                 transport=None,
+                 **connection_options):
+        self.max_connections = max_connections
+        self.uri = uri
+        self.transport = transport if transport is not None \
+            else self.default_transport(max_connections)
+        self.scheduler = self.scheduler_class(max_connections)
+        self.connection_options = connection_options
+        self._connections = OrderedDict()
+
+    @abstractmethod
+    def default_transport(self, max_connections):
+        """
+        :return: Shared transport used when none is given.
+        """
+
+    def add(self,
+            account,
+            username,
+            secret,
+            rate=None,
+            burst=None,
+            **connection_options):
+        """
+        Create the connection of an account.
+        :param account: Name of the account.
+        :param username: Emarsys API username of the account.
+        :param secret: Emarsys API secret of the account.
+        :param rate: Maximum average number of calls per second of the
+        account, None for no limit.
+        :param burst: Number of calls the account can make at once after a
+        quiet period, rate by default.
+        :param connection_options: Options of the connection, overriding
+        those of the manager, e.g. hooks or circuit_breaker.
+        :return: Connection of the account.
+        """
+        if account in self._connections:
+            raise ValueError('Account {!r} already added.'.format(account))
+        limiter = RateLimiter(rate, burst) if rate is not None else None
+        transport = self.account_transport_class(
+            account,
+            self.transport,
+            self.scheduler,
+            limiter
+        )
+        options = dict(self.connection_options, **connection_options)
+        connection = self.connection_class(username, secret, self.uri,
+                                           transport=transport, **options)
+        self._connections[account] = connection
+        return connection
+
+    def remove(self, account):
+        """
+        Forget the connection of an account.
+        """
+        del self._connections[account]
+
+    def __getitem__(self, account):
+        return self._connections[account]
+
+    def __contains__(self, account):
+        return account in self._connections
+
+    def __len__(self):
+        return len(self._connections)
+
+    @property
+    def accounts(self):
+        """
+        Names of the accounts, in the order they were added.
+        """
+        return list(self._connections)
+
+
+class ConnectionManager(BaseConnectionManager):
+    """
+    Manager of the SyncConnections of several accounts, see
+    BaseConnectionManager.
+
+    Usage example:
+        >>> manager = ConnectionManager(max_connections=20)
+        >>> manager.add('shop-fr', 'username', 'secret', rate=10)
+        >>> manager.add('shop-de', 'username', 'secret', rate=10)
+        >>> Emarsys(manager['shop-fr']).contacts.get_data(3, ['1'])
+
+    :param max_connections: Maximum number of calls in flight, and of
+    sockets open, for all the accounts together.
+    :param uri: Uri of the Emarsys API.
+    :param transport: Shared transport, a RequestsTransport with a pool of
+    max_connections connections by default.
+    :param connection_options: Options of all the connections.
+    """
+    connection_class = SyncConnection
+    account_transport_class = _AccountTransport
+    scheduler_class = FairScheduler
+
+    def default_transport(self, max_connections):
+        return RequestsTransport(max_connections=max_connections)
+
+    def close(self):
+        """
+        Close the shared transport.
+        """
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncConnectionManager(BaseConnectionManager):
+    """
+    Manager of the AsyncConnections of several accounts, see
+    BaseConnectionManager.
+
+    Usage example:
+        >>> manager = AsyncConnectionManager(max_connections=20)
+        >>> manager.add('shop-fr', 'username', 'secret', rate=10)
+        >>> await Emarsys(manager['shop-fr']).contacts.get_data(3, ['1'])
+
+    :param max_connections: Maximum number of calls in flight, and of
+    sockets open, for all the accounts together.
+    :param uri: Uri of the Emarsys API.
+    :param transport: Shared transport, an AiohttpTransport limited to
+    max_connections connections by default.
+    :param connection_options: Options of all the connections.
+    """
+    connection_class = AsyncConnection
+    account_transport_class = _AsyncAccountTransport
+    scheduler_class = AsyncFairScheduler
+
+    def default_transport(self, max_connections):
+        return AiohttpTransport(max_connections=max_connections)
+
+    async def close(self):
+        """
+        Close the shared transport.
+        """
+        await self.transport.close()
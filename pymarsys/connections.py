@@ -1,19 +1,59 @@
 from abc import ABC, abstractmethod
 import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime
 import hashlib
 import json
+import threading
+import time
 from urllib.parse import urljoin
 import uuid
 
-import aiohttp
-import requests
+from .encoding import StreamedBody, encode_payload, payload_items
+from .hooks import CallInfo
+from .pagination import AsyncPageIterator
+from .request_spec import Delay, ExecutionPlan, RequestSpec
+from .response import (
+    RESPONSE_JSON,
+    RESPONSE_LAZY,
+    RESPONSE_MODES,
+    EmarsysResponse,
+)
+from .streaming import AsyncResults, AsyncStream, open_destination
+from .transports import (
+    DEFAULT_CHUNK_SIZE,
+    AiohttpTransport,
+    RequestsTransport,
+    TransportResponse,
+)
 
 EMARSYS_URI = 'https://api.emarsys.net/'
+DEFAULT_ASYNC_CONCURRENCY = 10
 
 
 class ApiCallError(Exception):
-    pass
+    """
+    Raised when a call fails. status is the HTTP status of the response, or
+    None if there was no response.
+    """
+    def __init__(self, message='', status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ReplyCodeError(ApiCallError):
+    """
+    Raised when Emarsys answers with a non-zero replyCode. reply_code and
+    reply_text are the replyCode and replyText of the response, response
+    the EmarsysResponse itself, e.g. to read the per-record errors of its
+    data.
+    """
+    def __init__(self, message='', status=None, reply_code=None,
+                 reply_text=None, response=None):
+        super().__init__(message, status)
+        self.reply_code = reply_code
+        self.reply_text = reply_text
+        self.response = response
 
 
 class BaseConnection(ABC):
@@ -21,12 +61,65 @@ class BaseConnection(ABC):
     Any connection used to instantiate an Emarsys object or an object inherited
      from BaseEndpoint should inherit from this class.
     this class.
+
+    response_mode sets what calls return:
+    - 'json' (default): the decoded body, as a dictionary,
+    - 'lazy': an EmarsysResponse, decoded on first access, after checking
+      its replyCode without decoding it,
+    - 'raw': an EmarsysResponse, without checking its replyCode, for
+      forwarding the body as is.
+
+    Payloads holding a list, or a ContactBatch, of at least stream_threshold
+    items are encoded while they are sent, with chunked transfer encoding,
+    instead of being built as one string first. None never streams them.
     """
     @abstractmethod
-    def __init__(self, username, secret, uri):
+    def __init__(self, username, secret, uri, hooks=None,
+                 circuit_breaker=None, response_mode=RESPONSE_JSON,
+                 stream_threshold=None):
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError('Unknown response mode {!r}, expected one of '
+                             '{}.'.format(response_mode,
+                                          ', '.join(RESPONSE_MODES)))
         self.username = username
         self.secret = secret
         self.uri = uri
+        self.hooks = list(hooks) if hooks else []
+        self.circuit_breaker = circuit_breaker
+        self.response_mode = response_mode
+        self.stream_threshold = stream_threshold
+
+    def add_hook(self, hook):
+        """
+        Register a RequestHook which will be notified of every call.
+        :param hook: RequestHook object.
+        """
+        self.hooks.append(hook)
+
+    def on_request_start(self, call):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(call)
+        for hook in self.hooks:
+            hook.on_request_start(call)
+
+    def on_request_end(self, call):
+        call.finish()
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.on_request_end(call)
+        for hook in self.hooks:
+            hook.on_request_end(call)
+
+    def on_error(self, call, error):
+        call.finish()
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.on_error(call, error)
+        for hook in self.hooks:
+            hook.on_error(call, error)
+
+    def on_cancel(self, call):
+        call.finish()
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.on_cancel(call)
 
     def build_authentication_variables(self):
         """
@@ -69,13 +162,175 @@ class BaseConnection(ABC):
         }
         return http_headers
 
+    def prepare_call(self, method, endpoint, headers, payload, params):
+        """
+        Build everything needed to send a call.
+        :return: url, headers, encoded payload, params and the CallInfo of
+        the call.
+        """
+        if not payload:
+            payload = {}
+
+        if not params:
+            params = {}
+
+        url = urljoin(self.uri, endpoint)
+        headers = self.build_headers(headers)
+        if self.stream_threshold is not None and \
+                payload_items(payload) >= self.stream_threshold:
+            call = CallInfo(method, endpoint)
+            data = StreamedBody(payload, call=call)
+        else:
+            data = encode_payload(payload)
+            call = CallInfo(method, endpoint, len(data))
+        return url, headers, data, params, call
+
+    def handle_response(self, call, response):
+        """
+        Check the status of a response and decode it. Errors carrying a
+        replyCode raise a ReplyCodeError, others an ApiCallError.
+        :param call: CallInfo of the call.
+        :param response: TransportResponse.
+        :return: Dictionary with the result of the query, or EmarsysResponse
+        depending on the response mode.
+        """
+        call.status = response.status
+        call.response_bytes = len(response.body)
+        if response.status >= 400:
+            message = 'Error message: "{} {}" \n Error details: "{}"'.format(
+                response.status,
+                response.reason,
+                response.body.decode('utf-8', 'replace')
+            )
+            reply = EmarsysResponse(response.body, response.status,
+                                    response.headers)
+            if reply.reply_code is not None:
+                raise ReplyCodeError(message, response.status,
+                                     reply.reply_code, reply.reply_text,
+                                     reply)
+            raise ApiCallError(message, status=response.status)
+        if self.response_mode == RESPONSE_JSON:
+            return json.loads(response.body.decode('utf-8'))
+        reply = EmarsysResponse(response.body, response.status,
+                                response.headers)
+        if self.response_mode == RESPONSE_LAZY and reply.reply_code:
+            raise ReplyCodeError(
+                'Error message: "replyCode {}" \n Error details: "{}"'.format(
+                    reply.reply_code,
+                    reply.reply_text
+                ),
+                response.status,
+                reply.reply_code,
+                reply.reply_text,
+                reply
+            )
+        return reply
+
+    def run(self, spec):
+        """
+        Execute a RequestSpec with the connection's make_call method.
+        :param spec: RequestSpec object.
+        :return: Dictionary with the result of the query, transformed by the
+        spec if needed.
+        """
+        return spec.apply(self.make_call(
+            spec.method,
+            spec.endpoint,
+            headers=spec.headers,
+            payload=spec.payload,
+            params=spec.params
+        ))
+
+    def _run_lane(self, plan, lane, results, return_exceptions):
+        for index in lane:
+            try:
+                results[index] = self.run(plan.specs[index])
+            except Exception as err:
+                if not return_exceptions:
+                    raise
+                results[index] = err
+
+    def execute(self,
+                specs,
+                concurrency=1,
+                ordered=False,
+                return_exceptions=False,
+                aggregate=None):
+        """
+        Execute a list of RequestSpecs one after the other. Identical
+        idempotent specs are only sent once. Connections able to send calls
+        concurrently override this method.
+        :param specs: Iterable of RequestSpec objects.
+        :param concurrency: Ignored, the specs are sent one by one.
+        :param ordered: Ignored, the specs are sent in submission order.
+        :param return_exceptions: When True, exceptions are returned in place
+        of the results of the failed specs instead of being raised.
+        :param aggregate: Function applied to the list of results.
+        :return: List of results in submission order, or their aggregate.
+        """
+        plan = ExecutionPlan(specs)
+        results = {}
+        for lane in plan.lanes:
+            self._run_lane(plan, lane, results, return_exceptions)
+        return plan.results(results, aggregate)
+
+    def drive(self, plan, concurrency=1):
+        """
+        Run a plan: a generator yielding RequestSpecs, or lists of
+        RequestSpecs, and receiving their results. Lists are executed with
+        execute(), with exceptions in place of the results of failed specs;
+        the exception of a single spec is thrown into the generator. A plan
+        can also yield a Delay to wait. This lets multi-step algorithms be
+        written once for both connections.
+        :param plan: Generator of RequestSpecs.
+        :param concurrency: Number of calls of a list sent at the same time,
+        given to execute().
+        :return: The value returned by the plan.
+        """
+        try:
+            step = next(plan)
+            while True:
+                if isinstance(step, RequestSpec):
+                    try:
+                        result = self.run(step)
+                    except Exception as err:
+                        step = plan.throw(err)
+                        continue
+                elif isinstance(step, Delay):
+                    time.sleep(step.seconds)
+                    result = None
+                else:
+                    result = self.execute(
+                        step,
+                        concurrency=concurrency,
+                        return_exceptions=True
+                    )
+                step = plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+
 
 class SyncConnection(BaseConnection):
     """
     Synchronous connection for Ermasys or inherited-from BaseEndpoint objects.
+    By default, calls are made through a pooled requests session; any
+    BaseTransport object can be given instead. A CircuitBreaker can be given
+    to fail fast on endpoints which keep failing.
     """
-    def __init__(self, username, secret, uri=EMARSYS_URI):
-        super().__init__(username, secret, uri)
+    def __init__(self,
+                 username,
+                 secret,
+                 uri=EMARSYS_URI,
+                 hooks=None,
+                 transport=None,
+                 circuit_breaker=None,
+                 response_mode=RESPONSE_JSON,
+                 stream_threshold=None):
+        super().__init__(username, secret, uri, hooks, circuit_breaker,
+                         response_mode, stream_threshold)
+        self.transport = transport if transport is not None \
+            else RequestsTransport()
+        self._keepalive = None
 
     def make_call(self,
                   method,
@@ -85,7 +340,7 @@ class SyncConnection(BaseConnection):
                   params=None):
         """
         Make an authenticated synchronous HTTP call to the Emarsys api using
-        the requests library.
+        the connection's transport.
         :param method: HTTP method.
         :param endpoint: Emarsys' api endpoint.
         :param headers: HTTP headers.
@@ -93,40 +348,298 @@ class SyncConnection(BaseConnection):
         :param params: HTTP params.
         :return: Dictionary with the result of the query.
         """
-        if not payload:
-            payload = {}
+        url, headers, data, params, call = self.prepare_call(
+            method,
+            endpoint,
+            headers,
+            payload,
+            params
+        )
+        self.on_request_start(call)
+        try:
+            response = self.transport.send(method, url, headers, data, params)
+            result = self.handle_response(call, response)
+        except Exception as err:
+            self.on_error(call, err)
+            raise
+        except BaseException:
+            self.on_cancel(call)
+            raise
+        self.on_request_end(call)
+        return result
 
-        if not params:
-            params = {}
+    def execute(self,
+                specs,
+                concurrency=1,
+                ordered=False,
+                return_exceptions=False,
+                aggregate=None):
+        """
+        Execute a list of RequestSpecs. Identical idempotent specs are only
+        sent once.
+        :param specs: Iterable of RequestSpec objects.
+        :param concurrency: Number of threads sending calls at the same time.
+        :param ordered: When True, non-idempotent specs are sent one after the
+        other in submission order.
+        :param return_exceptions: When True, exceptions are returned in place
+        of the results of the failed specs instead of being raised.
+        :param aggregate: Function applied to the list of results.
+        :return: List of results in submission order, or their aggregate.
+        """
+        plan = ExecutionPlan(specs, ordered)
+        results = {}
+        if concurrency <= 1 or len(plan.lanes) <= 1:
+            for lane in plan.lanes:
+                self._run_lane(plan, lane, results, return_exceptions)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for future in [executor.submit(self._run_lane, plan, lane,
+                                               results, return_exceptions)
+                               for lane in plan.lanes]:
+                    future.result()
+        return plan.results(results, aggregate)
 
-        url = urljoin(self.uri, endpoint)
-        headers = self.build_headers(headers)
-        response = requests.request(
+    def iter_execute(self, specs, concurrency=1, flatten=False):
+        """
+        Execute RequestSpecs, yielding their results as they complete
+        instead of waiting for all of them. The first failed spec stops the
+        iteration and cancels the specs not sent yet.
+        :param specs: Iterable of RequestSpec objects.
+        :param concurrency: Number of threads sending calls at the same time.
+        :param flatten: Yield the items of every result instead of the
+        results, e.g. the records of paged or chunked calls.
+        :return: Generator of results in completion order.
+        """
+        if concurrency <= 1:
+            for spec in specs:
+                result = self.run(spec)
+                if flatten:
+                    yield from result
+                else:
+                    yield result
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self.run, spec) for spec in specs]
+            try:
+                for future in as_completed(futures):
+                    if flatten:
+                        yield from future.result()
+                    else:
+                        yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def stream(self,
+               method,
+               endpoint,
+               headers=None,
+               payload=None,
+               params=None,
+               chunk_size=DEFAULT_CHUNK_SIZE,
+               decoder=None):
+        """
+        Make an authenticated call whose response, e.g. an export file, is
+        read chunk by chunk instead of being loaded in memory. The call is
+        sent on the first iteration.
+        :param method: HTTP method.
+        :param endpoint: Emarsys' api endpoint.
+        :param headers: HTTP headers.
+        :param payload: HTTP payload.
+        :param params: HTTP params.
+        :param chunk_size: Maximum size of the chunks, in bytes.
+        :param decoder: Optional object turning chunks into items, e.g. rows:
+        its feed method is called with every chunk and its close method at
+        the end, both returning lists of items.
+        :return: Generator of bytes, or of items with a decoder.
+        """
+        url, headers, data, params, call = self.prepare_call(
             method,
-            url,
-            headers=headers,
-            json=payload,
-            params=params
+            endpoint,
+            headers,
+            payload,
+            params
         )
+        self.on_request_start(call)
+        response = None
         try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as err:
-            raise ApiCallError(
-                'Error message: "{}" \n Error details: "{}"'.format(
-                    err,
-                    response.text
-                )
+            response = self.transport.stream(
+                method,
+                url,
+                headers,
+                data,
+                params,
+                chunk_size
+            )
+            call.status = response.status
+            if response.status >= 400:
+                self.handle_response(call, TransportResponse(
+                    response.status,
+                    b''.join(response.chunks),
+                    response.headers,
+                    response.reason
+                ))
+            size = 0
+            for chunk in response.chunks:
+                size += len(chunk)
+                if decoder is None:
+                    yield chunk
+                else:
+                    yield from decoder.feed(chunk)
+            if decoder is not None:
+                yield from decoder.close()
+            call.response_bytes = size
+        except Exception as err:
+            self.on_error(call, err)
+            raise
+        except BaseException:
+            self.on_cancel(call)
+            raise
+        finally:
+            if response is not None:
+                response.close()
+        self.on_request_end(call)
+
+    def download(self,
+                 method,
+                 endpoint,
+                 destination,
+                 headers=None,
+                 payload=None,
+                 params=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Make an authenticated call and write its response to a file chunk by
+        chunk, without loading it in memory.
+        :param destination: Path of the file, or binary file object.
+        :return: Number of bytes written.
+        """
+        with open_destination(destination) as file:
+            size = 0
+            for chunk in self.stream(method, endpoint, headers, payload,
+                                     params, chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        return size
+
+    def paginate(self, page_spec, page_size, prefetch=True):
+        """
+        Iterate over the items of a paginated endpoint. While the items of a
+        page are consumed, the next page is fetched by a background thread.
+        :param page_spec: Function building the RequestSpec of the page
+        starting at a given offset. The spec's result must be the list of
+        items.
+        :param page_size: Number of items per page; a shorter page is the
+        last.
+        :param prefetch: Fetch the next page while the current one is
+        consumed.
+        :return: Generator of items.
+        """
+        offset = 0
+        if not prefetch:
+            while True:
+                items = self.run(page_spec(offset))
+                yield from items
+                if len(items) < page_size:
+                    return
+                offset += page_size
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.run, page_spec(offset))
+            while True:
+                items = future.result()
+                if len(items) < page_size:
+                    yield from items
+                    return
+                offset += page_size
+                future = executor.submit(self.run, page_spec(offset))
+                yield from items
+
+    def warmup(self, connections, keepalive=None):
+        """
+        Open connections to the API in advance and keep them idle in the
+        transport's pool, so that the first calls after a start do not pay
+        for DNS, TCP and TLS.
+        :param connections: Number of connections to open.
+        :param keepalive: If given, interval in seconds at which a
+        background thread warms the connections up again, so that they are
+        not closed by the server during quiet periods.
+        :return: Number of warm-up requests which got a response.
+
+        Examples:
+        >>> connection.warmup(8, keepalive=30)
+        8
+        """
+        warmed = self.transport.warmup(self.uri, connections)
+        if keepalive:
+            self.stop_keepalive()
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self._keep_alive,
+                args=(connections, keepalive, stop),
+                name='pymarsys-keepalive',
+                daemon=True
             )
-        return response.json()
+            self._keepalive = (thread, stop)
+            thread.start()
+        return warmed
+
+    def _keep_alive(self, connections, interval, stop):
+        while not stop.wait(interval):
+            self.transport.warmup(self.uri, connections)
+
+    def stop_keepalive(self):
+        """
+        Stop warming the connections up in the background.
+        """
+        if self._keepalive is not None:
+            thread, stop = self._keepalive
+            self._keepalive = None
+            stop.set()
+            thread.join()
+
+    def close(self):
+        """
+        Close the underlying transport.
+        """
+        self.stop_keepalive()
+        self.transport.close()
 
 
 class AsyncConnection(BaseConnection):
     """
     Asynchronous connection for Ermasys or inherited-from BaseEndpoint objects.
+    By default, calls are made through an aiohttp session; any
+    BaseAsyncTransport object can be given instead. A CircuitBreaker can be
+    given to fail fast on endpoints which keep failing, and a HedgingPolicy
+    to duplicate slow idempotent calls.
+    asyncio is imported by the methods needing it, so that synchronous users
+    do not pay for its import.
     """
-    def __init__(self, username, secret, uri=EMARSYS_URI):
-        super().__init__(username, secret, uri)
-        self.session = aiohttp.ClientSession()
+    def __init__(self,
+                 username,
+                 secret,
+                 uri=EMARSYS_URI,
+                 hooks=None,
+                 transport=None,
+                 circuit_breaker=None,
+                 hedging=None,
+                 response_mode=RESPONSE_JSON,
+                 stream_threshold=None):
+        super().__init__(username, secret, uri, hooks, circuit_breaker,
+                         response_mode, stream_threshold)
+        self.transport = transport if transport is not None \
+            else AiohttpTransport()
+        self.hedging = hedging
+        self._keepalive = None
+
+    @property
+    def session(self):
+        """
+        aiohttp session of the default transport.
+        """
+        return self.transport.session
 
     async def make_call(self,
                         method,
@@ -136,7 +649,7 @@ class AsyncConnection(BaseConnection):
                         params=None):
         """
         Make an authenticated asynchronous HTTP call to the Emarsys api using
-        the aiohttp library.
+        the connection's transport.
         :param method: HTTP method.
         :param endpoint: Emarsys' api endpoint.
         :param headers: HTTP headers.
@@ -144,30 +657,293 @@ class AsyncConnection(BaseConnection):
         :param params : HTTP params.
         :return: Coroutine with the result of the query.
         """
-        if not payload:
-            payload = {}
-
-        if not params:
-            params = {}
-
-        url = urljoin(self.uri, endpoint)
-        headers = self.build_headers(headers)
-        async with self.session.request(
+        url, headers, data, params, call = self.prepare_call(
+            method,
+            endpoint,
+            headers,
+            payload,
+            params
+        )
+        self.on_request_start(call)
+        try:
+            response = await self.transport.send(
                 method,
                 url,
-                headers=headers,
-                data=json.dumps(payload),
-                params=params
-        ) as response:
-            try:
-                response.raise_for_status()
-            except aiohttp.ClientError as err:
-                raise ApiCallError(
-                    'Error message: "{}" \n Error details: "{}"'.format(
-                        err,
-                        await response.text()
-                    )
+                headers,
+                data,
+                params
+            )
+            result = self.handle_response(call, response)
+        except Exception as err:
+            self.on_error(call, err)
+            raise
+        except BaseException:
+            self.on_cancel(call)
+            raise
+        self.on_request_end(call)
+        return result
+
+    async def run(self, spec):
+        """
+        Execute a RequestSpec. With a HedgingPolicy, idempotent specs are
+        hedged.
+        :param spec: RequestSpec object.
+        :return: Coroutine with the result of the query, transformed by the
+        spec if needed.
+        """
+        if self.hedging is not None and spec.idempotent:
+            return spec.apply(await self._hedged_call(spec))
+        return spec.apply(await self._spec_call(spec))
+
+    def _spec_call(self, spec):
+        return self.make_call(
+            spec.method,
+            spec.endpoint,
+            headers=spec.headers,
+            payload=spec.payload,
+            params=spec.params
+        )
+
+    async def _hedged_call(self, spec):
+        """
+        Make the call of a spec and, if it is still waiting after the delay
+        given by the hedging policy, a duplicate of it. The first successful
+        response is returned and the other call cancelled.
+        """
+        import asyncio
+
+        policy = self.hedging
+        delay = policy.start(spec.method, spec.endpoint)
+        started = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._spec_call(spec))}
+        error = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and policy.acquire():
+                    tasks.add(asyncio.ensure_future(self._spec_call(spec)))
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks,
+                    return_when=asyncio.FIRST_COMPLETED
                 )
-            if response.headers['Content-Type'] == 'text/json':
-                return await response.json()
-            return json.loads(await response.text())
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    policy.record(spec.method, spec.endpoint,
+                                  time.perf_counter() - started)
+                    return winners[0].result()
+                error = error or next(iter(done)).exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def execute(self,
+                      specs,
+                      concurrency=DEFAULT_ASYNC_CONCURRENCY,
+                      ordered=False,
+                      return_exceptions=False,
+                      aggregate=None):
+        """
+        Execute a list of RequestSpecs concurrently. Identical idempotent
+        specs are only sent once.
+        :param specs: Iterable of RequestSpec objects.
+        :param concurrency: Maximum number of calls in flight.
+        :param ordered: When True, non-idempotent specs are sent one after the
+        other in submission order.
+        :param return_exceptions: When True, exceptions are returned in place
+        of the results of the failed specs instead of being raised.
+        :param aggregate: Function applied to the list of results.
+        :return: Coroutine with the list of results in submission order, or
+        their aggregate.
+        """
+        import asyncio
+
+        plan = ExecutionPlan(specs, ordered)
+        results = {}
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_lane(lane):
+            for index in lane:
+                async with semaphore:
+                    try:
+                        results[index] = await self.run(plan.specs[index])
+                    except Exception as err:
+                        if not return_exceptions:
+                            raise
+                        results[index] = err
+
+        tasks = [asyncio.ensure_future(run_lane(lane)) for lane in plan.lanes]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        return plan.results(results, aggregate)
+
+    def iter_execute(self,
+                     specs,
+                     concurrency=DEFAULT_ASYNC_CONCURRENCY,
+                     flatten=False):
+        """
+        Execute RequestSpecs concurrently, yielding their results as they
+        complete instead of waiting for all of them. The first failed spec
+        stops the iteration and cancels the others.
+        :param specs: Iterable of RequestSpec objects, consumed lazily.
+        :param concurrency: Maximum number of calls in flight.
+        :param flatten: Yield the items of every result instead of the
+        results, e.g. the records of paged or chunked calls.
+        :return: AsyncResults in completion order, to use with `async for`.
+        """
+        return AsyncResults(self, specs, concurrency, flatten)
+
+    def stream(self,
+               method,
+               endpoint,
+               headers=None,
+               payload=None,
+               params=None,
+               chunk_size=DEFAULT_CHUNK_SIZE,
+               decoder=None):
+        """
+        Make an authenticated call whose response, e.g. an export file, is
+        read chunk by chunk instead of being loaded in memory. The call is
+        sent on the first iteration.
+        :param method: HTTP method.
+        :param endpoint: Emarsys' api endpoint.
+        :param headers: HTTP headers.
+        :param payload: HTTP payload.
+        :param params: HTTP params.
+        :param chunk_size: Maximum size of the chunks, in bytes.
+        :param decoder: Optional object turning chunks into items, e.g. rows:
+        its feed method is called with every chunk and its close method at
+        the end, both returning lists of items.
+        :return: AsyncStream of bytes, or of items with a decoder, to use
+        with `async for`.
+        """
+        url, headers, data, params, call = self.prepare_call(
+            method,
+            endpoint,
+            headers,
+            payload,
+            params
+        )
+        return AsyncStream(self, (url, headers, data, params), call,
+                           chunk_size, decoder)
+
+    async def download(self,
+                       method,
+                       endpoint,
+                       destination,
+                       headers=None,
+                       payload=None,
+                       params=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Make an authenticated call and write its response to a file chunk by
+        chunk, without loading it in memory.
+        :param destination: Path of the file, or binary file object.
+        :return: Coroutine with the number of bytes written.
+        """
+        with open_destination(destination) as file:
+            size = 0
+            async for chunk in self.stream(method, endpoint, headers,
+                                           payload, params, chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        return size
+
+    def paginate(self, page_spec, page_size, prefetch=True):
+        """
+        Iterate asynchronously over the items of a paginated endpoint. While
+        the items of a page are consumed, the next page is being fetched.
+        :param page_spec: Function building the RequestSpec of the page
+        starting at a given offset. The spec's result must be the list of
+        items.
+        :param page_size: Number of items per page; a shorter page is the
+        last.
+        :param prefetch: Fetch the next page while the current one is
+        consumed.
+        :return: AsyncPageIterator, to use with `async for`.
+        """
+        return AsyncPageIterator(self, page_spec, page_size, prefetch)
+
+    async def drive(self, plan, concurrency=DEFAULT_ASYNC_CONCURRENCY):
+        """
+        Run a plan: a generator yielding RequestSpecs, or lists of
+        RequestSpecs, and receiving their results. Lists are executed
+        concurrently with execute(), with exceptions in place of the results
+        of failed specs; the exception of a single spec is thrown into the
+        generator. A plan can also yield a Delay to wait. This lets
+        multi-step algorithms be written once for both connections.
+        :param plan: Generator of RequestSpecs.
+        :param concurrency: Maximum number of calls in flight for lists.
+        :return: Coroutine with the value returned by the plan.
+        """
+        import asyncio
+
+        try:
+            step = next(plan)
+            while True:
+                if isinstance(step, RequestSpec):
+                    try:
+                        result = await self.run(step)
+                    except Exception as err:
+                        step = plan.throw(err)
+                        continue
+                elif isinstance(step, Delay):
+                    await asyncio.sleep(step.seconds)
+                    result = None
+                else:
+                    result = await self.execute(
+                        step,
+                        concurrency=concurrency,
+                        return_exceptions=True
+                    )
+                step = plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def warmup(self, connections, keepalive=None):
+        """
+        Open connections to the API in advance and keep them idle in the
+        transport's pool, see SyncConnection.warmup.
+        :param connections: Number of connections to open.
+        :param keepalive: If given, interval in seconds at which a
+        background task warms the connections up again.
+        :return: Number of warm-up requests which got a response.
+
+        Examples:
+        >>> await connection.warmup(8, keepalive=30)
+        8
+        """
+        import asyncio
+        warmed = await self.transport.warmup(self.uri, connections)
+        if keepalive:
+            self.stop_keepalive()
+            self._keepalive = asyncio.ensure_future(
+                self._keep_alive(connections, keepalive)
+            )
+        return warmed
+
+    async def _keep_alive(self, connections, interval):
+        import asyncio
+        while True:
+            await asyncio.sleep(interval)
+            await self.transport.warmup(self.uri, connections)
+
+    def stop_keepalive(self):
+        """
+        Stop warming the connections up in the background.
+        """
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            self._keepalive = None
+
+    async def close(self):
+        """
+        Close the underlying transport.
+        """
+        self.stop_keepalive()
+        await self.transport.close()
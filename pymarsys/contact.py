@@ -1,4 +1,62 @@
+import datetime
+
 from .base_endpoint import BaseEndpoint
+from .bulk_write import (
+    BULK_CHUNK_SIZE,
+    BULK_RETRIES,
+    BULK_RETRY_DELAY,
+    bulk_write_plan,
+)
+from .result_frame import ResultFrame
+from .utils import chunked
+
+HISTORY_CHUNK_SIZE = 1000
+
+
+def contact_payload(contact, **options):
+    """
+    Build the payload of a single contact call, a copy of the contact
+    dictionary, so that deferred calls are not affected by later changes of
+    the caller's dictionary.
+    :param contact: Key-value pairs of the contact fields.
+    :param options: Options such as key_id or source_id, ignored when empty.
+    :return: Payload dictionary.
+    """
+    options = {key: value for key, value in options.items() if value}
+    payload = dict(contact)
+    payload.update(options)
+    return payload
+
+
+def _parse_date(date):
+    if isinstance(date, datetime.date):
+        return date
+    return datetime.datetime.strptime(date, '%Y-%m-%d').date()
+
+
+def date_windows(start_date, end_date, days):
+    """
+    Split a date range in consecutive windows.
+    :param start_date: First day, yyyy-mm-dd formatted string or date.
+    :param end_date: Last day, yyyy-mm-dd formatted string or date.
+    :param days: Number of days per window.
+    :return: List of (first day, last day) tuples of yyyy-mm-dd strings.
+    """
+    if days < 1:
+        raise ValueError('days should be a positive integer.')
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    step = datetime.timedelta(days=days)
+    windows = []
+    while start <= end:
+        last = min(start + step - datetime.timedelta(days=1), end)
+        windows.append((start.isoformat(), last.isoformat()))
+        start = last + datetime.timedelta(days=1)
+    return windows
+
+
+def _history_records(response):
+    return response.get('data') or []
 
 
 class Contact(BaseEndpoint):
@@ -52,13 +110,9 @@ class Contact(BaseEndpoint):
         ... )
         {'data': {'id': 588585705}, 'replyCode': 0, 'replyText': 'OK'}
         """
-        payload = dict(contact)
-        if key_id:
-            payload['key_id'] = key_id
-        if source_id:
-            payload['source_id'] = source_id
+        payload = contact_payload(contact, key_id=key_id, source_id=source_id)
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             self.endpoint,
             payload=payload
@@ -72,7 +126,7 @@ class Contact(BaseEndpoint):
         :param contacts: A list of key-value pairs which uniquely identify
         the contact fields which will be created for the contact (e.g. a key
         can be the email field ID (3), and its value is the email address of
-        the specific contact).
+        the specific contact), or a ContactBatch.
         :param key_id: Key which identifies the contacts. This can be a field
         id, id or uid. If left empty, the internal ID will be used by default.
         :return: Dictionary with a list of the ids of the created contacts.
@@ -99,7 +153,7 @@ class Contact(BaseEndpoint):
         if key_id:
             payload['key_id'] = key_id
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             self.endpoint,
             payload=payload
@@ -110,7 +164,8 @@ class Contact(BaseEndpoint):
               query_tuple=None,
               limit=None,
               offset=None,
-              exclude_empty=None):
+              exclude_empty=None,
+              columnar=False):
         """
         Generate a list of contacts with values for a specific field. For
         example, field_id 1 returns the first names of all contacts. Both the
@@ -129,6 +184,8 @@ class Contact(BaseEndpoint):
         :param exclude_empty: If set to true, then all contacts with a null
         or empty value in the requested field are not returned. Any value
         except for true will be interpreted as false.
+        :param columnar: If True, return a ResultFrame instead of the decoded
+        response.
         :return: List of contacts.
 
         Examples:
@@ -166,16 +223,18 @@ class Contact(BaseEndpoint):
                 )
             params[query_tuple[0]] = query_tuple[1]
 
-        return self.connection.make_call(
+        return self.make_call(
             'GET',
             query_endpoint,
-            params=params
+            params=params,
+            transform=ResultFrame.from_response if columnar else None
         )
 
     def get_data(self,
                  key_id,
                  key_values,
-                 fields=None):
+                 fields=None,
+                 columnar=False):
         """
         Returns the values of specified fields for contacts. The contacts can
         be specified by using either the internal IDs or by using another
@@ -187,6 +246,8 @@ class Contact(BaseEndpoint):
         :param key_values: List of values of the key_id to look for.
         :param fields: List of fields which defines which system fields to
         include in the output.
+        :param columnar: If True, return a ResultFrame instead of the decoded
+        response.
         :return: Values of specified fields for contacts.
 
         Examples:
@@ -230,10 +291,12 @@ class Contact(BaseEndpoint):
         if fields:
             payload['fields'] = fields
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             query_endpoint,
-            payload=payload
+            payload=payload,
+            idempotent=True,
+            transform=ResultFrame.from_response if columnar else None
         )
 
     def get_history(self,
@@ -300,14 +363,82 @@ class Contact(BaseEndpoint):
             payload['startDate'] = start_date
 
         if end_date:
-            payload['endate'] = end_date
+            payload['endDate'] = end_date
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             query_endpoint,
-            payload=payload
+            payload=payload,
+            idempotent=True
         )
 
+    def iter_history(self,
+                     contacts,
+                     start_date=None,
+                     end_date=None,
+                     chunk_size=HISTORY_CHUNK_SIZE,
+                     window_days=None,
+                     concurrency=None):
+        """
+        Get the email campaign launch data of many contacts. Contact ids are
+        split in chunks and, optionally, the date range in windows; the calls
+        for every chunk and window run concurrently and their launch records
+        are yielded as they arrive, in no particular order.
+
+        :param contacts: Iterable of contact IDs to include.
+        :param start_date: yyyy-mm-dd formatted date string used to filter
+        emails by the date the launch was initiated.
+        :param end_date: yyyy-mm-dd formatted date string used to filter
+        emails by the date the launch completed. Defaults to today when
+        windows are used.
+        :param chunk_size: Maximum number of contacts per call.
+        :param window_days: Number of days per call, the whole range if None.
+        Needs a start_date.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: Generator of launch records with a SyncConnection,
+        asynchronous iterator of launch records with an AsyncConnection, the
+        list of RequestSpecs if the endpoint is deferred.
+
+        Examples:
+        >>> for record in client.contacts.iter_history(
+        ...     contact_ids,
+        ...     start_date='2016-11-01',
+        ...     end_date='2017-01-31',
+        ...     window_days=31,
+        ...     concurrency=8
+        ... ):
+        ...     print(record['contactId'], record['emailId'])
+        589058576 982
+        589058827 4934
+        589058576 1815
+        """
+        if window_days is None:
+            windows = [(start_date, end_date)]
+        elif start_date is None:
+            raise ValueError('window_days needs a start_date.')
+        else:
+            windows = date_windows(
+                start_date,
+                end_date or datetime.date.today(),
+                window_days
+            )
+
+        history = self.defer().get_history
+        specs = []
+        for chunk in chunked(list(contacts), chunk_size):
+            for window_start, window_end in windows:
+                spec = history(chunk, window_start, window_end)
+                spec.transform = _history_records
+                specs.append(spec)
+        if self.deferred:
+            return specs
+
+        options = {}
+        if concurrency is not None:
+            options['concurrency'] = concurrency
+        return self.connection.iter_execute(specs, flatten=True, **options)
+
     def get_internal_id(self,
                         field_id,
                         field_value):
@@ -332,7 +463,7 @@ class Contact(BaseEndpoint):
             field_id: field_value,
         }
 
-        return self.connection.make_call(
+        return self.make_call(
             'GET',
             self.endpoint,
             params=params
@@ -377,10 +508,11 @@ class Contact(BaseEndpoint):
         if accept_duplicated_values:
             payload['get_multiple_ids'] = accept_duplicated_values
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             query_endpoint,
-            payload=payload
+            payload=payload,
+            idempotent=True
         )
 
     def update(self,
@@ -422,13 +554,9 @@ class Contact(BaseEndpoint):
         if upsert is True:
             params['create_if_not_exists'] = 1
 
-        payload = dict(contact)
-        if key_id:
-            payload['key_id'] = key_id
-        if source_id:
-            payload['source_id'] = source_id
+        payload = contact_payload(contact, key_id=key_id, source_id=source_id)
 
-        return self.connection.make_call(
+        return self.make_call(
             'PUT',
             self.endpoint,
             payload=payload,
@@ -453,7 +581,7 @@ class Contact(BaseEndpoint):
         :param contacts: A list of key-value pairs which uniquely identify
         the contact fields which will be created for the contact (e.g. a key
         can be the email field ID (3), and its value is the email address of
-        the specific contact).
+        the specific contact), or a ContactBatch.
         :param source_id: ID assigned to a customer’s external application,
         and is used to identify contacts created or modified by the external
         (3rd party) applications.
@@ -489,13 +617,136 @@ class Contact(BaseEndpoint):
         if source_id:
             payload['source_id'] = source_id
 
-        return self.connection.make_call(
+        return self.make_call(
             'PUT',
             self.endpoint,
             payload=payload,
             params=params
         )
 
+    def bulk_create(self,
+                    contacts,
+                    key_id=None,
+                    chunk_size=BULK_CHUNK_SIZE,
+                    retries=BULK_RETRIES,
+                    retry_delay=BULK_RETRY_DELAY,
+                    concurrency=None,
+                    schema=None):
+        """
+        Create many contacts with create_many calls of at most chunk_size
+        contacts, and report the outcome record by record. A batch rejected
+        as a whole is bisected to isolate the faulty records, unless
+        Emarsys reported their errors, and a batch failing with a transient
+        error is sent again; records already written are never sent twice.
+        A 401, 403 or 404 is raised as an ApiCallError.
+
+        :param contacts: List of contact dictionaries, or ContactBatch.
+        :param key_id: Key which identifies the contacts. If left empty, the
+        email address (field ID 3) is used.
+        :param chunk_size: Maximum number of contacts per call.
+        :param retries: Number of times a batch is sent again after a
+        network, rate limit or server error.
+        :param retry_delay: Delay before the first retry, in seconds, doubled
+        every round.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :param schema: FieldSchema, from ContactField.schema, checking the
+        contacts before they are sent. Invalid contacts are reported in the
+        errors of the result without being sent.
+        :return: BulkWriteResult.
+
+        Examples:
+        >>> result = client.contacts.bulk_create(
+        ...     [
+        ...         {3: 'squirrel1@squirrelmail.com', 1: 'Donald'},
+        ...         {3: 'squirrel2@squirrelmail.com', 4: 'not a date'},
+        ...     ]
+        ... )
+        >>> result.ids
+        {'squirrel1@squirrelmail.com': 589058827}
+        >>> result.errors
+        {'squirrel2@squirrelmail.com': {'2010': 'Invalid date'}}
+        """
+        deferred = self.defer()
+        return self.drive(
+            bulk_write_plan(
+                contacts,
+                lambda batch: deferred.create_many(batch, key_id),
+                key_id or 3,
+                chunk_size,
+                retries,
+                retry_delay,
+                schema
+            ),
+            concurrency=concurrency
+        )
+
+    def bulk_update(self,
+                    key_id,
+                    contacts,
+                    source_id=None,
+                    upsert=False,
+                    chunk_size=BULK_CHUNK_SIZE,
+                    retries=BULK_RETRIES,
+                    retry_delay=BULK_RETRY_DELAY,
+                    concurrency=None,
+                    schema=None):
+        """
+        Update, or upsert, many contacts with update_many calls of at most
+        chunk_size contacts, and report the outcome record by record. A
+        batch rejected as a whole is bisected to isolate the faulty records,
+        unless Emarsys reported their errors, and a batch failing with a
+        transient error is sent again; records already written are never
+        sent twice. A 401, 403 or 404 is raised as an ApiCallError.
+
+        :param key_id: Key which identifies the contacts.
+        :param contacts: List of contact dictionaries, or ContactBatch.
+        :param source_id: ID assigned to a customer’s external application.
+        :param upsert: When True, contacts which do not exist are created.
+        :param chunk_size: Maximum number of contacts per call.
+        :param retries: Number of times a batch is sent again after a
+        network, rate limit or server error.
+        :param retry_delay: Delay before the first retry, in seconds, doubled
+        every round.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :param schema: FieldSchema, from ContactField.schema, checking the
+        contacts before they are sent. Invalid contacts are reported in the
+        errors of the result without being sent.
+        :return: BulkWriteResult.
+
+        Examples:
+        >>> result = client.contacts.bulk_update(
+        ...     3,
+        ...     [
+        ...         {3: 'squirrel1@squirrelmail.com', 31: 2},
+        ...         {3: 'unknown@squirrelmail.com', 31: 2},
+        ...     ]
+        ... )
+        >>> result.ids
+        {'squirrel1@squirrelmail.com': '589058827'}
+        >>> result.errors
+        {
+            'unknown@squirrelmail.com': {
+                '2008': 'No contact found with the external id: 3'
+            }
+        }
+        """
+        deferred = self.defer()
+        return self.drive(
+            bulk_write_plan(
+                contacts,
+                lambda batch: deferred.update_many(key_id, batch, source_id,
+                                                   upsert),
+                key_id,
+                chunk_size,
+                retries,
+                retry_delay,
+                schema
+            ),
+            concurrency=concurrency
+        )
+
     def delete(self,
                contact,
                key_id=None):
@@ -518,12 +769,9 @@ class Contact(BaseEndpoint):
         {'data': '', 'replyCode': 0, 'replyText': 'OK'}
         """
         query_endpoint = '{}/{}/'.format(self.endpoint, 'delete')
-        payload = dict(contact)
-
-        if key_id:
-            payload['key_id'] = key_id
+        payload = contact_payload(contact, key_id=key_id)
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             query_endpoint,
             payload=payload
@@ -0,0 +1,184 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+from .encoding import JSONFragment
+
+
+class _Skip:
+    def __repr__(self):
+        return 'SKIP'
+
+
+SKIP = _Skip()
+"""
+Value of a field which should not be sent for a contact. None is sent as
+null, which empties the field.
+"""
+
+
+class ContactBatch(JSONFragment):
+    """
+    Compact, columnar list of contacts for bulk writes. Field ids are stored
+    once and values column by column, so a batch costs one list per field
+    instead of one dictionary per contact. It is encoded straight into the
+    Emarsys JSON payload, without building intermediate dictionaries.
+
+    Usage example:
+        >>> batch = ContactBatch([3, 1, 31])
+        >>> batch.append('squirrel1@squirrelmail.com', 'Donald', 1)
+        >>> batch.append('squirrel2@squirrelmail.com', 'Barack', SKIP)
+        >>> client.contacts.update_many(3, batch)
+        {
+            'data': {'ids': ['589058827', '589058576']},
+            'replyCode': 0,
+            'replyText': 'OK'
+        }
+
+    :param field_ids: Ids of the fields of the contacts.
+    :param columns: Optional sequences of values, one per field.
+    """
+    __slots__ = ('field_ids', 'columns', '_encoded_keys')
+
+    def __init__(self, field_ids, columns=None):
+        self.field_ids = tuple(str(field_id) for field_id in field_ids)
+        if columns is None:
+            columns = [[] for _ in self.field_ids]
+        else:
+            columns = [list(column) for column in columns]
+            if len(columns) != len(self.field_ids):
+                raise ValueError('There should be one column per field id.')
+            if len({len(column) for column in columns}) > 1:
+                raise ValueError('All columns should have the same length.')
+        self.columns = columns
+        self._encoded_keys = tuple(
+            encode_basestring_ascii(field_id) + ':'
+            for field_id in self.field_ids
+        )
+
+    @classmethod
+    def from_rows(cls, field_ids, rows):
+        """
+        Build a batch from rows of values ordered like field_ids.
+        """
+        batch = cls(field_ids)
+        batch.extend(rows)
+        return batch
+
+    @classmethod
+    def from_dicts(cls, contacts):
+        """
+        Build a batch from a list of contact dictionaries. Fields missing from
+        a contact are SKIPped.
+        """
+        field_ids = []
+        for contact in contacts:
+            for field_id in contact:
+                if field_id not in field_ids:
+                    field_ids.append(field_id)
+        return cls.from_rows(
+            field_ids,
+            ([contact.get(field_id, SKIP) for field_id in field_ids]
+             for contact in contacts)
+        )
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __repr__(self):
+        return '<ContactBatch of {} contacts with fields {}>'.format(
+            len(self),
+            ', '.join(self.field_ids)
+        )
+
+    def append(self, *values):
+        """
+        Add a contact, its values ordered like the batch's field ids.
+        """
+        if len(values) != len(self.columns):
+            raise ValueError('Expected {} values, got {}.'.format(
+                len(self.columns),
+                len(values)
+            ))
+        for column, value in zip(self.columns, values):
+            column.append(value)
+
+    def extend(self, rows):
+        """
+        Add several contacts.
+        """
+        for row in rows:
+            self.append(*row)
+
+    def column(self, field_id):
+        """
+        :return: Values of a field for all the contacts.
+        """
+        return self.columns[self.field_ids.index(str(field_id))]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            batch = ContactBatch.__new__(ContactBatch)
+            batch.field_ids = self.field_ids
+            batch.columns = [column[index] for column in self.columns]
+            batch._encoded_keys = self._encoded_keys
+            return batch
+        return {
+            field_id: column[index]
+            for field_id, column in zip(self.field_ids, self.columns)
+            if column[index] is not SKIP
+        }
+
+    def __iter__(self):
+        """
+        Iterate over the contacts as dictionaries, for compatibility with
+        code expecting lists of dictionaries.
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def chunks(self, size):
+        """
+        Split the batch in batches of at most `size` contacts, sharing the
+        same values.
+        """
+        for start in range(0, len(self), size):
+            yield self[start:start + size]
+
+    def _encode_column(self, key, column):
+        dumps = json.dumps
+        return [
+            '' if value is SKIP else key + (
+                encode_basestring_ascii(value) if value.__class__ is str
+                else dumps(value)
+            )
+            for value in column
+        ]
+
+    def iter_json(self):
+        """
+        Encode the contacts one by one. Values are encoded column by column,
+        which is cheaper than encoding them contact by contact.
+        :return: Generator of JSON encoded contacts.
+        """
+        encoded_columns = [
+            self._encode_column(key, column)
+            for key, column in zip(self._encoded_keys, self.columns)
+        ]
+        for row in zip(*encoded_columns):
+            yield '{' + ','.join(filter(None, row)) + '}'
+
+    def to_json(self):
+        return '[' + ','.join(self.iter_json()) + ']'
+
+    def iter_json_parts(self, rows=1000):
+        """
+        Encode the contacts for a streamed payload, `rows` contacts at a
+        time, so that only a slice of the batch is encoded at once.
+        :return: Generator of JSON encoded strings.
+        """
+        separator = '['
+        for chunk in self.chunks(rows):
+            for contact in chunk.iter_json():
+                yield separator + contact
+                separator = ','
+        yield '[]' if separator == '[' else ']'
@@ -1,4 +1,9 @@
 from .base_endpoint import BaseEndpoint
+from .utils import TTLCache
+from .validation import CHOICE_TYPES, FieldSchema
+
+LAST_CHANGE_CACHE_TTL = 300
+SCHEMA_CACHE_TTL = 3600
 
 
 class ContactField(BaseEndpoint):
@@ -22,9 +27,18 @@ class ContactField(BaseEndpoint):
     >>> contact_fields = ContactField(connection)
     >>> contact_fields
     <pymarsys.contact_field.ContactField at 0x10cd8db70>
+
+    The results of last_change_many are cached for last_change_ttl seconds,
+    and the schema for schema_ttl seconds.
     """
-    def __init__(self, connection, endpoint='api/v2/field/'):
+    def __init__(self,
+                 connection,
+                 endpoint='api/v2/field/',
+                 last_change_ttl=LAST_CHANGE_CACHE_TTL,
+                 schema_ttl=SCHEMA_CACHE_TTL):
         super().__init__(connection, endpoint)
+        self.last_change_cache = TTLCache(last_change_ttl)
+        self.schema_cache = TTLCache(schema_ttl)
 
     def create(self, name, application_type, string_id=None):
         """
@@ -65,7 +79,7 @@ class ContactField(BaseEndpoint):
         if string_id:
             payload['string_id'] = string_id
 
-        return self.connection.make_call(
+        return self.make_call(
             'POST',
             self.endpoint,
             payload=payload
@@ -113,7 +127,7 @@ class ContactField(BaseEndpoint):
         else:
             query_endpoint = str(self.endpoint)
 
-        return self.connection.make_call(
+        return self.make_call(
             'GET',
             query_endpoint
         )
@@ -150,7 +164,7 @@ class ContactField(BaseEndpoint):
                 translate_id
             )
 
-        return self.connection.make_call(
+        return self.make_call(
             'GET',
             query_endpoint
         )
@@ -192,8 +206,123 @@ class ContactField(BaseEndpoint):
             'field_id': field_id,
         }
 
-        return self.connection.make_call(
+        return self.make_call(
             'GET',
             query_endpoint,
             params=params
         )
+
+    def last_change_many(self,
+                         key_id,
+                         key_values,
+                         field_ids,
+                         concurrency=None,
+                         use_cache=True):
+        """
+        Get the latest change of several fields for many contacts, with one
+        last_change call per contact and field running concurrently. Failed
+        calls do not abort the others, and results are cached for a short
+        time so that repeated audits do not query them again.
+
+        :param key_id: Key which identifies the contacts. This can be a field
+        ID, ID, UID or EID.
+        :param key_values: Key field values of the contacts.
+        :param field_ids: Field IDs, or a single field ID.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :param use_cache: Whether to use and fill the cache.
+        :return: Dictionary with the changes and the errors, keyed by
+        (key value, field id) tuples.
+
+        Examples:
+        >>> client.contact_fields.last_change_many(
+        ...     3,
+        ...     ['squirrel@squirrelmail.com', 'squirrel2@squirrelmail.com'],
+        ...     31
+        ... )
+        {
+            'changes': {
+                ('squirrel@squirrelmail.com', 31): {
+                    'current_value': '1',
+                    'old_value': '2',
+                    'time': '2017-01-17 14:46:28'
+                }
+            },
+            'errors': {
+                ('squirrel2@squirrelmail.com', 31): 'Error message: ...'
+            }
+        }
+        """
+        if isinstance(field_ids, (int, str)):
+            field_ids = [field_ids]
+        else:
+            field_ids = list(field_ids)
+        lookups = dict.fromkeys(
+            (key_value, field_id)
+            for key_value in key_values
+            for field_id in field_ids
+        )
+
+        cache = self.last_change_cache
+        changes = {}
+        missing = []
+        for lookup in lookups:
+            change = cache.get((key_id,) + lookup) if use_cache else None
+            if change is None:
+                missing.append(lookup)
+            else:
+                changes[lookup] = change
+
+        def aggregate(results):
+            errors = {}
+            for lookup, result in zip(missing, results):
+                if isinstance(result, Exception):
+                    errors[lookup] = str(result)
+                    continue
+                changes[lookup] = result['data']
+                if use_cache:
+                    cache.set((key_id,) + lookup, result['data'])
+            return {'changes': changes, 'errors': errors}
+
+        deferred = self.defer()
+        specs = [
+            deferred.last_change(key_id, key_value, field_id)
+            for key_value, field_id in missing
+        ]
+        return self.make_calls(specs, aggregate, concurrency)
+
+    def schema(self, use_cache=True):
+        """
+        Get the types of the contact fields and the choices of the choice
+        fields, to check contacts before sending them. The choices of all
+        the choice fields are listed concurrently.
+
+        :param use_cache: Whether to use and fill the cache.
+        :return: FieldSchema.
+
+        Examples:
+        >>> schema = client.contact_fields.schema()
+        >>> client.contacts.bulk_update(3, contacts, schema=schema)
+        <BulkWriteResult 998 written, 2 failed in 1 calls>
+        """
+        return self.drive(self._schema_plan(use_cache))
+
+    def _schema_plan(self, use_cache):
+        schema = self.schema_cache.get(self.endpoint) if use_cache else None
+        if schema is not None:
+            return schema
+        deferred = self.defer()
+        fields = (yield deferred.list())['data']
+        choice_fields = [field['id'] for field in fields
+                         if field['application_type'] in CHOICE_TYPES]
+        results = yield [deferred.list_choice(field_id)
+                         for field_id in choice_fields]
+        choices = {}
+        for field_id, result in zip(choice_fields, results):
+            if isinstance(result, Exception):
+                raise result
+            choices[field_id] = [choice['id'] for choice in result['data']]
+        schema = FieldSchema(fields, choices)
+        if use_cache:
+            self.schema_cache.set(self.endpoint, schema)
+        return schema
@@ -1,4 +1,64 @@
 from .base_endpoint import BaseEndpoint
+from .request_spec import RequestSpec
+from .utils import chunked
+
+MAX_CONTACTS_PER_CALL = 10000
+MEMBERS_PAGE_SIZE = 10000
+# replyCode reported for failed calls that carry no Emarsys replyCode, e.g.
+# transport errors or HTTP errors without a JSON body. Emarsys codes are
+# never negative.
+CALL_FAILED_REPLY_CODE = -1
+
+
+def merge_chunk_results(chunks, results, counter, raise_on_failure=True):
+    """
+    Aggregate the responses of calls made for chunks of external ids.
+    :param chunks: List of chunks of external ids.
+    :param results: List of responses, or exceptions for the failed calls.
+    :param counter: Key of the data counter to sum, e.g. inserted_contacts.
+    :param raise_on_failure: Whether to raise when all the calls failed,
+    instead of reporting their errors like for partial failures.
+    :return: Response-like dictionary with the summed counter and the errors
+    of every chunk, indexed by external id. The external ids of failed calls
+    are reported with the error of the call, and the replyCode is then the
+    one of the first failed call, CALL_FAILED_REPLY_CODE if it had none.
+    :raise: The error of the first call if all the calls failed and
+    raise_on_failure is set.
+    """
+    failures = [result for result in results if isinstance(result, Exception)]
+    if raise_on_failure and chunks and len(failures) == len(chunks):
+        raise failures[0]
+    reply_code, reply_text = 0, "OK"
+    if failures:
+        reply_code = getattr(failures[0], "reply_code", None)
+        if reply_code is None:
+            reply_code = CALL_FAILED_REPLY_CODE
+        reply_text = "{} of {} calls failed.".format(len(failures),
+                                                     len(chunks))
+    count = 0
+    errors = {}
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            for external_id in chunk:
+                errors[str(external_id)] = {"call_error": str(result)}
+            continue
+        data = result.get("data") or {}
+        count += int(data.get(counter) or 0)
+        chunk_errors = data.get("errors") or {}
+        if isinstance(chunk_errors, dict):
+            errors.update(chunk_errors)
+        else:
+            for error in chunk_errors:
+                errors[str(error.get("key", len(errors)))] = error
+    return {
+        "data": {counter: count, "errors": errors},
+        "replyCode": reply_code,
+        "replyText": reply_text,
+    }
+
+
+def _page_items(response):
+    return response.get("data") or []
 
 
 class ContactList(BaseEndpoint):
@@ -11,7 +71,7 @@ class ContactList(BaseEndpoint):
     >>> from pymarsys import SyncConnection, Emarsys
     >>> connection = SyncConnection('username', 'password')
     >>> client = Emarsys(connection)
-    >>> client.contact_list
+    >>> client.contact_lists
     <pymarsys.contact_list.ContactList at 0x1050f7048>
 
     If you want to use contact lists' methods trough an instance of the ContactList
@@ -41,7 +101,10 @@ class ContactList(BaseEndpoint):
 .
         Examples:
         If you want to create a list which name is test_list and assign squirrel@squirrelmail.com to this list:
-        >>> client.lists.create("test_list", ['squirrel@squirrelmail.com',])
+        >>> client.contact_lists.create(
+        ...     "test_list",
+        ...     with_contacts_ids=['squirrel@squirrelmail.com']
+        ... )
         {'data': {'id': 123}, 'replyCode': 0, 'replyText': 'OK'}
         """
         payload = {
@@ -51,11 +114,18 @@ class ContactList(BaseEndpoint):
             "external_ids": with_contacts_ids,
         }
 
-        return self.connection.make_call("POST", self.endpoint, payload=payload)
+        return self.make_call("POST", self.endpoint, payload=payload)
 
-    def add_contacts(self, list_id, contacts_ids, key_id=3):
+    def add_contacts(self,
+                     list_id,
+                     contacts_ids,
+                     key_id=3,
+                     chunk_size=MAX_CONTACTS_PER_CALL,
+                     concurrency=None):
         """
-        Add multiple contacts to an existing list.
+        Add multiple contacts to an existing list. Lists of more than
+        chunk_size ids are split into several calls, sent concurrently on
+        asynchronous connections, and their results are aggregated.
         https://dev.emarsys.com/v2/contact-lists/add-contacts-to-a-contact-list
 
         :param list_id: Identifier of the list you want to add a contact to.
@@ -63,15 +133,229 @@ class ContactList(BaseEndpoint):
         :param key_id: Key which identifies the contact. This can be a field
         id, id, uid or eid. If left empty, the email address (field ID 3) will
         be used by default.
-        :return: The API response payload.
+        :param chunk_size: Maximum number of ids sent per call.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: The API response payload. When several calls were made,
+        inserted_contacts is their sum and errors are indexed by id. If they
+        all failed, the error of the first one is raised.
 
         Examples:
         If you want to add two squirrel1@squirrelmail.com to the list test_list:
-        >>> client.contact_list.add('test_list', ['squirrel1@squirrelmail.com',])
-        {'data': {'inserted_contacts': 123}, 'replyCode': 0, 'replyText': 'OK'}
+        >>> client.contact_lists.add_contacts(123, ['squirrel1@squirrelmail.com',])
+        {'data': {'inserted_contacts': 1}, 'replyCode': 0, 'replyText': 'OK'}
         """
+        endpoint = "{}{}/add/".format(self.endpoint, list_id)
+        return self._chunked_call(
+            endpoint,
+            contacts_ids,
+            key_id,
+            chunk_size,
+            concurrency,
+            "inserted_contacts",
+        )
 
-        payload = {"key_id": key_id, "external_ids": contacts_ids}
+    def remove_contacts(self,
+                        list_id,
+                        contacts_ids,
+                        key_id=3,
+                        chunk_size=MAX_CONTACTS_PER_CALL,
+                        concurrency=None):
+        """
+        Remove multiple contacts from an existing list. Lists of more than
+        chunk_size ids are split into several calls, sent concurrently on
+        asynchronous connections, and their results are aggregated.
+        https://dev.emarsys.com/v2/contact-lists/remove-contacts-from-a-contact-list
 
-        endpoint = "{}{}/add/".format(self.endpoint, list_id)
-        return self.connection.make_call("POST", endpoint, payload=payload)
+        :param list_id: Identifier of the list you want to remove contacts
+        from.
+        :param contacts_ids: List of contact identifiers to remove.
+        :param key_id: Key which identifies the contact. This can be a field
+        id, id, uid or eid. If left empty, the email address (field ID 3) will
+        be used by default.
+        :param chunk_size: Maximum number of ids sent per call.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: The API response payload. When several calls were made,
+        deleted_contacts is their sum and errors are indexed by id. If they all
+        failed, the error of the first one is raised.
+
+        Examples:
+        If you want to remove squirrel1@squirrelmail.com from the list 123:
+        >>> client.contact_lists.remove_contacts(123, ['squirrel1@squirrelmail.com'])
+        {'data': {'deleted_contacts': 1}, 'replyCode': 0, 'replyText': 'OK'}
+        """
+        endpoint = "{}{}/delete/".format(self.endpoint, list_id)
+        return self._chunked_call(
+            endpoint,
+            contacts_ids,
+            key_id,
+            chunk_size,
+            concurrency,
+            "deleted_contacts",
+        )
+
+    def list_members(self, list_id, limit=MEMBERS_PAGE_SIZE, offset=0):
+        """
+        Returns one page of the internal ids of the contacts of a list.
+        https://dev.emarsys.com/v2/contact-lists/list-contacts-in-a-contact-list
+
+        :param list_id: Identifier of the list.
+        :param limit: Maximum number of ids to return.
+        :param offset: Number of ids to skip, for pagination.
+        :return: The API response payload.
+
+        Examples:
+        >>> client.contact_lists.list_members(123, limit=2)
+        {'data': ['589058827', '589058576'], 'replyCode': 0, 'replyText': 'OK'}
+        """
+        endpoint = "{}{}/contacts/".format(self.endpoint, list_id)
+        params = {"limit": limit, "offset": offset}
+        return self.make_call("GET", endpoint, params=params)
+
+    def iter_members(self, list_id, page_size=MEMBERS_PAGE_SIZE, prefetch=True):
+        """
+        Iterate over the internal ids of the contacts of a list, page by
+        page, without loading the whole membership in memory. The next page
+        is fetched while the current one is consumed.
+
+        :param list_id: Identifier of the list.
+        :param page_size: Number of ids fetched per call.
+        :param prefetch: Fetch the next page while the current one is
+        consumed.
+        :return: Generator of ids with a SyncConnection, asynchronous
+        iterator of ids with an AsyncConnection.
+
+        Examples:
+        >>> for contact_id in client.contact_lists.iter_members(123):
+        ...     print(contact_id)
+        589058827
+        589058576
+
+        >>> async for contact_id in client.contact_lists.iter_members(123):
+        ...     print(contact_id)
+        """
+        members = self.defer()
+
+        def page_spec(offset):
+            spec = members.list_members(list_id, page_size, offset)
+            spec.transform = _page_items
+            return spec
+
+        return self.connection.paginate(page_spec, page_size, prefetch)
+
+    def sync_members(self,
+                     list_id,
+                     desired_ids,
+                     page_size=MEMBERS_PAGE_SIZE,
+                     chunk_size=MAX_CONTACTS_PER_CALL,
+                     concurrency=None):
+        """
+        Make the members of a list exactly desired_ids. The current members
+        are read page by page and compared locally with desired_ids, then
+        only the missing contacts are added and the extra ones removed, in
+        chunks sent concurrently on asynchronous connections.
+
+        :param list_id: Identifier of the list.
+        :param desired_ids: Iterable of the internal ids of the contacts
+        which should be in the list.
+        :param page_size: Number of members read per call.
+        :param chunk_size: Maximum number of ids sent per add or remove call.
+        :param concurrency: Maximum number of calls in flight, the
+        connection's default if None.
+        :return: Response-like dictionary with the number of inserted and
+        deleted contacts, and the errors indexed by id.
+
+        Examples:
+        >>> client.contact_lists.sync_members(123, [589058827, 589058576])
+        {
+            'data': {'deleted_contacts': 1, 'errors': {}, 'inserted_contacts': 1},
+            'replyCode': 0,
+            'replyText': 'OK'
+        }
+        """
+        return self.drive(
+            self._sync_members_plan(list_id, desired_ids, page_size, chunk_size),
+            concurrency=concurrency,
+        )
+
+    def _sync_members_plan(self, list_id, desired_ids, page_size, chunk_size):
+        missing = {str(contact_id) for contact_id in desired_ids}
+        extra = []
+        offset = 0
+        members = self.defer()
+        while True:
+            page = yield members.list_members(list_id, page_size, offset)
+            contacts_ids = page.get("data") or []
+            for contact_id in contacts_ids:
+                contact_id = str(contact_id)
+                if contact_id in missing:
+                    missing.discard(contact_id)
+                else:
+                    extra.append(contact_id)
+            if len(contacts_ids) < page_size:
+                break
+            offset += page_size
+
+        add_chunks = list(chunked(sorted(missing), chunk_size))
+        remove_chunks = list(chunked(extra, chunk_size))
+        specs = [
+            RequestSpec(
+                "POST",
+                "{}{}/{}/".format(self.endpoint, list_id, action),
+                payload={"key_id": "id", "external_ids": chunk},
+            )
+            for action, chunks in (("add", add_chunks), ("delete", remove_chunks))
+            for chunk in chunks
+        ]
+        results = (yield specs) if specs else []
+
+        # The calls of both kinds run together, so a failure of all the adds
+        # may come with successful deletes: report it rather than raising.
+        added = merge_chunk_results(
+            add_chunks, results[:len(add_chunks)], "inserted_contacts",
+            raise_on_failure=False
+        )
+        removed = merge_chunk_results(
+            remove_chunks, results[len(add_chunks):], "deleted_contacts",
+            raise_on_failure=False
+        )
+        errors = added["data"]["errors"]
+        errors.update(removed["data"]["errors"])
+        reply = added if added["replyCode"] != 0 else removed
+        return {
+            "data": {
+                "inserted_contacts": added["data"]["inserted_contacts"],
+                "deleted_contacts": removed["data"]["deleted_contacts"],
+                "errors": errors,
+            },
+            "replyCode": reply["replyCode"],
+            "replyText": reply["replyText"],
+        }
+
+    def _chunked_call(self,
+                      endpoint,
+                      contacts_ids,
+                      key_id,
+                      chunk_size,
+                      concurrency,
+                      counter):
+        chunks = list(chunked(contacts_ids, chunk_size))
+        if len(chunks) <= 1:
+            payload = {"key_id": key_id,
+                       "external_ids": chunks[0] if chunks else []}
+            return self.make_call("POST", endpoint, payload=payload)
+
+        specs = [
+            RequestSpec(
+                "POST",
+                endpoint,
+                payload={"key_id": key_id, "external_ids": chunk},
+            )
+            for chunk in chunks
+        ]
+        return self.make_calls(
+            specs,
+            lambda results: merge_chunk_results(chunks, results, counter),
+            concurrency=concurrency,
+        )
@@ -1,5 +1,7 @@
 from .contact import Contact
 from .contact_field import ContactField
+from .contact_list import ContactList
+from .export import Export
 
 
 class Emarsys:
@@ -16,3 +18,5 @@ class Emarsys:
         self.connection = connection
         self.contacts = Contact(self.connection)
         self.contact_fields = ContactField(self.connection)
+        self.contact_lists = ContactList(self.connection)
+        self.exports = Export(self.connection)
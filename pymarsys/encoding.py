@@ -0,0 +1,140 @@
+from abc import ABC, abstractmethod
+import json
+
+
+class JSONFragment(ABC):
+    """
+    Base class for payload values which know how to encode themselves.
+    They are spliced as is into the JSON payload of a call, instead of being
+    converted to dictionaries and lists first.
+    """
+    @abstractmethod
+    def to_json(self):
+        """
+        :return: JSON encoded string.
+        """
+
+    def iter_json_parts(self):
+        """
+        Encode the value piece by piece, for streamed payloads. Fragments
+        which cannot do better yield their whole encoding at once.
+        :return: Generator of JSON encoded strings.
+        """
+        yield self.to_json()
+
+
+def encode_payload(payload):
+    """
+    Encode the payload of a call to JSON, splicing the JSONFragment values
+    of a dictionary payload.
+    :param payload: HTTP payload.
+    :return: JSON encoded string.
+    """
+    if isinstance(payload, JSONFragment):
+        return payload.to_json()
+    if not isinstance(payload, dict) or not any(
+            isinstance(value, JSONFragment) for value in payload.values()
+    ):
+        return json.dumps(payload)
+    return '{' + ', '.join(
+        '{}: {}'.format(
+            json.dumps(str(key)),
+            value.to_json() if isinstance(value, JSONFragment)
+            else json.dumps(value)
+        )
+        for key, value in payload.items()
+    ) + '}'
+
+
+DEFAULT_BODY_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_value(value):
+    if isinstance(value, JSONFragment):
+        yield from value.iter_json_parts()
+    elif isinstance(value, list):
+        separator = '['
+        for item in value:
+            yield separator
+            yield json.dumps(item)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+    else:
+        yield json.dumps(value)
+
+
+def iter_payload(payload):
+    """
+    Encode the payload of a call to JSON piece by piece: lists and
+    JSONFragments of a dictionary payload are encoded item by item.
+    Joined, the pieces are equivalent to encode_payload(payload).
+    :param payload: HTTP payload.
+    :return: Generator of JSON encoded strings.
+    """
+    if not isinstance(payload, dict):
+        yield from _iter_value(payload)
+        return
+    separator = '{'
+    for key, value in payload.items():
+        yield separator + json.dumps(str(key)) + ': '
+        yield from _iter_value(value)
+        separator = ', '
+    yield '{}' if separator == '{' else '}'
+
+
+def payload_items(payload):
+    """
+    :return: Number of items of the largest list or sized JSONFragment of a
+    payload, the payload itself or one of the values of a dictionary.
+    """
+    values = payload.values() if isinstance(payload, dict) else [payload]
+    return max(
+        (len(value) for value in values
+         if isinstance(value, list) or (isinstance(value, JSONFragment)
+                                        and hasattr(value, '__len__'))),
+        default=0
+    )
+
+
+class StreamedBody:
+    """
+    Body of a call encoded while it is sent, in chunks of about chunk_size
+    bytes, instead of being built as one string first. Transports send it
+    with chunked transfer encoding. Every iteration encodes the payload
+    again, so that the call can be sent again.
+    :param payload: HTTP payload.
+    :param chunk_size: Approximate size of the chunks, in bytes.
+    :param call: CallInfo of the call, whose request_bytes are set once the
+    body is sent.
+    """
+    __slots__ = ('payload', 'chunk_size', 'call')
+
+    def __init__(self, payload, chunk_size=DEFAULT_BODY_CHUNK_SIZE, call=None):
+        self.payload = payload
+        self.chunk_size = chunk_size
+        self.call = call
+
+    def __repr__(self):
+        return '<StreamedBody of {} items>'.format(
+            payload_items(self.payload)
+        )
+
+    def __iter__(self):
+        parts = []
+        buffered = 0
+        size = 0
+        for part in iter_payload(self.payload):
+            parts.append(part)
+            buffered += len(part)
+            if buffered >= self.chunk_size:
+                chunk = ''.join(parts).encode('utf-8')
+                size += len(chunk)
+                yield chunk
+                parts = []
+                buffered = 0
+        if parts:
+            chunk = ''.join(parts).encode('utf-8')
+            size += len(chunk)
+            yield chunk
+        if self.call is not None:
+            self.call.request_bytes = size
@@ -0,0 +1,316 @@
+import codecs
+import csv
+import time
+
+from .base_endpoint import BaseEndpoint
+from .connections import ApiCallError
+from .request_spec import Delay
+from .transports import DEFAULT_CHUNK_SIZE
+
+EXPORT_DONE = 'done'
+# Statuses of the exports still running. Any other status than these and
+# EXPORT_DONE is final and treated as a failure, rather than polled until the
+# timeout, since the failure statuses are not documented.
+EXPORT_PENDING = ('scheduled', 'in progress')
+DEFAULT_POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 30
+
+
+class ExportError(ApiCallError):
+    """
+    Raised when an export job fails or is not done in time.
+    """
+
+
+class CSVRowDecoder:
+    """
+    Decode a CSV file chunk by chunk, for the stream method of the
+    connections. Records are only parsed once complete, so chunks may split
+    a record, a quoted field or a multi-byte character anywhere.
+    :param encoding: Encoding of the file.
+    :param delimiter: Delimiter of the fields.
+    :param header: Whether the first row holds the column names. Rows are
+    then decoded as dictionaries of column names to values.
+    """
+    def __init__(self, encoding='utf-8', delimiter=',', header=True):
+        self.delimiter = delimiter
+        self.header = header
+        self.columns = None
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._pending = ''
+        self._quotes = 0
+
+    def _records(self, text):
+        *lines, last = text.split('\n')
+        records = []
+        for line in lines:
+            self._pending += line
+            self._quotes += line.count('"')
+            if self._quotes % 2:
+                self._pending += '\n'
+            else:
+                records.append(self._pending)
+                self._pending = ''
+                self._quotes = 0
+        self._pending += last
+        self._quotes += last.count('"')
+        return records
+
+    def _rows(self, records):
+        rows = []
+        for row in csv.reader(records, delimiter=self.delimiter):
+            if not row:
+                continue
+            if not self.header:
+                rows.append(row)
+            elif self.columns is None:
+                self.columns = row
+            else:
+                rows.append(dict(zip(self.columns, row)))
+        return rows
+
+    def feed(self, chunk):
+        """
+        :param chunk: Bytes of the file.
+        :return: List of the rows completed by the chunk.
+        """
+        return self._rows(self._records(self._decoder.decode(chunk)))
+
+    def close(self):
+        """
+        :return: List of the remaining rows.
+        """
+        records = self._records(self._decoder.decode(b'', final=True))
+        if self._pending:
+            records.append(self._pending)
+            self._pending = ''
+            self._quotes = 0
+        return self._rows(records)
+
+
+class Export(BaseEndpoint):
+    """
+    Launch Emarsys' asynchronous exports, wait for them and download their
+    files.
+
+    Usage example:
+        >>> job = client.exports.filter(123, [1, 2, 3])
+        >>> client.exports.wait([job['data']['id']])
+        {2140: {'id': 2140, 'status': 'done', ...}}
+        >>> for row in client.exports.iter_rows(2140):
+        ...     print(row)
+        {'First Name': 'Donald', 'Last Name': 'Trump', 'E-Mail': '...'}
+    """
+    def __init__(self, connection, endpoint='api/v2/export/'):
+        super().__init__(connection, endpoint)
+
+    def filter(self,
+               filter_id,
+               contact_fields,
+               distribution_method='local',
+               **options):
+        """
+        Start the export of the contacts of a segment.
+        :param filter_id: Identifier of the segment.
+        :param contact_fields: Ids of the fields to export.
+        :param distribution_method: How the file is delivered, 'local' to
+        download it with this client.
+        :param options: Other options of the export, e.g. delimiter or
+        add_field_names_header.
+        :return: Dictionary with the id of the export.
+
+        Examples:
+        >>> client.exports.filter(123, [1, 2, 3])
+        {'data': {'id': 2140}, 'replyCode': 0, 'replyText': 'OK'}
+        """
+        payload = {
+            'filter': filter_id,
+            'contact_fields': contact_fields,
+            'distribution_method': distribution_method,
+            **options,
+        }
+        return self.make_call(
+            'POST',
+            '{}filter/'.format(self.endpoint),
+            payload=payload
+        )
+
+    def responses(self,
+                  response_type,
+                  contact_fields,
+                  time_range=None,
+                  distribution_method='local',
+                  **options):
+        """
+        Start the export of the contacts who responded to emails.
+        :param response_type: Type of response, e.g. 'opened' or 'clicked'.
+        :param contact_fields: Ids of the fields to export.
+        :param time_range: Start and end dates of the responses, e.g.
+        ['2017-01-01', '2017-01-31'].
+        :param distribution_method: How the file is delivered, 'local' to
+        download it with this client.
+        :param options: Other options of the export, e.g. sources or
+        analysis_fields.
+        :return: Dictionary with the id of the export.
+
+        Examples:
+        >>> client.exports.responses('opened', [1, 2, 3])
+        {'data': {'id': 2141}, 'replyCode': 0, 'replyText': 'OK'}
+        """
+        payload = {
+            'type': response_type,
+            'contact_fields': contact_fields,
+            'distribution_method': distribution_method,
+            **options,
+        }
+        if time_range:
+            payload['time_range'] = time_range
+        return self.make_call(
+            'POST',
+            'api/v2/email/getresponses/',
+            payload=payload
+        )
+
+    def status(self, export_id):
+        """
+        Get the status of an export.
+        :param export_id: Identifier of the export.
+        :return: Dictionary with the status of the export.
+
+        Examples:
+        >>> client.exports.status(2140)
+        {
+            'data': {'id': 2140, 'status': 'done', ...},
+            'replyCode': 0,
+            'replyText': 'OK'
+        }
+        """
+        return self.make_call(
+            'GET',
+            '{}{}/'.format(self.endpoint, export_id)
+        )
+
+    def wait(self,
+             export_ids,
+             poll_interval=DEFAULT_POLL_INTERVAL,
+             max_interval=MAX_POLL_INTERVAL,
+             backoff=2,
+             timeout=None,
+             concurrency=None):
+        """
+        Wait for several exports to be done. The statuses of the pending
+        exports are polled concurrently, the interval between two polls
+        growing exponentially.
+        :param export_ids: Identifiers of the exports.
+        :param poll_interval: Interval before the second poll, in seconds.
+        :param max_interval: Maximum interval between two polls, in seconds.
+        :param backoff: Factor applied to the interval after every poll.
+        :param timeout: Maximum time to wait, in seconds. None waits forever.
+        :param concurrency: Maximum number of polls in flight, the
+        connection's default if None.
+        :return: Dictionary of export ids to their final status. Raises an
+        ExportError if an export ends with another status than done, or the
+        timeout is reached.
+
+        Examples:
+        >>> client.exports.wait([2140, 2141], timeout=600)
+        {
+            2140: {'id': 2140, 'status': 'done', ...},
+            2141: {'id': 2141, 'status': 'done', ...}
+        }
+        """
+        return self.drive(
+            self._wait_plan(export_ids, poll_interval, max_interval, backoff,
+                            timeout),
+            concurrency=concurrency
+        )
+
+    def _wait_plan(self, export_ids, poll_interval, max_interval, backoff,
+                   timeout):
+        status = self.defer().status
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = list(dict.fromkeys(export_ids))
+        jobs = {}
+        interval = poll_interval
+        while True:
+            results = yield [status(export_id) for export_id in pending]
+            still_pending = []
+            for export_id, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    raise result
+                job = result['data']
+                if job.get('status') == EXPORT_DONE:
+                    jobs[export_id] = job
+                elif job.get('status') in EXPORT_PENDING:
+                    still_pending.append(export_id)
+                else:
+                    raise ExportError(
+                        'Export {} failed: {}'.format(export_id, job)
+                    )
+            pending = still_pending
+            if not pending:
+                return jobs
+            if deadline is not None and \
+                    time.monotonic() + interval > deadline:
+                raise ExportError('Exports {} not done after {}s.'.format(
+                    ', '.join(str(export_id) for export_id in pending),
+                    timeout
+                ))
+            yield Delay(interval)
+            interval = min(interval * backoff, max_interval)
+
+    def _check_not_deferred(self):
+        if self.deferred:
+            raise TypeError('Downloads cannot be deferred.')
+
+    def download(self, export_id, destination, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Download the file of a done export, chunk by chunk, without loading
+        it in memory.
+        :param export_id: Identifier of the export.
+        :param destination: Path of the file to write, or binary file object.
+        :param chunk_size: Maximum size of the chunks, in bytes.
+        :return: Number of bytes written.
+
+        Examples:
+        >>> client.exports.download(2140, '/tmp/segment.csv')
+        5126470
+        """
+        self._check_not_deferred()
+        return self.connection.download(
+            'GET',
+            '{}{}/data/'.format(self.endpoint, export_id),
+            destination,
+            chunk_size=chunk_size
+        )
+
+    def iter_rows(self,
+                  export_id,
+                  header=True,
+                  delimiter=',',
+                  encoding='utf-8',
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Iterate over the rows of the file of a done export, decoded while
+        it is downloaded.
+        :param export_id: Identifier of the export.
+        :param header: Whether the first row holds the column names. Rows are
+        then dictionaries of column names to values, lists otherwise.
+        :param delimiter: Delimiter of the fields.
+        :param encoding: Encoding of the file.
+        :param chunk_size: Maximum size of the downloaded chunks, in bytes.
+        :return: Generator of rows with a SyncConnection, asynchronous
+        iterator of rows with an AsyncConnection.
+
+        Examples:
+        >>> for row in client.exports.iter_rows(2140):
+        ...     print(row)
+        {'First Name': 'Donald', 'Last Name': 'Trump', 'E-Mail': '...'}
+        """
+        self._check_not_deferred()
+        return self.connection.stream(
+            'GET',
+            '{}{}/data/'.format(self.endpoint, export_id),
+            chunk_size=chunk_size,
+            decoder=CSVRowDecoder(encoding, delimiter, header)
+        )
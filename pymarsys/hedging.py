@@ -0,0 +1,102 @@
+from collections import deque
+
+from .metrics import normalize_endpoint
+
+
+class HedgingPolicy:
+    """
+    Decide when an AsyncConnection sends a duplicate of a slow idempotent
+    call. The first response wins and the other call is cancelled.
+
+    A call is hedged once it has been waiting longer than the given
+    percentile of the recent latencies of its endpoint, numeric ids
+    replaced by a placeholder. No call is hedged before min_samples
+    latencies are known. Hedges are paid with a budget: every call earns
+    `budget` tokens, at most `burst`, and a hedge costs one, so hedging adds
+    at most `budget` extra calls per call on average.
+
+    Usage example:
+        >>> hedging = HedgingPolicy(percentile=95, budget=0.05)
+        >>> connection = AsyncConnection('username', 'secret',
+        ...                              hedging=hedging)
+        >>> hedging.hedges
+        0
+
+    :param percentile: Percentile of the latencies after which a call is
+    hedged.
+    :param budget: Maximum share of extra calls.
+    :param min_delay: Minimum delay before hedging, in seconds.
+    :param max_delay: Maximum delay before hedging, in seconds, None for no
+    maximum.
+    :param min_samples: Number of latencies needed before hedging.
+    :param window: Number of recent latencies kept per endpoint.
+    :param burst: Maximum number of hedges which can be sent in a row.
+    """
+    def __init__(self,
+                 percentile=95,
+                 budget=0.05,
+                 min_delay=0.005,
+                 max_delay=None,
+                 min_samples=20,
+                 window=500,
+                 burst=10):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.burst = burst
+        self.calls = 0
+        self.hedges = 0
+        self._tokens = 0.0
+        self._latencies = {}
+
+    def _samples(self, method, endpoint):
+        key = (method, normalize_endpoint(endpoint))
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=self.window)
+        return samples
+
+    def delay(self, method, endpoint):
+        """
+        :return: Time to wait for a response before hedging a call, in
+        seconds, or None if the call should not be hedged.
+        """
+        samples = self._samples(method, endpoint)
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1,
+                    int(len(ordered) * self.percentile / 100))
+        delay = max(self.min_delay, ordered[index])
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
+
+    def start(self, method, endpoint):
+        """
+        Called by the connection when a call starts.
+        :return: Delay before hedging the call, see delay.
+        """
+        self.calls += 1
+        self._tokens = min(float(self.burst), self._tokens + self.budget)
+        return self.delay(method, endpoint)
+
+    def acquire(self):
+        """
+        Called by the connection before sending a hedge.
+        :return: Whether the budget allows it.
+        """
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.hedges += 1
+        return True
+
+    def record(self, method, endpoint, latency):
+        """
+        Record the latency of a call, as seen by its caller.
+        """
+        self._samples(method, endpoint).append(latency)
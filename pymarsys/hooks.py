@@ -0,0 +1,68 @@
+import time
+
+
+class CallInfo:
+    """
+    Information about a single call made by a connection. An instance is
+    created when the call starts and is passed, filled as the call goes on,
+    to every hook of the connection.
+    """
+    __slots__ = (
+        'method',
+        'endpoint',
+        'request_bytes',
+        'response_bytes',
+        'status',
+        'started',
+        'elapsed',
+    )
+
+    def __init__(self, method, endpoint, request_bytes=0):
+        self.method = method
+        self.endpoint = endpoint
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.status = None
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def finish(self):
+        """
+        Freeze the elapsed time of the call.
+        :return: Elapsed time in seconds.
+        """
+        self.elapsed = time.perf_counter() - self.started
+        return self.elapsed
+
+
+class RequestHook:
+    """
+    Base class for objects observing the calls made by a connection.
+    Subclasses only need to override the methods they are interested in.
+
+    Usage example:
+        >>> class PrintHook(RequestHook):
+        ...     def on_request_end(self, call):
+        ...         print(call.endpoint, call.status, call.elapsed)
+        >>> connection = SyncConnection('username', 'secret',
+        ...                             hooks=[PrintHook()])
+    """
+    def on_request_start(self, call):
+        """
+        Called before the HTTP request is sent.
+        :param call: CallInfo of the call.
+        """
+
+    def on_request_end(self, call):
+        """
+        Called once a successful response has been received.
+        :param call: CallInfo of the call.
+        """
+
+    def on_error(self, call, error):
+        """
+        Called when the call failed, either because of the network or
+        because Emarsys answered with an HTTP error.
+        :param call: CallInfo of the call.
+        :param error: The exception raised.
+        """
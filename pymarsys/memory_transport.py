@@ -0,0 +1,586 @@
+import asyncio
+from collections import OrderedDict
+import csv
+import datetime
+import io
+import itertools
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .transports import BaseAsyncTransport, BaseTransport, TransportResponse
+
+DEFAULT_FIELDS = (
+    {'id': 1, 'name': 'First Name', 'application_type': 'shorttext',
+     'string_id': 'first_name'},
+    {'id': 2, 'name': 'Last Name', 'application_type': 'shorttext',
+     'string_id': 'last_name'},
+    {'id': 3, 'name': 'E-Mail', 'application_type': 'longtext',
+     'string_id': 'email'},
+    {'id': 4, 'name': 'Date of Birth', 'application_type': 'date',
+     'string_id': 'birth_date'},
+    {'id': 31, 'name': 'Opt-In', 'application_type': 'singlechoice',
+     'string_id': 'optin'},
+)
+
+DEFAULT_CHOICES = {
+    31: [{'id': '1', 'choice': 'True'}, {'id': '2', 'choice': 'False'}],
+}
+
+SYSTEM_KEYS = ('id', 'uid')
+
+
+class EmarsysError(Exception):
+    def __init__(self, reply_code, reply_text, status=400, data=''):
+        super().__init__(reply_text)
+        self.reply_code = reply_code
+        self.reply_text = reply_text
+        self.status = status
+        self.data = data
+
+
+def _now():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class EmarsysEmulator:
+    """
+    In-memory emulation of the contact, field and contactlist endpoints of
+    the Emarsys API. Contacts are stored as dictionaries of string field ids
+    to values, and indexed on every field used as a key. The last change of
+    every field is kept for the last_change endpoint, unless track_changes
+    is False. Launch records returned by getcontacthistory are read from the
+    history list. A bulk write with an unknown field id is rejected as a
+    whole. Exports are done after export_polls polls of their status; filter
+    ids are the ids of contact lists.
+
+    The emulator is shared by InMemoryTransport and AsyncInMemoryTransport,
+    so the same state can be inspected from a test:
+        >>> emulator = EmarsysEmulator()
+        >>> connection = SyncConnection(
+        ...     'username',
+        ...     'secret',
+        ...     transport=InMemoryTransport(emulator)
+        ... )
+        >>> Emarsys(connection).contacts.create({3: 'squirrel@squirrel.com'})
+        {'data': {'id': 1}, 'replyCode': 0, 'replyText': 'OK'}
+        >>> emulator.contacts
+        {1: {'3': 'squirrel@squirrel.com'}}
+    """
+    def __init__(self, fields=DEFAULT_FIELDS, choices=None,
+                 track_changes=True, export_polls=1):
+        self.track_changes = track_changes
+        self.export_polls = export_polls
+        self.contacts = OrderedDict()
+        self.fields = OrderedDict((field['id'], dict(field))
+                                  for field in fields)
+        self.choices = dict(DEFAULT_CHOICES if choices is None else choices)
+        self.lists = OrderedDict()
+        self.last_changes = {}
+        self.exports = OrderedDict()
+        self.history = []
+        self.requests = 0
+        self._indexes = {}
+        self._contact_ids = itertools.count(1)
+        self._list_ids = itertools.count(1)
+        self._export_ids = itertools.count(1)
+        self._field_ids = itertools.count(max(self.fields, default=0) + 1)
+        self._lock = threading.Lock()
+        self._routes = [
+            ('GET', r'contact/query', self.query),
+            ('POST', r'contact/getdata', self.get_data),
+            ('POST', r'contact/getcontacthistory', self.get_history),
+            ('POST', r'contact/checkids', self.check_ids),
+            ('POST', r'contact/delete', self.delete),
+            ('GET', r'contact/last_change', self.last_change),
+            ('POST', r'contact', self.create),
+            ('PUT', r'contact', self.update),
+            ('GET', r'contact', self.get_internal_id),
+            ('GET', r'field(?:/translate/\w+)?', self.list_fields),
+            ('POST', r'field', self.create_field),
+            ('GET', r'field/(?P<field_id>\d+)/choice(?:/translate/\w+)?',
+             self.list_choice),
+            ('GET', r'contactlist', self.list_lists),
+            ('POST', r'contactlist', self.create_list),
+            ('POST', r'contactlist/(?P<list_id>\d+)/add', self.add_to_list),
+            ('POST', r'contactlist/(?P<list_id>\d+)/delete',
+             self.remove_from_list),
+            ('GET', r'contactlist/(?P<list_id>\d+)/contacts',
+             self.list_members),
+            ('POST', r'export/filter', self.export_filter),
+            ('POST', r'email/getresponses', self.export_responses),
+            ('GET', r'export/(?P<export_id>\d+)', self.export_status),
+            ('GET', r'export/(?P<export_id>\d+)/data', self.export_data),
+        ]
+        self._routes = [
+            (method, re.compile(r'^api/v2/{}$'.format(pattern)), handler)
+            for method, pattern, handler in self._routes
+        ]
+
+    def handle(self, method, url, data, params):
+        """
+        Handle a request the way Emarsys would.
+        :return: HTTP status and decoded response body, or bytes for files.
+        """
+        path = re.sub(r'/+', '/', urlsplit(url).path).strip('/')
+        if data is not None and not isinstance(data, (str, bytes)):
+            data = b''.join(data)
+        payload = json.loads(data) if data else {}
+        params = {str(key): str(value)
+                  for key, value in (params or {}).items()}
+        with self._lock:
+            self.requests += 1
+            for route_method, pattern, handler in self._routes:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    try:
+                        result = handler(payload, params, **match.groupdict())
+                        if isinstance(result, bytes):
+                            return 200, result
+                    except EmarsysError as err:
+                        return err.status, {
+                            'data': err.data,
+                            'replyCode': err.reply_code,
+                            'replyText': err.reply_text,
+                        }
+                    return 200, {
+                        'data': result,
+                        'replyCode': 0,
+                        'replyText': 'OK',
+                    }
+        return 404, {'data': '', 'replyCode': 1, 'replyText': 'Not found'}
+
+    # Contacts storage
+
+    def _index(self, key_id):
+        key_id = str(key_id)
+        index = self._indexes.get(key_id)
+        if index is None:
+            index = {}
+            for contact_id, contact in self.contacts.items():
+                if contact.get(key_id) not in (None, ''):
+                    index.setdefault(str(contact[key_id]), contact_id)
+            self._indexes[key_id] = index
+        return index
+
+    def find(self, key_id, key_value):
+        """
+        :return: Internal id of the contact, or None.
+        """
+        key_id = str(key_id)
+        if key_id == 'id':
+            try:
+                contact_id = int(key_value)
+            except (TypeError, ValueError):
+                return None
+            return contact_id if contact_id in self.contacts else None
+        return self._index(key_id).get(str(key_value))
+
+    def _write(self, contact_id, fields):
+        contact = self.contacts.setdefault(contact_id, {})
+        for field_id, value in fields.items():
+            old_value = contact.get(field_id)
+            index = self._indexes.get(field_id)
+            if index is not None:
+                if index.get(str(old_value)) == contact_id:
+                    del index[str(old_value)]
+                if value not in (None, ''):
+                    index.setdefault(str(value), contact_id)
+            if self.track_changes and old_value != value:
+                self.last_changes[(contact_id, field_id)] = (
+                    _now(),
+                    old_value,
+                    value,
+                )
+            contact[field_id] = value
+
+    def _remove(self, contact_id):
+        contact = self.contacts.pop(contact_id)
+        for field_id, value in contact.items():
+            index = self._indexes.get(field_id)
+            if index is not None and index.get(str(value)) == contact_id:
+                del index[str(value)]
+        for members in self.lists.values():
+            members.pop(contact_id, None)
+
+    def _split(self, contact, key_id):
+        fields = {
+            str(field_id): value
+            for field_id, value in contact.items()
+            if field_id not in ('key_id', 'source_id')
+        }
+        key_id = str(key_id if key_id is not None else 3)
+        self._check_fields(fields)
+        return key_id, fields.get(key_id), fields
+
+    def _check_fields(self, fields):
+        for field_id in fields:
+            if field_id not in SYSTEM_KEYS and \
+                    not (field_id.isdigit() and int(field_id) in self.fields):
+                raise EmarsysError(
+                    2004,
+                    'Invalid key field id: {}'.format(field_id)
+                )
+
+    def _create_one(self, contact, key_id):
+        key_id, key_value, fields = self._split(contact, key_id)
+        if key_value in (None, ''):
+            raise EmarsysError(2005, 'No value provided for key field')
+        if self.find(key_id, key_value) is not None:
+            raise EmarsysError(2009, 'Contact with the external key already '
+                                     'exists: {}'.format(key_id))
+        contact_id = next(self._contact_ids)
+        fields.pop('id', None)
+        self._write(contact_id, fields)
+        return contact_id
+
+    def _update_one(self, contact, key_id, upsert):
+        key_id, key_value, fields = self._split(contact, key_id)
+        contact_id = self.find(key_id, key_value)
+        if contact_id is None:
+            if not upsert:
+                raise EmarsysError(2008, 'No contact found with the external '
+                                         'id: {}'.format(key_id))
+            return self._create_one(contact, key_id)
+        fields.pop('id', None)
+        self._write(contact_id, fields)
+        return contact_id
+
+    def _many(self, contacts, key_id, func, stringify):
+        for contact in contacts:
+            self._check_fields({str(field_id): value
+                                for field_id, value in contact.items()})
+        ids = []
+        errors = {}
+        for contact in contacts:
+            try:
+                contact_id = func(contact, key_id)
+            except EmarsysError as err:
+                key_value = {str(field_id): value
+                             for field_id, value in contact.items()}.get(
+                    str(key_id if key_id is not None else 3)
+                )
+                errors[str(key_value)] = {str(err.reply_code): err.reply_text}
+            else:
+                ids.append(str(contact_id) if stringify else contact_id)
+        if not ids and errors:
+            raise EmarsysError(2010, 'No contacts were processed',
+                               data={'errors': errors})
+        result = {'ids': ids}
+        if errors:
+            result['errors'] = errors
+        return result
+
+    # Contacts endpoints
+
+    def create(self, payload, params):
+        key_id = payload.get('key_id')
+        if 'contacts' in payload:
+            return self._many(payload['contacts'], key_id, self._create_one,
+                              stringify=False)
+        return {'id': self._create_one(payload, key_id)}
+
+    def update(self, payload, params):
+        key_id = payload.get('key_id')
+        upsert = params.get('create_if_not_exists') == '1'
+
+        def update_one(contact, key_id):
+            return self._update_one(contact, key_id, upsert)
+
+        if 'contacts' in payload:
+            return self._many(payload['contacts'], key_id, update_one,
+                              stringify=True)
+        return {'id': str(update_one(payload, key_id))}
+
+    def get_internal_id(self, payload, params):
+        for key_id, key_value in params.items():
+            contact_id = self.find(key_id, key_value)
+            if contact_id is None:
+                raise EmarsysError(2008, 'No contact found with the external '
+                                         'id: {}'.format(key_id))
+            return {'id': str(contact_id)}
+        raise EmarsysError(2004, 'Invalid key field id')
+
+    def query(self, payload, params):
+        params = dict(params)
+        return_field = params.pop('return')
+        limit = int(params.pop('limit', 10000) or 10000)
+        offset = int(params.pop('offset', 0) or 0)
+        exclude_empty = params.pop('excludeempty', '') == 'true'
+        filters = list(params.items())
+        result = []
+        for contact_id, contact in self.contacts.items():
+            if any(str(contact.get(field_id) or '') != value
+                   for field_id, value in filters):
+                continue
+            value = contact.get(return_field)
+            if exclude_empty and value in (None, ''):
+                continue
+            result.append({return_field: value, 'id': str(contact_id)})
+        return {'errors': [], 'result': result[offset:offset + limit]}
+
+    def get_data(self, payload, params):
+        key_id = str(payload.get('keyId') or 'id')
+        fields = [str(field) for field in payload.get('fields') or
+                  self.fields]
+        result = []
+        errors = []
+        for key_value in payload.get('keyValues', []):
+            contact_id = self.find(key_id, key_value)
+            if contact_id is None:
+                errors.append({'key': key_value, 'errorCode': 2008,
+                               'errorMsg': 'No contact found with the '
+                                           'external id: {}'.format(key_id)})
+                continue
+            contact = self.contacts[contact_id]
+            row = {field: contact.get(field) for field in fields}
+            row['id'] = str(contact_id)
+            row['uid'] = 'u{}'.format(contact_id)
+            result.append(row)
+        return {'errors': errors, 'result': result or False}
+
+    def get_history(self, payload, params):
+        contacts = {str(contact_id) for contact_id in payload.get('contacts')
+                    or []}
+        start = payload.get('startDate') or ''
+        end = payload.get('endDate') or '9999-12-31'
+        return [
+            dict(record) for record in self.history
+            if str(record['contactId']) in contacts and
+            start <= record['launch_date'][:10] <= end
+        ]
+
+    def check_ids(self, payload, params):
+        key_id = str(payload.get('key_id'))
+        ids = {}
+        errors = {}
+        for key_value in payload.get('external_ids', []):
+            contact_id = self.find(key_id, key_value)
+            if contact_id is None:
+                errors[str(key_value)] = {
+                    '2008': 'No contact found with the external id: {}'
+                            .format(key_id)
+                }
+            else:
+                ids[str(key_value)] = str(contact_id)
+        return {'errors': errors, 'ids': ids}
+
+    def delete(self, payload, params):
+        key_id, key_value, fields = self._split(payload,
+                                                payload.get('key_id'))
+        contact_id = self.find(key_id, key_value)
+        if contact_id is None:
+            raise EmarsysError(2008, 'No contact found with the external '
+                                     'id: {}'.format(key_id))
+        self._remove(contact_id)
+        return ''
+
+    def last_change(self, payload, params):
+        contact_id = self.find(params['key_id'], params['key_value'])
+        if contact_id is None:
+            raise EmarsysError(2008, 'No contact found with the external '
+                                     'id: {}'.format(params['key_id']))
+        change = self.last_changes.get((contact_id, params['field_id']))
+        if change is None:
+            raise EmarsysError(5002, 'No change found for this field')
+        return dict(zip(('time', 'old_value', 'current_value'), change))
+
+    # Fields endpoints
+
+    def list_fields(self, payload, params):
+        return [dict(field) for field in self.fields.values()]
+
+    def create_field(self, payload, params):
+        field_id = next(self._field_ids)
+        field = {
+            'id': field_id,
+            'name': payload['name'],
+            'application_type': payload['application_type'],
+            'string_id': payload.get('string_id') or payload['name'],
+        }
+        self.fields[field_id] = field
+        return dict(field)
+
+    def list_choice(self, payload, params, field_id):
+        field_id = int(field_id)
+        if field_id not in self.fields:
+            raise EmarsysError(2004, 'Invalid field id: {}'.format(field_id))
+        return [dict(choice) for choice in self.choices.get(field_id, [])]
+
+    # Contact lists endpoints
+
+    def _resolve(self, key_id, external_ids):
+        contact_ids = []
+        errors = {}
+        for key_value in external_ids or []:
+            contact_id = self.find(key_id, key_value)
+            if contact_id is None:
+                errors[str(key_value)] = {
+                    '2008': 'No contact found with the external id: {}'
+                            .format(key_id)
+                }
+            else:
+                contact_ids.append(contact_id)
+        return contact_ids, errors
+
+    def _get_list(self, list_id):
+        list_id = int(list_id)
+        if list_id not in self.lists:
+            raise EmarsysError(
+                3004,
+                'Contact list does not exist: {}'.format(list_id)
+            )
+        return self.lists[list_id]
+
+    def list_lists(self, payload, params):
+        return [{'id': str(list_id), 'name': 'list {}'.format(list_id)}
+                for list_id in self.lists]
+
+    def create_list(self, payload, params):
+        contact_ids, errors = self._resolve(payload.get('key_id', 3),
+                                            payload.get('external_ids'))
+        list_id = next(self._list_ids)
+        self.lists[list_id] = OrderedDict.fromkeys(contact_ids)
+        result = {'id': list_id}
+        if errors:
+            result['errors'] = errors
+        return result
+
+    def add_to_list(self, payload, params, list_id):
+        members = self._get_list(list_id)
+        contact_ids, errors = self._resolve(payload.get('key_id', 3),
+                                            payload.get('external_ids'))
+        before = len(members)
+        members.update(OrderedDict.fromkeys(contact_ids))
+        return {'inserted_contacts': len(members) - before, 'errors': errors}
+
+    def remove_from_list(self, payload, params, list_id):
+        members = self._get_list(list_id)
+        contact_ids, errors = self._resolve(payload.get('key_id', 3),
+                                            payload.get('external_ids'))
+        deleted = 0
+        for contact_id in contact_ids:
+            if contact_id in members:
+                del members[contact_id]
+                deleted += 1
+        return {'deleted_contacts': deleted, 'errors': errors}
+
+    def list_members(self, payload, params, list_id):
+        members = self._get_list(list_id)
+        limit = int(params.get('limit', 1000000))
+        offset = int(params.get('offset', 0))
+        return [str(contact_id) for contact_id in
+                itertools.islice(members, offset, offset + limit)]
+
+    # Exports endpoints
+
+    def _export(self, contact_ids, contact_fields):
+        file = io.StringIO()
+        writer = csv.writer(file)
+        writer.writerow(
+            [self.fields[int(field_id)]['name'] for field_id in contact_fields]
+        )
+        for contact_id in contact_ids:
+            contact = self.contacts.get(contact_id, {})
+            writer.writerow([contact.get(str(field_id), '')
+                             for field_id in contact_fields])
+        export_id = next(self._export_ids)
+        self.exports[export_id] = {
+            'polls': 0,
+            'data': file.getvalue().encode('utf-8'),
+        }
+        return {'id': export_id}
+
+    def _check_export_fields(self, contact_fields):
+        for field_id in contact_fields or []:
+            if int(field_id) not in self.fields:
+                raise EmarsysError(
+                    2004,
+                    'Invalid field id: {}'.format(field_id)
+                )
+
+    def export_filter(self, payload, params):
+        self._check_export_fields(payload.get('contact_fields'))
+        members = self._get_list(payload.get('filter'))
+        return self._export(list(members), payload.get('contact_fields'))
+
+    def export_responses(self, payload, params):
+        self._check_export_fields(payload.get('contact_fields'))
+        return self._export(list(self.contacts),
+                            payload.get('contact_fields'))
+
+    def _get_export(self, export_id):
+        export_id = int(export_id)
+        if export_id not in self.exports:
+            raise EmarsysError(
+                10001,
+                'Export does not exist: {}'.format(export_id)
+            )
+        return self.exports[export_id]
+
+    def export_status(self, payload, params, export_id):
+        export = self._get_export(export_id)
+        export['polls'] += 1
+        done = export['polls'] >= self.export_polls
+        return {
+            'id': int(export_id),
+            'status': 'done' if done else 'in progress',
+        }
+
+    def export_data(self, payload, params, export_id):
+        export = self._get_export(export_id)
+        if export['polls'] < self.export_polls:
+            raise EmarsysError(
+                10002,
+                'Export is not done: {}'.format(export_id)
+            )
+        return export['data']
+
+
+def _response(status, body):
+    if isinstance(body, bytes):
+        return TransportResponse(status, body, {'Content-Type': 'text/csv'},
+                                 'OK')
+    return TransportResponse(
+        status,
+        json.dumps(body).encode('utf-8'),
+        {'Content-Type': 'application/json'},
+        'OK' if status < 400 else 'Bad Request'
+    )
+
+
+class InMemoryTransport(BaseTransport):
+    """
+    Transport answering from an EmarsysEmulator instead of the network.
+    :param emulator: EmarsysEmulator to use, a new one by default.
+    :param latency: Simulated latency of every call, in seconds.
+    """
+    def __init__(self, emulator=None, latency=0):
+        self.emulator = emulator if emulator is not None \
+            else EmarsysEmulator()
+        self.latency = latency
+
+    def send(self, method, url, headers, data, params):
+        if self.latency:
+            time.sleep(self.latency)
+        return _response(*self.emulator.handle(method, url, data, params))
+
+
+class AsyncInMemoryTransport(BaseAsyncTransport):
+    """
+    Asynchronous transport answering from an EmarsysEmulator instead of the
+    network.
+    :param emulator: EmarsysEmulator to use, a new one by default.
+    :param latency: Simulated latency of every call, in seconds.
+    """
+    def __init__(self, emulator=None, latency=0):
+        self.emulator = emulator if emulator is not None \
+            else EmarsysEmulator()
+        self.latency = latency
+
+    async def send(self, method, url, headers, data, params):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _response(*self.emulator.handle(method, url, data, params))
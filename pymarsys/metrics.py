@@ -0,0 +1,177 @@
+from bisect import bisect_left
+from collections import defaultdict
+import re
+import threading
+
+from .hooks import RequestHook
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_ID_PATTERN = re.compile(r'/\d+(?=/|$)')
+
+
+def normalize_endpoint(endpoint):
+    """
+    Replace the numeric ids of an endpoint by a placeholder, so that
+    'api/v2/contactlist/123/add/' and 'api/v2/contactlist/456/add/' are
+    reported under the same label.
+    :param endpoint: Emarsys' api endpoint.
+    :return: Normalized endpoint.
+    """
+    return _ID_PATTERN.sub('/{id}', endpoint.replace('//', '/'))
+
+
+class _EndpointStats:
+    __slots__ = (
+        'buckets',
+        'latency_sum',
+        'count',
+        'request_bytes',
+        'response_bytes',
+        'statuses',
+        'errors',
+    )
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = defaultdict(int)
+        self.errors = 0
+
+
+class MetricsCollector(RequestHook):
+    """
+    Collect per-endpoint latency histograms, byte counters and status codes
+    of the calls made by a connection, and export them in the Prometheus text
+    format.
+
+    Usage example:
+        >>> metrics = MetricsCollector()
+        >>> connection = SyncConnection('username', 'secret', hooks=[metrics])
+        >>> client = Emarsys(connection)
+        >>> client.contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+        >>> print(metrics.to_prometheus())
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='pymarsys'):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, call):
+        key = (normalize_endpoint(call.endpoint), call.method)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(
+                key,
+                _EndpointStats(len(self.bucket_bounds))
+            )
+        return stats
+
+    def _record(self, call, error=False):
+        elapsed = call.elapsed if call.elapsed is not None else call.finish()
+        bucket = bisect_left(self.bucket_bounds, elapsed)
+        with self._lock:
+            stats = self._get_stats(call)
+            stats.buckets[bucket] += 1
+            stats.latency_sum += elapsed
+            stats.count += 1
+            stats.request_bytes += call.request_bytes
+            stats.response_bytes += call.response_bytes
+            if call.status is not None:
+                stats.statuses[call.status] += 1
+            if error:
+                stats.errors += 1
+
+    def on_request_end(self, call):
+        self._record(call)
+
+    def on_error(self, call, error):
+        self._record(call, error=True)
+
+    def reset(self):
+        """
+        Forget everything collected so far.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self):
+        """
+        Summary of the collected metrics.
+        :return: Dictionary indexed by (endpoint, method) tuples.
+        """
+        with self._lock:
+            return {
+                key: {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'latency_sum': stats.latency_sum,
+                    'request_bytes': stats.request_bytes,
+                    'response_bytes': stats.response_bytes,
+                    'statuses': dict(stats.statuses),
+                }
+                for key, stats in self._stats.items()
+            }
+
+    def to_prometheus(self):
+        """
+        Export the collected metrics in the Prometheus text format.
+        :return: String ready to be served on a /metrics route.
+        """
+        duration = '{}_request_duration_seconds'.format(self.prefix)
+        counters = (
+            ('request_bytes', 'Bytes sent to Emarsys.'),
+            ('response_bytes', 'Bytes received from Emarsys.'),
+            ('errors', 'Failed calls.'),
+        )
+        lines = [
+            '# HELP {} Latency of the calls to Emarsys.'.format(duration),
+            '# TYPE {} histogram'.format(duration),
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for (endpoint, method), stats in items:
+                labels = 'endpoint="{}",method="{}"'.format(endpoint, method)
+                cumulated = 0
+                for bound, count in zip(self.bucket_bounds, stats.buckets):
+                    cumulated += count
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                        duration, labels, bound, cumulated
+                    ))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(
+                    duration, labels, stats.count
+                ))
+                lines.append('{}_sum{{{}}} {}'.format(
+                    duration, labels, stats.latency_sum
+                ))
+                lines.append('{}_count{{{}}} {}'.format(
+                    duration, labels, stats.count
+                ))
+
+            for attribute, description in counters:
+                name = '{}_{}_total'.format(self.prefix, attribute)
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} counter'.format(name))
+                for (endpoint, method), stats in items:
+                    lines.append(
+                        '{}{{endpoint="{}",method="{}"}} {}'.format(
+                            name, endpoint, method, getattr(stats, attribute)
+                        )
+                    )
+
+            name = '{}_responses_total'.format(self.prefix)
+            lines.append('# HELP {} Responses by HTTP status.'.format(name))
+            lines.append('# TYPE {} counter'.format(name))
+            for (endpoint, method), stats in items:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        '{}{{endpoint="{}",method="{}",status="{}"}} {}'
+                        .format(name, endpoint, method, status, count)
+                    )
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,355 @@
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+
+from .bulk_write import BULK_CHUNK_SIZE, key_value
+from .contact import Contact
+
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+OUTBOX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key_id TEXT NOT NULL,
+    source_id TEXT,
+    upsert INTEGER NOT NULL,
+    contact TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    seq INTEGER PRIMARY KEY,
+    key_id TEXT NOT NULL,
+    source_id TEXT,
+    upsert INTEGER NOT NULL,
+    contact TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL
+);
+'''
+
+
+def _key_id(value):
+    # key_id is stored as text: field ids are integers, but a key_id may
+    # also be a field name.
+    return int(value) if value.isdigit() else value
+
+
+def _retriable(error):
+    # Per-record errors and calls rejected with a 4xx will fail again.
+    # Authentication and permission errors are not reported per record:
+    # bulk_update raises them, and the whole batch is retried later.
+    if 'call_error' not in error:
+        return False
+    status = error.get('status')
+    return status is None or status == 429 or status >= 500
+
+
+class Outbox:
+    """
+    Durable queue of contact updates, stored in a local SQLite database and
+    delivered in large update_many batches by a background thread.
+
+    Enqueueing only writes a row to the database, in write-ahead-log mode,
+    so it costs one disk sync, or tens of microseconds with
+    synchronous='NORMAL', and does not depend on the latency of the API.
+    enqueue_many writes many rows with a single sync. Rows are deleted in
+    the same transaction which records the outcome of their batch, so
+    updates enqueued before a crash are delivered by the next Outbox opened
+    on the same file. Delivery is at least once: an update may be sent again
+    if the process dies between the API call and the checkpoint.
+
+    Updates of the same contact queued in the same batch are merged, later
+    values winning. Updates rejected by Emarsys are moved to the
+    dead_letters table; updates failing because of the network or of the
+    API are retried in order with an exponential backoff, and moved to
+    dead_letters after max_attempts attempts. Calls failing with a 401, 403
+    or 404, e.g. after the secret was rotated, do not count as attempts:
+    the flusher keeps the updates queued and backs off until they succeed.
+
+    Usage example:
+        >>> outbox = Outbox('/var/lib/app/emarsys.db', connection)
+        >>> outbox.start()
+        >>> outbox.enqueue({3: 'squirrel@squirrelmail.com', 31: 1})
+        >>> outbox.close()
+
+    :param path: Path of the SQLite database.
+    :param connection: SyncConnection used to deliver the updates.
+    :param batch_size: Maximum number of queued updates per batch.
+    :param chunk_size: Maximum number of contacts per update_many call.
+    :param flush_interval: Time the flusher waits for new updates when the
+    outbox is empty, in seconds.
+    :param max_attempts: Number of failed deliveries before an update is
+    moved to dead_letters.
+    :param retry_delay: Delay before the first retry of a failed batch, in
+    seconds, doubled after every failure.
+    :param max_retry_delay: Maximum delay between two retries, in seconds.
+    :param synchronous: SQLite synchronous mode of the database. FULL, the
+    default, syncs every transaction to disk, so that queued updates survive
+    a power loss. NORMAL makes enqueueing faster, but the updates queued in
+    the last transactions can be lost if the operating system crashes.
+    """
+    def __init__(self,
+                 path,
+                 connection,
+                 batch_size=10000,
+                 chunk_size=BULK_CHUNK_SIZE,
+                 flush_interval=1.0,
+                 max_attempts=10,
+                 retry_delay=1.0,
+                 max_retry_delay=300.0,
+                 synchronous='FULL'):
+        if synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(
+                'synchronous must be one of {}, got {!r}.'.format(
+                    ', '.join(SYNCHRONOUS_MODES),
+                    synchronous
+                )
+            )
+        self.path = path
+        self.synchronous = synchronous.upper()
+        self.contacts = Contact(connection)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.last_error = None
+        self._db = self._connect()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False,
+                             isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous={}'.format(self.synchronous))
+        db.executescript(OUTBOX_SCHEMA)
+        return db
+
+    def enqueue(self, contact, key_id=3, source_id=None, upsert=False):
+        """
+        Queue the update of a contact.
+        :param contact: Key-value pairs of the contact fields, including the
+        key field.
+        :param key_id: Key which identifies the contact.
+        :param source_id: ID assigned to a customer’s external application.
+        :param upsert: When True, the contact is created if it does not
+        exist.
+        """
+        row = (str(key_id), source_id, int(upsert), json.dumps(contact))
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO outbox (key_id, source_id, upsert, contact) '
+                'VALUES (?, ?, ?, ?)',
+                row
+            )
+
+    def enqueue_many(self, contacts, key_id=3, source_id=None, upsert=False):
+        """
+        Queue the updates of several contacts in a single transaction.
+        """
+        rows = [(str(key_id), source_id, int(upsert), json.dumps(contact))
+                for contact in contacts]
+        with self._lock:
+            self._db.execute('BEGIN')
+            self._db.executemany(
+                'INSERT INTO outbox (key_id, source_id, upsert, contact) '
+                'VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._db.execute('COMMIT')
+
+    def pending(self):
+        """
+        :return: Number of queued updates.
+        """
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM outbox') \
+                .fetchone()[0]
+
+    def dead_letters(self):
+        """
+        :return: List of the updates which could not be delivered, as
+        dictionaries with the contact, its key_id and the error.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key_id, source_id, upsert, contact, attempts, error '
+                'FROM dead_letters ORDER BY seq'
+            ).fetchall()
+        return [
+            {
+                'key_id': _key_id(key_id),
+                'source_id': source_id,
+                'upsert': bool(upsert),
+                'contact': json.loads(contact),
+                'attempts': attempts,
+                'error': json.loads(error),
+            }
+            for key_id, source_id, upsert, contact, attempts, error in rows
+        ]
+
+    def _next_batch(self):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT seq, key_id, source_id, upsert, contact, attempts '
+                'FROM outbox ORDER BY seq LIMIT ?',
+                (self.batch_size,)
+            ).fetchall()
+        # Only the oldest run of rows sharing the same options is sent, so
+        # that updates are delivered in the order they were queued.
+        batch = []
+        for row in rows:
+            if row[1:4] != rows[0][1:4]:
+                break
+            batch.append(row[:1] + (_key_id(row[1]),) + row[2:])
+        return batch
+
+    def flush_once(self):
+        """
+        Deliver the oldest queued updates in one batch.
+        :return: Number of updates delivered or dead-lettered, and number of
+        updates to retry.
+        :raise: ApiCallError if the call failed with a 401, 403 or 404, the
+        updates staying queued.
+        """
+        with self._flush_lock:
+            rows = self._next_batch()
+            if not rows:
+                return 0, 0
+            key_id, source_id, upsert = rows[0][1:4]
+
+            contacts = OrderedDict()
+            rows_by_key = {}
+            for row in rows:
+                contact = json.loads(row[4])
+                key = key_value(contact, key_id)
+                contacts.setdefault(key, {}).update(contact)
+                rows_by_key.setdefault(key, []).append(row)
+
+            result = self.contacts.bulk_update(
+                key_id,
+                list(contacts.values()),
+                source_id=source_id,
+                upsert=bool(upsert),
+                chunk_size=self.chunk_size,
+                retries=0
+            )
+
+            done = []
+            retry = []
+            dead = []
+            for key, key_rows in rows_by_key.items():
+                error = result.errors.get(key)
+                if error is None:
+                    done.extend(row[0] for row in key_rows)
+                    continue
+                for row in key_rows:
+                    if _retriable(error) and row[5] + 1 < self.max_attempts:
+                        retry.append(row[0])
+                    else:
+                        dead.append(row[:5] + (row[5] + 1,
+                                               json.dumps(error)))
+
+            with self._lock:
+                self._db.execute('BEGIN')
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO dead_letters (seq, key_id, '
+                    'source_id, upsert, contact, attempts, error) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    dead
+                )
+                self._db.executemany(
+                    'DELETE FROM outbox WHERE seq = ?',
+                    [(seq,) for seq in done] + [(row[0],) for row in dead]
+                )
+                self._db.executemany(
+                    'UPDATE outbox SET attempts = attempts + 1 '
+                    'WHERE seq = ?',
+                    [(seq,) for seq in retry]
+                )
+                self._db.execute('COMMIT')
+            return len(done) + len(dead), len(retry)
+
+    def flush(self):
+        """
+        Deliver the queued updates until the outbox is empty or a batch
+        fails.
+        :return: Number of updates left in the outbox.
+        """
+        while True:
+            delivered, retry = self.flush_once()
+            if retry or not delivered:
+                return self.pending()
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stopping.is_set():
+            try:
+                delivered, retry = self.flush_once()
+            except Exception as err:
+                self.last_error = err
+                delivered, retry = 0, 1
+            if retry:
+                self._stopping.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+            if not delivered:
+                self._wake_up.wait(self.flush_interval)
+                self._wake_up.clear()
+
+    def start(self):
+        """
+        Start the background flusher thread.
+        :return: The outbox.
+        """
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run,
+                                            name='pymarsys-outbox',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def wake_up(self):
+        """
+        Make the flusher check the outbox without waiting for
+        flush_interval.
+        """
+        self._wake_up.set()
+
+    def stop(self, timeout=None):
+        """
+        Stop the background flusher thread once its current batch is done.
+        Queued updates stay in the database.
+        """
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake_up.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self, flush=True):
+        """
+        Stop the flusher, deliver what can be delivered and close the
+        database.
+        :param flush: Whether to try to deliver the queued updates first.
+        """
+        self.stop()
+        try:
+            if flush:
+                self.flush()
+        finally:
+            with self._lock:
+                self._db.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,61 @@
+class AsyncPageIterator:
+    """
+    Asynchronous iterator over the items of a paginated endpoint, returned by
+    AsyncConnection.paginate. While the items of a page are consumed, the
+    next page is already being fetched.
+    It is written as a class rather than an async generator so that the
+    package still imports on Python 3.5.
+
+    :param connection: AsyncConnection.
+    :param page_spec: Function building the RequestSpec of the page starting
+    at a given offset. The spec's result must be the list of items.
+    :param page_size: Number of items per page; a shorter page is the last.
+    :param prefetch: Fetch the next page while the current one is consumed.
+    """
+    def __init__(self, connection, page_spec, page_size, prefetch=True):
+        self.connection = connection
+        self.page_spec = page_spec
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self._items = iter(())
+        self._offset = 0
+        self._pending = None
+        self._done = False
+
+    def _fetch(self):
+        import asyncio
+
+        return asyncio.ensure_future(
+            self.connection.run(self.page_spec(self._offset))
+        )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            for item in self._items:
+                return item
+            if self._done:
+                raise StopAsyncIteration
+            if self._pending is None:
+                self._pending = self._fetch()
+            items = await self._pending
+            self._pending = None
+            if len(items) < self.page_size:
+                self._done = True
+            else:
+                self._offset += self.page_size
+                if self.prefetch:
+                    self._pending = self._fetch()
+            self._items = iter(items)
+
+    async def aclose(self):
+        """
+        Stop the iteration, cancelling the prefetched page if any.
+        """
+        self._done = True
+        self._items = iter(())
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
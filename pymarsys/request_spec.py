@@ -0,0 +1,141 @@
+import json
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestSpec:
+    """
+    Lightweight description of a call to the Emarsys api, which can be
+    executed later by a connection, alone with `connection.run(spec)` or in
+    bulk with `connection.execute(specs)`.
+
+    Endpoints return specs instead of making calls once deferred:
+        >>> specs = [
+        ...     client.contacts.defer().get_internal_id(3, email)
+        ...     for email in emails
+        ... ]
+        >>> client.connection.execute(specs, concurrency=8)
+
+    :param method: HTTP method.
+    :param endpoint: Emarsys' api endpoint.
+    :param payload: HTTP payload.
+    :param params: HTTP params.
+    :param headers: HTTP headers.
+    :param idempotent: Whether the call can be sent several times without
+    side effects. Defaults to True for GET requests only.
+    :param transform: Function applied to the decoded response.
+    """
+    __slots__ = (
+        'method',
+        'endpoint',
+        'payload',
+        'params',
+        'headers',
+        'idempotent',
+        'transform',
+    )
+
+    def __init__(self,
+                 method,
+                 endpoint,
+                 payload=None,
+                 params=None,
+                 headers=None,
+                 idempotent=None,
+                 transform=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.payload = payload
+        self.params = params
+        self.headers = headers
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        self.idempotent = idempotent
+        self.transform = transform
+
+    def __repr__(self):
+        return '<RequestSpec {} {}>'.format(self.method, self.endpoint)
+
+    def key(self):
+        """
+        Key identifying identical calls.
+        """
+        return (
+            self.method,
+            self.endpoint,
+            json.dumps(self.payload, sort_keys=True, default=str),
+            json.dumps(self.params, sort_keys=True, default=str),
+            json.dumps(self.headers, sort_keys=True, default=str),
+            self.transform,
+        )
+
+    def apply(self, result):
+        """
+        Apply the spec's transform to a decoded response.
+        """
+        if self.transform is None:
+            return result
+        return self.transform(result)
+
+
+class Delay:
+    """
+    Step of a plan asking the connection to wait before going on, e.g.
+    between two polls of a job. The connection sleeps with time.sleep or
+    asyncio.sleep and sends None back into the plan.
+    :param seconds: Time to wait, in seconds.
+    """
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __repr__(self):
+        return '<Delay {}s>'.format(self.seconds)
+
+
+class ExecutionPlan:
+    """
+    Plan the execution of a list of specs by a connection:
+    - identical idempotent specs are only executed once,
+    - specs are split into lanes; lanes run concurrently and the specs of a
+      lane run one after the other. When ordered, all the non-idempotent
+      specs share a single lane so writes reach Emarsys in submission order,
+      while reads still run concurrently.
+    """
+    def __init__(self, specs, ordered=False):
+        self.specs = []
+        self.positions = []
+        seen = {}
+        for spec in specs:
+            if spec.idempotent:
+                key = spec.key()
+                if key not in seen:
+                    seen[key] = len(self.specs)
+                    self.specs.append(spec)
+                self.positions.append(seen[key])
+            else:
+                self.positions.append(len(self.specs))
+                self.specs.append(spec)
+
+        writes = [index for index, spec in enumerate(self.specs)
+                  if not spec.idempotent]
+        if ordered and writes:
+            self.lanes = [writes] + [
+                [index] for index, spec in enumerate(self.specs)
+                if spec.idempotent
+            ]
+        else:
+            self.lanes = [[index] for index in range(len(self.specs))]
+
+    def results(self, results, aggregate=None):
+        """
+        Map the results of the planned specs back to the submitted specs.
+        :param results: Dictionary of results indexed by planned spec index.
+        :param aggregate: Function applied to the list of results.
+        :return: List of results in submission order, or the aggregate.
+        """
+        ordered_results = [results[position] for position in self.positions]
+        if aggregate is not None:
+            return aggregate(ordered_results)
+        return ordered_results
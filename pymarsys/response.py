@@ -0,0 +1,114 @@
+from collections.abc import Mapping
+import json
+import re
+
+RESPONSE_JSON = 'json'
+RESPONSE_LAZY = 'lazy'
+RESPONSE_RAW = 'raw'
+RESPONSE_MODES = (RESPONSE_JSON, RESPONSE_LAZY, RESPONSE_RAW)
+
+_REPLY_CODE = re.compile(rb'"replyCode"\s*:\s*(-?\d+)')
+_REPLY_TEXT = re.compile(rb'"replyText"\s*:\s*("(?:[^"\\]|\\.)*"|null)')
+
+_MISSING = object()
+
+
+def _top_level(body, match):
+    # Emarsys writes replyCode and replyText before data: a match is only
+    # trusted if no object or array was opened before it but the body.
+    prefix = body[:match.start()]
+    return prefix.count(b'{') == 1 and b'[' not in prefix
+
+
+class EmarsysResponse(Mapping):
+    """
+    Response of the Emarsys API which keeps the raw body and only decodes it
+    when its content is needed. reply_code and reply_text are read from the
+    beginning of the body without decoding the rest when possible.
+
+    The response can be read like the dictionary returned by default, e.g.
+    response['data'], and its body forwarded as is.
+
+    Usage example:
+        >>> response = EmarsysResponse(
+        ...     b'{"replyCode": 0, "replyText": "OK", "data": {"id": 1}}'
+        ... )
+        >>> response.reply_code
+        0
+        >>> response.data
+        {'id': 1}
+
+    :param body: Bytes of the JSON body.
+    :param status: HTTP status.
+    :param headers: HTTP headers.
+    """
+    __slots__ = ('body', 'status', 'headers', '_document', '_reply_code',
+                 '_reply_text')
+
+    def __init__(self, body, status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self._document = None
+        self._reply_code = _MISSING
+        self._reply_text = _MISSING
+
+    def __repr__(self):
+        return '<EmarsysResponse {} replyCode={} ({} bytes)>'.format(
+            self.status,
+            self.reply_code,
+            len(self.body)
+        )
+
+    @property
+    def document(self):
+        """
+        Decoded JSON body, decoded on first access.
+        """
+        if self._document is None:
+            self._document = json.loads(self.body.decode('utf-8'))
+        return self._document
+
+    @property
+    def data(self):
+        """
+        data member of the body, decoded on first access.
+        """
+        return self.document.get('data')
+
+    def _scan(self, pattern, key):
+        if self._document is None:
+            match = pattern.search(self.body)
+            if match is not None and _top_level(self.body, match):
+                return json.loads(match.group(1).decode('utf-8'))
+        try:
+            return self.document.get(key)
+        except ValueError:
+            return None
+
+    @property
+    def reply_code(self):
+        """
+        replyCode of the body, None if the body has none.
+        """
+        if self._reply_code is _MISSING:
+            self._reply_code = self._scan(_REPLY_CODE, 'replyCode')
+        return self._reply_code
+
+    @property
+    def reply_text(self):
+        """
+        replyText of the body, None if the body has none.
+        """
+        if self._reply_text is _MISSING:
+            self._reply_text = self._scan(_REPLY_TEXT, 'replyText')
+        return self._reply_text
+
+    def __getitem__(self, key):
+        return self.document[key]
+
+    def __iter__(self):
+        return iter(self.document)
+
+    def __len__(self):
+        return len(self.document)
@@ -0,0 +1,139 @@
+from array import array
+
+
+def _import_optional(name):
+    try:
+        return __import__(name)
+    except ImportError:
+        raise ImportError(
+            '{0} is needed for this conversion, install it with '
+            '"pip install {0}".'.format(name)
+        )
+
+
+class ResultFrame:
+    """
+    Columnar result of Contact.query and Contact.get_data. Contact ids are
+    stored as integers in an array and the values of every field in a column
+    keyed by field id, instead of one dictionary per contact.
+
+    Usage example:
+        >>> frame = client.contacts.get_data(
+        ...     3,
+        ...     ['squirrel1@squirrelmail.com', 'squirrel2@squirrelmail.com'],
+        ...     [1, 2],
+        ...     columnar=True
+        ... )
+        >>> frame.ids
+        array('q', [589058827, 589058576])
+        >>> frame[1]
+        ['Donald', 'Barack']
+        >>> frame.to_pandas()
+                  id       1      2         uid
+        0  589058827  Donald  Trump  g8XS7T1weS
+        1  589058576  Barack  Obama  g8XS7T1weS
+    """
+    __slots__ = ('ids', 'columns', 'errors')
+
+    def __init__(self, ids=None, columns=None, errors=None):
+        self.ids = array('q', ids or ())
+        self.columns = columns if columns is not None else {}
+        self.errors = errors if errors is not None else []
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Build a frame from the decoded response of query or get_data.
+        """
+        frame = cls()
+        data = response.get('data') or {}
+        frame.errors = list(data.get('errors') or [])
+        frame.extend_rows(data.get('result') or [])
+        return frame
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return '<ResultFrame of {} contacts with fields {}>'.format(
+            len(self),
+            ', '.join(self.columns)
+        )
+
+    def __getitem__(self, field_id):
+        """
+        :return: Values of a field for all the contacts.
+        """
+        return self.columns[str(field_id)]
+
+    def extend_rows(self, rows):
+        """
+        Append result rows, dictionaries of field ids to values with an
+        'id' key.
+        """
+        start = len(self.ids)
+        ids = self.ids
+        columns = self.columns
+        for position, row in enumerate(rows, start):
+            for field_id, value in row.items():
+                if field_id == 'id':
+                    ids.append(int(value))
+                    continue
+                column = columns.get(field_id)
+                if column is None:
+                    column = columns[field_id] = [None] * position
+                column.append(value)
+        length = len(ids)
+        for column in columns.values():
+            if len(column) < length:
+                column.extend([None] * (length - len(column)))
+
+    def extend(self, other):
+        """
+        Append the contacts of another frame, e.g. the next page of a query.
+        """
+        length = len(self.ids)
+        for field_id, column in other.columns.items():
+            if field_id not in self.columns:
+                self.columns[field_id] = [None] * length
+            self.columns[field_id].extend(column)
+        self.ids.extend(other.ids)
+        for column in self.columns.values():
+            if len(column) < len(self.ids):
+                column.extend([None] * (len(self.ids) - len(column)))
+        self.errors.extend(other.errors)
+
+    def to_dict(self):
+        """
+        :return: Dictionary of columns, contact ids under the 'id' key.
+        """
+        return dict(id=list(self.ids), **self.columns)
+
+    def to_pandas(self):
+        """
+        Convert the frame to a pandas DataFrame. Contact ids are shared with
+        the frame, not copied.
+        """
+        pandas = _import_optional('pandas')
+        numpy = _import_optional('numpy')
+        data = {'id': numpy.frombuffer(self.ids, dtype=numpy.int64)}
+        data.update(self.columns)
+        return pandas.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """
+        Convert the frame to a pyarrow Table. Contact ids are shared with the
+        frame, not copied.
+        """
+        pyarrow = _import_optional('pyarrow')
+        ids = pyarrow.Array.from_buffers(
+            pyarrow.int64(),
+            len(self.ids),
+            [None, pyarrow.py_buffer(self.ids)]
+        )
+        columns = [ids] + [pyarrow.array(column)
+                           for column in self.columns.values()]
+        return pyarrow.Table.from_arrays(
+            columns,
+            names=['id'] + list(self.columns)
+        )
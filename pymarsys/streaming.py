@@ -0,0 +1,204 @@
+import contextlib
+
+from .transports import TransportResponse
+
+
+@contextlib.contextmanager
+def open_destination(destination):
+    """
+    Open a download destination for writing.
+    :param destination: Path of a file, or binary file object which is left
+    open.
+    :return: Context manager giving a binary file object.
+    """
+    if hasattr(destination, 'write'):
+        yield destination
+        return
+    with open(destination, 'wb') as file:
+        yield file
+
+
+class AsyncStream:
+    """
+    Asynchronous iterator over the body of a call, chunk by chunk, returned
+    by AsyncConnection.stream. The call is sent on the first iteration.
+    It is written as a class rather than an async generator so that the
+    package still imports on Python 3.5.
+
+    :param connection: AsyncConnection.
+    :param request: url, headers, encoded payload and params of the call.
+    :param call: CallInfo of the call.
+    :param chunk_size: Maximum size of the chunks, in bytes.
+    :param decoder: Optional object turning chunks into items, see
+    AsyncConnection.stream.
+    """
+    def __init__(self, connection, request, call, chunk_size, decoder=None):
+        self.connection = connection
+        self.request = request
+        self.call = call
+        self.chunk_size = chunk_size
+        self.decoder = decoder
+        self._response = None
+        self._items = iter(())
+        self._started = False
+        self._pending = False
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def _open(self):
+        url, headers, data, params = self.request
+        response = await self.connection.transport.stream(
+            self.call.method,
+            url,
+            headers,
+            data,
+            params,
+            self.chunk_size
+        )
+        self._response = response
+        self.call.status = response.status
+        self.call.response_bytes = 0
+        if response.status >= 400:
+            body = b''
+            async for chunk in response.chunks:
+                body += chunk
+            self.connection.handle_response(self.call, TransportResponse(
+                response.status,
+                body,
+                response.headers,
+                response.reason
+            ))
+
+    async def _next_chunk(self):
+        if self._response is None:
+            await self._open()
+        chunk = await self._response.chunks.__anext__()
+        self.call.response_bytes += len(chunk)
+        return chunk
+
+    async def __anext__(self):
+        while True:
+            for item in self._items:
+                return item
+            if self._done:
+                raise StopAsyncIteration
+            if not self._started:
+                self._started = True
+                try:
+                    self.connection.on_request_start(self.call)
+                except Exception:
+                    self._done = True
+                    raise
+                self._pending = True
+            try:
+                chunk = await self._next_chunk()
+            except StopAsyncIteration:
+                self._pending = False
+                await self.aclose()
+                self.connection.on_request_end(self.call)
+                if self.decoder is None:
+                    raise
+                self._items = iter(self.decoder.close())
+                continue
+            except Exception as err:
+                self._pending = False
+                await self.aclose()
+                self.connection.on_error(self.call, err)
+                raise
+            except BaseException:
+                await self.aclose()
+                raise
+            if self.decoder is None:
+                return chunk
+            self._items = iter(self.decoder.feed(chunk))
+
+    async def aclose(self):
+        """
+        Stop the iteration and release the connection.
+        """
+        self._done = True
+        self._items = iter(())
+        if self._pending:
+            # Closed before the end of the body.
+            self._pending = False
+            self.connection.on_cancel(self.call)
+        if self._response is not None:
+            response, self._response = self._response, None
+            await response.aclose()
+
+
+class AsyncResults:
+    """
+    Asynchronous iterator over the results of RequestSpecs in completion
+    order, returned by AsyncConnection.iter_execute. At most `concurrency`
+    calls are in flight; the first failed call stops the iteration and
+    cancels the others.
+
+    :param connection: AsyncConnection.
+    :param specs: Iterable of RequestSpec objects, consumed lazily.
+    :param concurrency: Maximum number of calls in flight.
+    :param flatten: Yield the items of every result instead of the results.
+    """
+    def __init__(self, connection, specs, concurrency, flatten=False):
+        self.connection = connection
+        self.concurrency = max(1, concurrency)
+        self.flatten = flatten
+        self._specs = iter(specs)
+        self._pending = set()
+        self._completed = []
+        self._items = iter(())
+
+    def __aiter__(self):
+        return self
+
+    def _fill(self):
+        import asyncio
+
+        while len(self._pending) < self.concurrency:
+            spec = next(self._specs, None)
+            if spec is None:
+                return
+            self._pending.add(
+                asyncio.ensure_future(self.connection.run(spec))
+            )
+
+    async def __anext__(self):
+        import asyncio
+
+        while True:
+            for item in self._items:
+                return item
+            if not self._completed:
+                self._fill()
+                if not self._pending:
+                    raise StopAsyncIteration
+                done, self._pending = await asyncio.wait(
+                    self._pending,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                self._completed = list(done)
+            task = self._completed.pop()
+            try:
+                result = task.result()
+            except Exception:
+                await self.aclose()
+                raise
+            if not self.flatten:
+                return result
+            self._items = iter(result)
+
+    async def aclose(self):
+        """
+        Stop the iteration, cancelling the calls in flight.
+        """
+        self._specs = iter(())
+        self._items = iter(())
+        for task in self._pending:
+            task.cancel()
+        for task in self._completed:
+            if not task.cancelled():
+                task.exception()
+        self._pending = set()
+        self._completed = []
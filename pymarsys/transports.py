@@ -0,0 +1,486 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import inspect
+import threading
+
+from .encoding import StreamedBody
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class TransportResponse:
+    """
+    Raw HTTP response returned by a transport.
+    """
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
+    def __init__(self, status, body, headers=None, reason=''):
+        self.status = status
+        self.reason = reason
+        self.headers = headers if headers is not None else {}
+        self.body = body
+
+
+class StreamedResponse:
+    """
+    HTTP response returned by the stream method of a transport, whose body is
+    read chunk by chunk instead of being loaded in memory.
+    :param status: HTTP status.
+    :param chunks: Iterator of bytes, asynchronous for asynchronous
+    transports.
+    :param headers: HTTP headers.
+    :param reason: HTTP reason.
+    :param release: Function releasing the connection, possibly a coroutine
+    function for asynchronous transports.
+    """
+    __slots__ = ('status', 'reason', 'headers', 'chunks', '_release')
+
+    def __init__(self, status, chunks, headers=None, reason='', release=None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers if headers is not None else {}
+        self.chunks = chunks
+        self._release = release
+
+    def close(self):
+        if self._release is not None:
+            self._release()
+
+    async def aclose(self):
+        if self._release is not None:
+            result = self._release()
+            if inspect.isawaitable(result):
+                await result
+
+
+class AsyncChunks:
+    """
+    Asynchronous iterator over chunks already in memory.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        for chunk in self._chunks:
+            return chunk
+        raise StopAsyncIteration
+
+
+def _async_body(data):
+    # Asynchronous clients stream bodies from asynchronous iterables only.
+    if isinstance(data, StreamedBody):
+        return AsyncChunks(data)
+    return data
+
+
+def _split(body, chunk_size):
+    return (body[start:start + chunk_size]
+            for start in range(0, len(body), chunk_size))
+
+
+def _warm_up_threads(ping, url, connections):
+    # The pings wait for each other, so that none returns its connection to
+    # the pool before the others are opened.
+    if connections < 1:
+        return 0
+    barrier = threading.Barrier(connections)
+
+    def warm_up(_):
+        try:
+            barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        try:
+            ping(url)
+        except Exception:
+            # Warming up is best effort, the call itself will fail loudly.
+            return False
+        return True
+
+    with ThreadPoolExecutor(connections) as executor:
+        return sum(executor.map(warm_up, range(connections)))
+
+
+async def _warm_up_tasks(ping, url, connections):
+    import asyncio
+    results = await asyncio.gather(
+        *(ping(url) for _ in range(connections)),
+        return_exceptions=True
+    )
+    return sum(result is None for result in results)
+
+
+class BaseTransport(ABC):
+    """
+    Any transport used by a SyncConnection should inherit from this class.
+    A transport only moves bytes: authentication, encoding and decoding are
+    the connection's job.
+    """
+    @abstractmethod
+    def send(self, method, url, headers, data, params):
+        """
+        Send an HTTP request.
+        :param method: HTTP method.
+        :param url: Absolute url.
+        :param headers: HTTP headers.
+        :param data: Encoded HTTP payload.
+        :param params: HTTP params.
+        :return: TransportResponse.
+        """
+
+    def stream(self, method, url, headers, data, params,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Send an HTTP request whose response body is read chunk by chunk.
+        Transports which cannot stream read the whole body with send.
+        :param chunk_size: Maximum size of the chunks, in bytes.
+        :return: StreamedResponse.
+        """
+        response = self.send(method, url, headers, data, params)
+        return StreamedResponse(
+            response.status,
+            _split(response.body, chunk_size),
+            response.headers,
+            response.reason
+        )
+
+    def warmup(self, url, connections):
+        """
+        Open connections to a server in advance and leave them idle in the
+        pool, so that the first calls do not pay for DNS, TCP and TLS.
+        Transports without connections have nothing to do.
+        :param url: Url of the server.
+        :param connections: Number of connections to open.
+        :return: Number of warm-up requests which got a response.
+        """
+        return 0
+
+    def close(self):
+        """
+        Release the resources held by the transport.
+        """
+
+
+class BaseAsyncTransport(ABC):
+    """
+    Any transport used by an AsyncConnection should inherit from this class.
+    """
+    @abstractmethod
+    async def send(self, method, url, headers, data, params):
+        """
+        Send an HTTP request.
+        :param method: HTTP method.
+        :param url: Absolute url.
+        :param headers: HTTP headers.
+        :param data: Encoded HTTP payload.
+        :param params: HTTP params.
+        :return: TransportResponse.
+        """
+
+    async def stream(self, method, url, headers, data, params,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Send an HTTP request whose response body is read chunk by chunk.
+        Transports which cannot stream read the whole body with send.
+        :param chunk_size: Maximum size of the chunks, in bytes.
+        :return: StreamedResponse with an asynchronous iterator of chunks.
+        """
+        response = await self.send(method, url, headers, data, params)
+        return StreamedResponse(
+            response.status,
+            AsyncChunks(_split(response.body, chunk_size)),
+            response.headers,
+            response.reason
+        )
+
+    async def warmup(self, url, connections):
+        """
+        Open connections to a server in advance and leave them idle in the
+        pool, see BaseTransport.warmup.
+        :return: Number of warm-up requests which got a response.
+        """
+        return 0
+
+    async def close(self):
+        """
+        Release the resources held by the transport.
+        """
+
+
+class RequestsTransport(BaseTransport):
+    """
+    Transport based on a pooled requests session. requests is only imported
+    when the transport is instantiated.
+    :param session: requests.Session to use instead of creating one.
+    :param max_connections: If given, maximum number of connections kept
+    open per host: calls wait for a free connection instead of opening more.
+    """
+    def __init__(self, session=None, max_connections=None):
+        if session is None:
+            import requests
+            session = requests.Session()
+            if max_connections is not None:
+                from requests.adapters import HTTPAdapter
+                adapter = HTTPAdapter(pool_maxsize=max_connections,
+                                      pool_block=True)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+        self.session = session
+
+    def send(self, method, url, headers, data, params):
+        response = self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            params=params
+        )
+        return TransportResponse(
+            response.status_code,
+            response.content,
+            response.headers,
+            response.reason
+        )
+
+    def stream(self, method, url, headers, data, params,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        response = self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            params=params,
+            stream=True
+        )
+        return StreamedResponse(
+            response.status_code,
+            response.iter_content(chunk_size),
+            response.headers,
+            response.reason,
+            response.close
+        )
+
+    def _ping(self, url):
+        self.session.head(url).close()
+
+    def warmup(self, url, connections):
+        adapter = self.session.get_adapter(url)
+        size = getattr(adapter, '_pool_maxsize', connections)
+        # The pool of the adapter is grown in place, keeping its other
+        # settings, e.g. max_retries. Bounded pools, which make calls wait
+        # for a free connection, are not grown.
+        if size < connections and hasattr(adapter, 'init_poolmanager') \
+                and not getattr(adapter, '_pool_block', False):
+            adapter.poolmanager.clear()
+            adapter.init_poolmanager(adapter._pool_connections, connections,
+                                     block=adapter._pool_block)
+        return _warm_up_threads(self._ping, url, connections)
+
+    def close(self):
+        self.session.close()
+
+
+class AiohttpTransport(BaseAsyncTransport):
+    """
+    Transport based on an aiohttp session. aiohttp is imported and the
+    session is created on first use, so that the transport can be
+    instantiated outside of an event loop and without paying for aiohttp's
+    import until it is needed.
+    :param session: aiohttp.ClientSession to use instead of creating one.
+    :param max_connections: If given, maximum number of connections open at
+    the same time, aiohttp's default otherwise.
+    """
+    def __init__(self, session=None, max_connections=None):
+        self._session = session
+        self.max_connections = max_connections
+
+    @property
+    def session(self):
+        if self._session is None:
+            import aiohttp
+            connector = None
+            if self.max_connections is not None:
+                connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def send(self, method, url, headers, data, params):
+        async with self.session.request(
+                method,
+                url,
+                headers=headers,
+                data=_async_body(data),
+                params=params
+        ) as response:
+            return TransportResponse(
+                response.status,
+                await response.read(),
+                response.headers,
+                response.reason
+            )
+
+    async def stream(self, method, url, headers, data, params,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+        response = await self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=_async_body(data),
+            params=params
+        )
+        return StreamedResponse(
+            response.status,
+            response.content.iter_chunked(chunk_size),
+            response.headers,
+            response.reason,
+            response.release
+        )
+
+    async def _ping(self, url):
+        async with self.session.head(url) as response:
+            await response.read()
+
+    async def warmup(self, url, connections):
+        return await _warm_up_tasks(self._ping, url, connections)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+def _import_httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError(
+            'HTTP/2 transports need httpx and h2, install them with '
+            '"pip install pymarsys[http2]".'
+        )
+    return httpx
+
+
+class HttpxTransport(BaseTransport):
+    """
+    Transport based on an httpx client. With http2 enabled (the default),
+    concurrent calls made from several threads are multiplexed over a few
+    connections instead of opening one connection per call.
+    Needs the optional httpx and h2 dependencies.
+    :param http2: Negotiate HTTP/2 with the server.
+    :param max_connections: Maximum number of connections kept open.
+    :param client: httpx.Client to use instead of creating one.
+    """
+    def __init__(self, http2=True, max_connections=10, client=None):
+        httpx = _import_httpx()
+        if client is None:
+            client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(max_connections=max_connections)
+            )
+        self.client = client
+
+    def send(self, method, url, headers, data, params):
+        response = self.client.request(
+            method,
+            url,
+            headers=headers,
+            content=data,
+            params=params
+        )
+        return TransportResponse(
+            response.status_code,
+            response.content,
+            response.headers,
+            response.reason_phrase
+        )
+
+    def stream(self, method, url, headers, data, params,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        request = self.client.build_request(
+            method,
+            url,
+            headers=headers,
+            content=data,
+            params=params
+        )
+        response = self.client.send(request, stream=True)
+        return StreamedResponse(
+            response.status_code,
+            response.iter_bytes(chunk_size),
+            response.headers,
+            response.reason_phrase,
+            response.close
+        )
+
+    def _ping(self, url):
+        self.client.head(url)
+
+    def warmup(self, url, connections):
+        return _warm_up_threads(self._ping, url, connections)
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncHttpxTransport(BaseAsyncTransport):
+    """
+    Asynchronous transport based on an httpx client. With http2 enabled (the
+    default), the coroutines of an AsyncConnection share a few multiplexed
+    connections instead of opening one connection per concurrent call.
+    Needs the optional httpx and h2 dependencies.
+    :param http2: Negotiate HTTP/2 with the server.
+    :param max_connections: Maximum number of connections kept open.
+    :param client: httpx.AsyncClient to use instead of creating one.
+    """
+    def __init__(self, http2=True, max_connections=10, client=None):
+        httpx = _import_httpx()
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(max_connections=max_connections)
+            )
+        self.client = client
+
+    async def send(self, method, url, headers, data, params):
+        response = await self.client.request(
+            method,
+            url,
+            headers=headers,
+            content=_async_body(data),
+            params=params
+        )
+        return TransportResponse(
+            response.status_code,
+            response.content,
+            response.headers,
+            response.reason_phrase
+        )
+
+    async def stream(self, method, url, headers, data, params,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+        request = self.client.build_request(
+            method,
+            url,
+            headers=headers,
+            content=_async_body(data),
+            params=params
+        )
+        response = await self.client.send(request, stream=True)
+        return StreamedResponse(
+            response.status_code,
+            response.aiter_bytes(chunk_size),
+            response.headers,
+            response.reason_phrase,
+            response.aclose
+        )
+
+    async def _ping(self, url):
+        await self.client.head(url)
+
+    async def warmup(self, url, connections):
+        return await _warm_up_tasks(self._ping, url, connections)
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from itertools import islice
+import threading
+import time
+
+
+def chunked(items, size):
+    """
+    Split items in chunks of at most `size` items. Sequences, including
+    ContactBatch objects, are sliced; other iterables are consumed lazily.
+    :param items: Sequence or iterable.
+    :param size: Maximum size of the chunks.
+    :return: Generator of chunks.
+    """
+    if size < 1:
+        raise ValueError('size should be a positive integer.')
+    if hasattr(items, '__getitem__') and hasattr(items, '__len__'):
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+        return
+    iterator = iter(items)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class TTLCache:
+    """
+    Cache whose entries expire `ttl` seconds after being set. When it holds
+    more than `maxsize` entries, the oldest ones are evicted. It can be
+    shared by threads.
+    :param ttl: Lifetime of the entries, in seconds. 0 disables the cache.
+    :param maxsize: Maximum number of entries.
+    :param clock: Function returning the current time, in seconds.
+    """
+    def __init__(self, ttl, maxsize=100000, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        :return: Value of the key, or default if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self.clock() + self.ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,177 @@
+import datetime
+import re
+
+from .contact_batch import SKIP, ContactBatch
+
+SHORTTEXT_MAX_LENGTH = 60
+LONGTEXT_MAX_LENGTH = 255
+NUMERIC_MAX_DIGITS = 24
+CHOICE_TYPES = ('singlechoice', 'multichoice')
+
+_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})\Z')
+_NUMERIC = re.compile(r'-?\d+(?:\.\d+)?\Z')
+
+
+def _text(max_length):
+    def check(value):
+        if len(value if value.__class__ is str else str(value)) > max_length:
+            return 'Longer than {} characters.'.format(max_length)
+    return check
+
+
+def _numeric(value):
+    text = value if value.__class__ is str else str(value)
+    if value.__class__ is bool or not _NUMERIC.match(text):
+        return 'Not a number.'
+    if sum(character.isdigit() for character in text) > NUMERIC_MAX_DIGITS:
+        return 'More than {} digits.'.format(NUMERIC_MAX_DIGITS)
+
+
+def _date(value):
+    match = _DATE.match(value) if value.__class__ is str else None
+    if match is None:
+        return 'Not a date, expected YYYY-MM-DD.'
+    try:
+        datetime.date(*(int(part) for part in match.groups()))
+    except ValueError:
+        return 'Not a date, expected YYYY-MM-DD.'
+
+
+def _single_choice(choice_ids):
+    def check(value):
+        if str(value) not in choice_ids:
+            return 'Unknown choice {!r}.'.format(value)
+    return check
+
+
+def _multi_choice(choice_ids):
+    def check(value):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        unknown = [choice for choice in values
+                   if str(choice) not in choice_ids]
+        if unknown:
+            return 'Unknown choices {!r}.'.format(unknown)
+    return check
+
+
+def _unknown_field(value):
+    return 'Unknown field.'
+
+
+class FieldSchema:
+    """
+    Types of the contact fields of an account, checking contact values
+    before they are sent, so that a single bad value does not get a whole
+    batch rejected by Emarsys.
+
+    Values are checked column by column, with one check function per field
+    built once:
+    - shorttext: at most 60 characters,
+    - longtext: at most 255 characters,
+    - numeric: a number of at most 24 digits,
+    - date: a YYYY-MM-DD date,
+    - singlechoice and multichoice: ids of existing choices.
+    Other types, None, SKIP and non-numeric keys such as 'id' are not
+    checked. Numeric field ids missing from the schema are unknown fields.
+
+    Usage example:
+        >>> schema = client.contact_fields.schema()
+        >>> valid, errors = schema.validate([
+        ...     {3: 'squirrel@squirrelmail.com', 4: '2017-01-31'},
+        ...     {3: 'chipmunk@squirrelmail.com', 4: '31/01/2017'},
+        ... ])
+        >>> errors
+        {1: {'4': 'Not a date, expected YYYY-MM-DD.'}}
+
+    :param fields: Fields as listed by ContactField.list.
+    :param choices: Dictionary of the ids of choice fields to the ids of
+    their choices.
+    """
+    def __init__(self, fields, choices=None):
+        choices = choices or {}
+        self.types = {str(field['id']): field['application_type']
+                      for field in fields}
+        self.choices = {str(field_id): {str(choice) for choice in ids}
+                        for field_id, ids in choices.items()}
+        self._checks = {
+            field_id: self._check_function(field_id, field_type)
+            for field_id, field_type in self.types.items()
+        }
+
+    def __repr__(self):
+        return '<FieldSchema of {} fields>'.format(len(self.types))
+
+    def _check_function(self, field_id, field_type):
+        if field_type == 'shorttext':
+            return _text(SHORTTEXT_MAX_LENGTH)
+        if field_type == 'longtext':
+            return _text(LONGTEXT_MAX_LENGTH)
+        if field_type == 'numeric':
+            return _numeric
+        if field_type == 'date':
+            return _date
+        if field_type in CHOICE_TYPES and field_id in self.choices:
+            choice_ids = self.choices[field_id]
+            if field_type == 'singlechoice':
+                return _single_choice(choice_ids)
+            return _multi_choice(choice_ids)
+        return None
+
+    def check_column(self, field_id, values):
+        """
+        Check the values of a field for many contacts.
+        :param field_id: Id of the field.
+        :param values: Values of the field.
+        :return: Dictionary of the indexes of the invalid values to their
+        error.
+        """
+        field_id = str(field_id)
+        if not field_id.isdigit():
+            return {}
+        check = self._checks.get(field_id, _unknown_field)
+        if check is None:
+            return {}
+        errors = {}
+        for index, value in enumerate(values):
+            if value is None or value is SKIP:
+                continue
+            error = check(value)
+            if error is not None:
+                errors[index] = error
+        return errors
+
+    def validate(self, contacts):
+        """
+        Check contacts and set the invalid ones aside.
+        :param contacts: List of contact dictionaries, or ContactBatch.
+        :return: Valid contacts, of the same type as contacts, and
+        dictionary of the indexes of the invalid contacts to dictionaries of
+        their invalid field ids to their error.
+        """
+        errors = {}
+        if isinstance(contacts, ContactBatch):
+            columns = zip(contacts.field_ids, contacts.columns)
+        else:
+            field_ids = dict.fromkeys(
+                field_id for contact in contacts for field_id in contact
+            )
+            columns = (
+                (field_id, [contact.get(field_id) for contact in contacts])
+                for field_id in field_ids
+            )
+        for field_id, values in columns:
+            for index, error in self.check_column(field_id, values).items():
+                errors.setdefault(index, {})[str(field_id)] = error
+        if not errors:
+            return contacts, errors
+
+        if isinstance(contacts, ContactBatch):
+            keep = [index not in errors for index in range(len(contacts))]
+            valid = ContactBatch(contacts.field_ids, [
+                [value for value, kept in zip(column, keep) if kept]
+                for column in contacts.columns
+            ])
+        else:
+            valid = [contact for index, contact in enumerate(contacts)
+                     if index not in errors]
+        return valid, errors
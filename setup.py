@@ -43,6 +43,9 @@ requires = [
     'requests>=2.12.1',
     'aiohttp>=3.5.4',
 ]
+extras_requirements = {
+    'http2': ['httpx[http2]>=0.18'],
+}
 test_requirements = [
     'pytest==3.0.4',
     'aioresponses==0.5.1',
@@ -73,6 +76,7 @@ setup(
     package_dir={'pymarsys': 'pymarsys'},
     include_package_data=True,
     install_requires=requires,
+    extras_require=extras_requirements,
     license='Apache 2.0',
     zip_safe=False,
     classifiers=(
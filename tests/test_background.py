@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+from pymarsys.background import BackgroundWriter
+from pymarsys.connections import ApiCallError, SyncConnection
+from pymarsys.memory_transport import InMemoryTransport
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class Crash(BaseException):
+    pass
+
+
+def make_writer(transport, **kwargs):
+    connection = SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                transport=transport)
+    return BackgroundWriter(connection, **kwargs)
+
+
+class TestBackgroundWriter:
+    def test_submit_and_flush(self):
+        transport = InMemoryTransport()
+        with make_writer(transport, max_delay=10) as writer:
+            created = writer.submit_create({3: 'squirrel@squirrelmail.com'})
+            updates = [
+                writer.submit_update({3: 'squirrel@squirrelmail.com',
+                                      1: 'Squirrel'}),
+                writer.submit_update({3: 'squirrel@squirrelmail.com',
+                                      2: 'Nuts'}),
+            ]
+            writer.flush()
+
+            assert created.done()
+            contact_id = created.result()
+            assert [str(future.result()) for future in updates] == \
+                [str(contact_id), str(contact_id)]
+            fields = transport.emulator.contacts[int(contact_id)]
+            assert (fields['1'], fields['2']) == ('Squirrel', 'Nuts')
+            assert transport.emulator.requests == 2
+
+    def test_batches(self):
+        transport = InMemoryTransport()
+        with make_writer(transport, batch_size=10, max_delay=10) as writer:
+            futures = [
+                writer.submit_update(
+                    {3: 'squirrel{}@squirrelmail.com'.format(index)},
+                    upsert=True
+                )
+                for index in range(25)
+            ]
+            writer.flush()
+
+        assert all(future.result() for future in futures)
+        assert transport.emulator.requests == 3
+
+    def test_errors(self):
+        transport = InMemoryTransport()
+        with make_writer(transport) as writer:
+            future = writer.submit_update({3: 'unknown@squirrelmail.com',
+                                           1: 'Squirrel'})
+            with pytest.raises(ApiCallError):
+                future.result(timeout=5)
+
+    def test_close_drains_queue(self):
+        transport = InMemoryTransport()
+        writer = make_writer(transport, max_delay=10)
+        future = writer.submit_create({3: 'squirrel@squirrelmail.com'})
+        writer.close()
+
+        assert future.result(timeout=0)
+        assert len(transport.emulator.contacts) == 1
+        with pytest.raises(RuntimeError):
+            writer.submit_create({3: 'chipmunk@squirrelmail.com'})
+
+    def test_submit_while_closing(self):
+        transport = InMemoryTransport()
+        writer = make_writer(transport, max_delay=0.001, max_queued=5)
+        futures = []
+
+        def submit(index):
+            try:
+                while True:
+                    futures.append(writer.submit_update(
+                        {3: 'squirrel{}@squirrelmail.com'.format(index)},
+                        upsert=True
+                    ))
+            except RuntimeError:
+                pass
+
+        threads = [threading.Thread(target=submit, args=(index,))
+                   for index in range(4)]
+        for thread in threads:
+            thread.start()
+        while len(futures) < 20:
+            pass
+        writer.close()
+        for thread in threads:
+            thread.join(5)
+
+        assert all(future.result(timeout=5) for future in futures)
+
+    @pytest.mark.filterwarnings(
+        'ignore::pytest.PytestUnhandledThreadExceptionWarning'
+    )
+    def test_worker_stopped(self):
+        transport = InMemoryTransport()
+        writer = make_writer(transport, max_delay=10)
+
+        def crash(submissions):
+            raise Crash()
+
+        writer._send = crash
+        futures = [
+            writer.submit_create({3: 'squirrel@squirrelmail.com'}),
+            writer.submit_create({3: 'chipmunk@squirrelmail.com'}),
+        ]
+        writer.flush()
+
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+        with pytest.raises(RuntimeError):
+            writer.submit_create({3: 'squirrel@squirrelmail.com'})
+        writer._thread.join(5)
+        assert not writer._thread.is_alive()
+        writer.close()
@@ -0,0 +1,40 @@
+import aiohttp
+import requests
+
+from benchmarks import BENCHMARKS, prepared
+from benchmarks import (  # noqa: F401
+    bench_connections,
+    bench_contact,
+    bench_json,
+)
+from benchmarks.fixtures import PayloadConnection
+from pymarsys.request_spec import RequestSpec
+
+
+def test_benchmarks_run():
+    send = requests.adapters.HTTPAdapter.send
+    request = aiohttp.ClientSession._request
+
+    for func in BENCHMARKS:
+        with prepared(func) as target:
+            target()
+
+    # The HTTP mocks of the benchmarks are removed once they are done.
+    assert requests.adapters.HTTPAdapter.send is send
+    assert aiohttp.ClientSession._request is request
+
+
+def test_base_connection_runs_specs():
+    connection = PayloadConnection()
+    spec = RequestSpec('POST', 'api/v2/contact/', payload={'key_id': 3},
+                       transform=lambda payload: payload['key_id'])
+
+    assert connection.run(spec) == 3
+    assert connection.execute([spec, spec]) == [3, 3]
+
+    def plan():
+        first = yield spec
+        results = yield [spec, spec]
+        return [first] + results
+
+    assert connection.drive(plan()) == [3, 3, 3]
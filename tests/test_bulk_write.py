@@ -0,0 +1,269 @@
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+
+from pymarsys.bulk_write import BulkWriteResult, is_transient, key_value
+from pymarsys.circuit_breaker import CircuitOpenError
+from pymarsys.connections import ApiCallError, AsyncConnection, SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.contact_batch import ContactBatch
+from pymarsys.contact_field import ContactField
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
+from pymarsys.transports import TransportResponse
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class FailingTransport(InMemoryTransport):
+    """
+    Answers the first `failures` calls with a 503.
+    """
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def send(self, method, url, headers, data, params):
+        if self.failures:
+            self.failures -= 1
+            return TransportResponse(503, b'{}', reason='Unavailable')
+        return super().send(method, url, headers, data, params)
+
+
+class RaisingTransport(InMemoryTransport):
+    """
+    Raises the same error for every call.
+    """
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+        self.calls = 0
+
+    def send(self, method, url, headers, data, params):
+        self.calls += 1
+        raise self.error
+
+
+class StatusTransport(InMemoryTransport):
+    """
+    Answers every call with the same HTTP status.
+    """
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+        self.calls = 0
+
+    def send(self, method, url, headers, data, params):
+        self.calls += 1
+        return TransportResponse(self.status, b'{}', reason='Error')
+
+
+def make_contacts(count):
+    return [{3: 'squirrel{}@squirrelmail.com'.format(index), 1: 'Squirrel'}
+            for index in range(count)]
+
+
+def make_contacts_endpoint(transport):
+    return Contact(SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                  transport=transport))
+
+
+class TestHelpers:
+    def test_key_value(self):
+        assert key_value({3: 'a'}, 3) == 'a'
+        assert key_value({'3': 'a'}, 3) == 'a'
+
+    def test_is_transient(self):
+        assert is_transient(ApiCallError('', status=503))
+        assert is_transient(ApiCallError('', status=429))
+        assert is_transient(ApiCallError(''))
+        assert is_transient(OSError())
+        assert is_transient(requests.ConnectionError())
+        assert is_transient(aiohttp.ServerDisconnectedError())
+        assert not is_transient(ApiCallError('', status=400))
+        assert not is_transient(CircuitOpenError(''))
+        assert not is_transient(KeyError('id'))
+        assert not is_transient(TypeError())
+
+    def test_result(self):
+        result = BulkWriteResult()
+
+        assert result.ok
+        result.errors['a'] = {'2008': 'Not found'}
+        assert not result.ok
+
+
+class TestBulkWrites:
+    def test_bisect_rejected_batch(self):
+        transport = InMemoryTransport()
+        transport.emulator._write(100, {'3': 'squirrel5@squirrelmail.com'})
+        contacts = make_contacts(8)
+        contacts[2][999] = 'malformed'
+
+        result = make_contacts_endpoint(transport).bulk_create(contacts)
+
+        assert sorted(result.errors) == [
+            'squirrel2@squirrelmail.com',
+            'squirrel5@squirrelmail.com',
+        ]
+        assert '2004' in \
+            result.errors['squirrel2@squirrelmail.com']['call_error']
+        assert '2009' in result.errors['squirrel5@squirrelmail.com']
+        assert len(result.ids) == 6
+        assert result.calls == 7
+        assert len(transport.emulator.contacts) == 7
+
+    def test_bisect_contact_batch(self):
+        transport = InMemoryTransport()
+        batch = ContactBatch([3, 1])
+        for index in range(5):
+            batch.append('squirrel{}@squirrelmail.com'.format(index),
+                         'Squirrel')
+        transport.emulator._write(100, {'3': 'squirrel3@squirrelmail.com'})
+
+        result = make_contacts_endpoint(transport).bulk_update(
+            3,
+            batch,
+            chunk_size=2
+        )
+
+        assert sorted(result.errors) == [
+            'squirrel0@squirrelmail.com',
+            'squirrel1@squirrelmail.com',
+            'squirrel2@squirrelmail.com',
+            'squirrel4@squirrelmail.com',
+        ]
+        assert '2008' in result.errors['squirrel0@squirrelmail.com']
+        assert '2008' in result.errors['squirrel2@squirrelmail.com']
+        assert result.ids == {'squirrel3@squirrelmail.com': '100'}
+        assert result.calls == 3
+
+    def test_rejected_batch_with_record_errors(self):
+        transport = InMemoryTransport()
+
+        result = make_contacts_endpoint(transport).bulk_update(
+            3,
+            make_contacts(1000)
+        )
+
+        assert result.calls == 1
+        assert len(result.errors) == 1000
+        assert all('2008' in error for error in result.errors.values())
+        assert not result.ids
+
+    def test_fatal_errors_are_raised(self):
+        transport = StatusTransport(401)
+
+        with pytest.raises(ApiCallError) as error:
+            make_contacts_endpoint(transport).bulk_update(
+                3,
+                make_contacts(1000),
+                chunk_size=100
+            )
+        assert error.value.status == 401
+        assert transport.calls == 10
+
+    def test_unexpected_errors_are_raised(self):
+        transport = RaisingTransport(KeyError('id'))
+
+        with pytest.raises(KeyError):
+            make_contacts_endpoint(transport).bulk_create(
+                make_contacts(10),
+                chunk_size=5,
+                retry_delay=0
+            )
+        assert transport.calls == 2
+
+    def test_retry_network_errors(self):
+        transport = RaisingTransport(ConnectionResetError())
+
+        result = make_contacts_endpoint(transport).bulk_create(
+            make_contacts(2),
+            retries=2,
+            retry_delay=0
+        )
+
+        assert len(result.errors) == 2
+        assert (result.calls, result.retries) == (3, 2)
+
+    def test_retry_transient_errors(self):
+        transport = FailingTransport(failures=1)
+
+        result = make_contacts_endpoint(transport).bulk_create(
+            make_contacts(10),
+            chunk_size=5,
+            retry_delay=0
+        )
+
+        assert result.ok
+        assert len(result.ids) == 10
+        assert (result.calls, result.retries) == (3, 1)
+        assert transport.emulator.requests == 2
+
+    def test_retries_exhausted(self):
+        transport = FailingTransport(failures=3)
+
+        result = make_contacts_endpoint(transport).bulk_create(
+            make_contacts(2),
+            retries=2,
+            retry_delay=0.001
+        )
+
+        assert len(result.errors) == 2
+        assert '503' in result.errors['squirrel0@squirrelmail.com'][
+            'call_error']
+        assert (result.calls, result.retries) == (3, 2)
+
+    def test_async_bulk_update(self):
+        emulator = EmarsysEmulator()
+        contacts = make_contacts(6)
+        contacts[4][999] = 'malformed'
+
+        async def bulk_update():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator)
+            )
+            return await Contact(connection).bulk_update(
+                3,
+                contacts,
+                upsert=True,
+                chunk_size=3
+            )
+
+        loop = asyncio.get_event_loop()
+        result = loop.run_until_complete(bulk_update())
+        assert list(result.errors) == ['squirrel4@squirrelmail.com']
+        assert len(result.ids) == 5
+        assert len(emulator.contacts) == 5
+
+    def test_validation(self):
+        transport = InMemoryTransport()
+        contacts_endpoint = make_contacts_endpoint(transport)
+        schema = ContactField(contacts_endpoint.connection).schema()
+        contacts = make_contacts(4)
+        contacts[1][1] = 'S' * 61
+        contacts[3][4] = '2017-13-01'
+
+        result = contacts_endpoint.bulk_create(contacts, schema=schema)
+
+        assert sorted(result.ids) == [
+            'squirrel0@squirrelmail.com',
+            'squirrel2@squirrelmail.com',
+        ]
+        assert result.errors == {
+            'squirrel1@squirrelmail.com': {
+                'validation': {'1': 'Longer than 60 characters.'}
+            },
+            'squirrel3@squirrelmail.com': {
+                'validation': {'4': 'Not a date, expected YYYY-MM-DD.'}
+            },
+        }
+        assert result.calls == 1
@@ -0,0 +1,208 @@
+import asyncio
+
+import pytest
+
+from pymarsys.circuit_breaker import CircuitBreaker, CircuitOpenError
+from pymarsys.connections import ApiCallError, AsyncConnection, SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.hooks import CallInfo
+from pymarsys.memory_transport import AsyncInMemoryTransport, InMemoryTransport
+from pymarsys.transports import TransportResponse
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class FlakyTransport(InMemoryTransport):
+    def __init__(self):
+        super().__init__()
+        self.status = None
+
+    def send(self, method, url, headers, data, params):
+        if self.status is not None:
+            return TransportResponse(self.status, b'{}', reason='Error')
+        return super().send(method, url, headers, data, params)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **options):
+    return CircuitBreaker(min_calls=4, window=10, open_duration=5,
+                          clock=clock, **options)
+
+
+class TestCircuitBreaker:
+    def test_open_half_open_close(self):
+        clock = Clock()
+        breaker = make_breaker(clock)
+        transport = FlakyTransport()
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                    transport=transport,
+                                    circuit_breaker=breaker)
+        contacts = Contact(connection)
+
+        transport.status = 503
+        for _ in range(4):
+            with pytest.raises(ApiCallError) as error:
+                contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+            assert not isinstance(error.value, CircuitOpenError)
+        assert breaker.state('GET', 'api/v2/contact/') == 'open'
+
+        requests = transport.emulator.requests
+        with pytest.raises(CircuitOpenError):
+            contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+        assert transport.emulator.requests == requests
+        assert breaker.state('POST', 'api/v2/contact/') == 'closed'
+
+        clock.now = 5
+        assert breaker.state('GET', 'api/v2/contact/') == 'half_open'
+        with pytest.raises(ApiCallError):
+            contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+        assert breaker.state('GET', 'api/v2/contact/') == 'open'
+
+        clock.now = 10
+        transport.status = None
+        contacts.create({3: 'squirrel@squirrelmail.com'})
+        contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+        assert breaker.state('GET', 'api/v2/contact/') == 'closed'
+
+    def test_client_errors_and_window(self):
+        clock = Clock()
+        breaker = make_breaker(clock)
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                    transport=FlakyTransport(),
+                                    circuit_breaker=breaker)
+        contacts = Contact(connection)
+
+        for _ in range(6):
+            with pytest.raises(ApiCallError):
+                contacts.get_internal_id(3, 'missing@squirrelmail.com')
+        assert breaker.state('GET', 'api/v2/contact/') == 'closed'
+
+        for now in range(0, 40, 10):
+            clock.now = now
+            breaker.on_error(CallInfo('GET', 'api/v2/field/'), OSError())
+        assert breaker.state('GET', 'api/v2/field/') == 'closed'
+
+    def test_slow_calls_per_endpoint_id(self):
+        breaker = make_breaker(Clock(), slow_call_duration=1)
+        for list_id in range(4):
+            call = CallInfo('POST', 'api/v2/contactlist/{}/add/'.format(
+                list_id))
+            call.elapsed = 2
+            breaker.on_request_end(call)
+
+        assert breaker.state('POST', 'api/v2/contactlist/9/add/') == 'open'
+        breaker.reset()
+        assert breaker.state('POST', 'api/v2/contactlist/9/add/') == 'closed'
+
+    def test_async(self):
+        breaker = CircuitBreaker(min_calls=1, failure_threshold=1)
+
+        async def run():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(),
+                circuit_breaker=breaker
+            )
+            call = CallInfo('PUT', 'api/v2/contact/')
+            breaker.on_error(call, OSError())
+            results = await connection.execute(
+                [Contact(connection).defer().update({3: 'a'})],
+                return_exceptions=True
+            )
+            return results[0]
+
+        loop = asyncio.get_event_loop()
+        assert isinstance(loop.run_until_complete(run()), CircuitOpenError)
+
+    def test_cancelled_probe_is_released(self):
+        clock = Clock()
+        breaker = CircuitBreaker(min_calls=1, failure_threshold=1,
+                                 open_duration=5, clock=clock)
+        breaker.on_error(CallInfo('GET', 'api/v2/contact/'), OSError())
+        clock.now = 5
+        transport = AsyncInMemoryTransport(latency=1)
+
+        async def run():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         transport=transport,
+                                         circuit_breaker=breaker)
+            contacts = Contact(connection)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    contacts.get_internal_id(3, 'squirrel@squirrelmail.com'),
+                    0.01
+                )
+            assert breaker.state('GET', 'api/v2/contact/') == 'half_open'
+            transport.latency = 0
+            await contacts.create({3: 'squirrel@squirrelmail.com'})
+            await contacts.get_internal_id(3, 'squirrel@squirrelmail.com')
+
+        asyncio.get_event_loop().run_until_complete(run())
+        assert breaker.state('GET', 'api/v2/contact/') == 'closed'
+
+    def test_half_open_ignores_calls_other_than_probes(self):
+        clock = Clock()
+        breaker = CircuitBreaker(min_calls=1, failure_threshold=1,
+                                 open_duration=5, clock=clock)
+        late = CallInfo('GET', 'api/v2/contact/')
+        breaker.on_error(CallInfo('GET', 'api/v2/contact/'), OSError())
+        clock.now = 5
+        probe = CallInfo('GET', 'api/v2/contact/')
+        breaker.before_request(probe)
+
+        breaker.on_request_end(late)
+        assert breaker.state('GET', 'api/v2/contact/') == 'half_open'
+        breaker.on_error(late, OSError())
+        assert breaker.state('GET', 'api/v2/contact/') == 'half_open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request(CallInfo('GET', 'api/v2/contact/'))
+
+        breaker.on_request_end(probe)
+        assert breaker.state('GET', 'api/v2/contact/') == 'closed'
+
+    def test_stream_closed_early_releases_probe(self):
+        clock = Clock()
+        breaker = CircuitBreaker(min_calls=1, failure_threshold=1,
+                                 open_duration=5, clock=clock)
+        breaker.on_error(CallInfo('GET', 'api/v2/field/'), OSError())
+        clock.now = 5
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                    transport=InMemoryTransport(),
+                                    circuit_breaker=breaker)
+
+        chunks = connection.stream('GET', 'api/v2/field/', chunk_size=1)
+        next(chunks)
+        chunks.close()
+        assert breaker.state('GET', 'api/v2/field/') == 'half_open'
+        assert b''.join(connection.stream('GET', 'api/v2/field/'))
+        assert breaker.state('GET', 'api/v2/field/') == 'closed'
+
+    def test_async_stream_closed_early_releases_probe(self):
+        clock = Clock()
+        breaker = CircuitBreaker(min_calls=1, failure_threshold=1,
+                                 open_duration=5, clock=clock)
+        breaker.on_error(CallInfo('GET', 'api/v2/field/'), OSError())
+        clock.now = 5
+
+        async def run():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         transport=AsyncInMemoryTransport(),
+                                         circuit_breaker=breaker)
+            stream = connection.stream('GET', 'api/v2/field/', chunk_size=1)
+            await stream.__anext__()
+            await stream.aclose()
+            assert breaker.state('GET', 'api/v2/field/') == 'half_open'
+            async for _ in connection.stream('GET', 'api/v2/field/'):
+                pass
+
+        asyncio.get_event_loop().run_until_complete(run())
+        assert breaker.state('GET', 'api/v2/field/') == 'closed'
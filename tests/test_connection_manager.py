@@ -0,0 +1,210 @@
+import asyncio
+import threading
+
+import pytest
+
+from pymarsys.connection_manager import (
+    AsyncConnectionManager,
+    AsyncFairScheduler,
+    ConnectionManager,
+    RateLimiter,
+)
+from pymarsys.connections import AsyncConnection, SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.memory_transport import AsyncInMemoryTransport, InMemoryTransport
+
+
+class CountingTransport(InMemoryTransport):
+    """
+    Records the maximum number of calls in flight.
+    """
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send(self, method, url, headers, data, params):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return super().send(method, url, headers, data, params)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    def test_reserve(self):
+        clock = FakeClock()
+        limiter = RateLimiter(2, burst=2, clock=clock)
+
+        assert [limiter.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+        clock.now = 10
+        assert limiter.reserve() == 0
+
+    def test_invalid_rate(self):
+        for rate in [0, -1]:
+            with pytest.raises(ValueError):
+                RateLimiter(rate)
+
+
+class TestFairScheduler:
+    def test_accounts_are_served_in_turn(self):
+        scheduler = AsyncFairScheduler(1)
+        served = []
+
+        async def call(account):
+            await scheduler.acquire(account)
+            served.append(account)
+            await asyncio.sleep(0)
+            scheduler.release()
+
+        async def run():
+            await scheduler.acquire('bulk')
+            tasks = [asyncio.ensure_future(call(account))
+                     for account in ['bulk', 'bulk', 'bulk', 'shop']]
+            await asyncio.sleep(0)
+            assert scheduler.waiting() == {'bulk': 3, 'shop': 1}
+            scheduler.release()
+            await asyncio.gather(*tasks)
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(run())
+        assert served == ['bulk', 'shop', 'bulk', 'bulk']
+        assert scheduler.free == 1
+
+    def test_cancelled_waiter(self):
+        scheduler = AsyncFairScheduler(1)
+
+        async def run():
+            await scheduler.acquire('a')
+            task = asyncio.ensure_future(scheduler.acquire('b'))
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.sleep(0)
+            assert scheduler.waiting() == {}
+            scheduler.release()
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(run())
+        assert scheduler.free == 1
+
+
+class TestConnectionManager:
+    def test_add(self):
+        manager = ConnectionManager(transport=InMemoryTransport())
+        shop = manager.add('shop', 'username', 'secret', rate=10)
+        manager.add('bulk', 'username2', 'secret2')
+
+        assert isinstance(shop, SyncConnection)
+        assert manager['shop'] is shop
+        assert manager.accounts == ['shop', 'bulk']
+        assert 'bulk' in manager and len(manager) == 2
+        assert shop.transport.transport is manager.transport
+        with pytest.raises(ValueError):
+            manager.add('shop', 'username', 'secret')
+        manager.remove('bulk')
+        assert manager.accounts == ['shop']
+
+    def test_shared_pool_is_bounded(self):
+        transport = CountingTransport(latency=0.01)
+        manager = ConnectionManager(max_connections=3, transport=transport)
+        for account in ['a', 'b']:
+            manager.add(account, 'username', 'secret')
+        threads = [
+            threading.Thread(
+                target=manager[account].execute,
+                args=([
+                    Contact(manager[account]).defer().create(
+                        {3: '{}{}@squirrelmail.com'.format(account, index)}
+                    )
+                    for index in range(5)
+                ],),
+                kwargs={'concurrency': 5}
+            )
+            for account in ['a', 'b']
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert transport.max_in_flight == 3
+        assert len(transport.emulator.contacts) == 10
+        assert manager.scheduler.free == 3
+
+    def test_async_manager(self):
+        async def run():
+            manager = AsyncConnectionManager(
+                max_connections=2,
+                transport=AsyncInMemoryTransport(latency=0.001)
+            )
+            connection = manager.add('shop', 'username', 'secret', rate=1000)
+            assert isinstance(connection, AsyncConnection)
+            contacts = Contact(connection)
+            await asyncio.gather(*(
+                contacts.create({3: 'squirrel{}@squirrelmail.com'.format(i)})
+                for i in range(5)
+            ))
+            await manager.close()
+            return manager
+
+        loop = asyncio.get_event_loop()
+        manager = loop.run_until_complete(run())
+        assert len(manager.transport.emulator.contacts) == 5
+        assert manager.scheduler.free == 2
+
+    def test_stream_released_at_end_of_body(self):
+        manager = ConnectionManager(max_connections=1,
+                                    transport=InMemoryTransport())
+        transport = manager.add('shop', 'username', 'secret').transport
+
+        response = transport.stream(
+            'GET',
+            'https://api.emarsys.net/api/v2/field/',
+            {},
+            None,
+            None,
+            chunk_size=4
+        )
+        assert manager.scheduler.free == 0
+        assert b''.join(response.chunks)
+        assert manager.scheduler.free == 1
+        response.close()
+        assert manager.scheduler.free == 1
+
+    def test_async_stream_released_at_end_of_body(self):
+        async def run():
+            manager = AsyncConnectionManager(
+                max_connections=1,
+                transport=AsyncInMemoryTransport()
+            )
+            transport = manager.add('shop', 'username', 'secret').transport
+            response = await transport.stream(
+                'GET',
+                'https://api.emarsys.net/api/v2/field/',
+                {},
+                None,
+                None,
+                chunk_size=4
+            )
+            free = [manager.scheduler.free]
+            async for _ in response.chunks:
+                pass
+            free.append(manager.scheduler.free)
+            await response.aclose()
+            free.append(manager.scheduler.free)
+            return free
+
+        loop = asyncio.get_event_loop()
+        assert loop.run_until_complete(run()) == [0, 1, 1]
@@ -1,15 +1,21 @@
 import asyncio
 import datetime
+import time
 from urllib.parse import urljoin
 
 from aioresponses import aioresponses
+import pytest
 import responses
 
 from pymarsys.connections import (
+    ApiCallError,
     BaseConnection,
+    ReplyCodeError,
     SyncConnection,
     AsyncConnection,
 )
+from pymarsys.hooks import RequestHook
+from pymarsys.response import EmarsysResponse
 
 EMARSYS_URI = 'https://api.emarsys.net/'
 TEST_USERNAME = 'test_username'
@@ -73,6 +79,71 @@ class TestSyncConnection():
         response = connection.make_call('GET', 'api/v2/settings')
         assert response == EMARSYS_SETTINGS_RESPONSE
 
+    @responses.activate
+    def test_lazy_response(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            json=EMARSYS_SETTINGS_RESPONSE,
+            status=200
+        )
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI,
+                                    response_mode='lazy')
+
+        response = connection.make_call('GET', 'api/v2/settings')
+        assert isinstance(response, EmarsysResponse)
+        assert response.reply_code == 0
+        assert response.data == EMARSYS_SETTINGS_RESPONSE['data']
+
+    @responses.activate
+    def test_reply_code_errors(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            body='{"replyCode": 1, "replyText": "Unexpected", "data": ""}',
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/contact/'),
+            body='{"replyCode": 2008, "replyText": "No contact found"}',
+            status=400
+        )
+        lazy = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI,
+                              response_mode='lazy')
+        raw = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI,
+                             response_mode='raw')
+
+        with pytest.raises(ReplyCodeError) as error:
+            lazy.make_call('GET', 'api/v2/settings')
+        assert (error.value.reply_code, error.value.reply_text) == \
+            (1, 'Unexpected')
+        assert raw.make_call('GET', 'api/v2/settings').body == \
+            b'{"replyCode": 1, "replyText": "Unexpected", "data": ""}'
+        with pytest.raises(ReplyCodeError) as error:
+            raw.make_call('GET', 'api/v2/contact/')
+        assert (error.value.status, error.value.reply_code) == (400, 2008)
+
+    def test_unknown_response_mode(self):
+        with pytest.raises(ValueError):
+            SyncConnection(TEST_USERNAME, TEST_SECRET, response_mode='xml')
+
+    @responses.activate
+    def test_warmup_keepalive(self):
+        responses.add(responses.HEAD, EMARSYS_URI, status=401)
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI)
+
+        assert connection.warmup(2, keepalive=0.01) == 2
+        deadline = time.monotonic() + 5
+        while len(responses.calls) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        connection.close()
+        calls = len(responses.calls)
+
+        assert calls >= 6
+        time.sleep(0.05)
+        assert len(responses.calls) == calls
+
 
 class TestAsyncConnection():
     def test_init(self):
@@ -102,3 +173,83 @@ class TestAsyncConnection():
             loop = asyncio.get_event_loop()
             response = loop.run_until_complete(coroutine)
             assert response == EMARSYS_SETTINGS_RESPONSE
+
+    def test_warmup_keepalive(self):
+        async def warmup():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         EMARSYS_URI)
+            warmed = await connection.warmup(2, keepalive=0.01)
+            await asyncio.sleep(0.05)
+            keepalive = connection._keepalive
+            await connection.close()
+            return warmed, keepalive
+
+        with aioresponses() as m:
+            m.head(EMARSYS_URI, status=401, repeat=True)
+            loop = asyncio.get_event_loop()
+            warmed, keepalive = loop.run_until_complete(warmup())
+            loop.run_until_complete(asyncio.sleep(0))
+            requests = sum(len(calls) for calls in m.requests.values())
+
+        assert warmed == 2
+        assert requests > 2
+        assert keepalive.cancelled()
+
+
+class RecordingHook(RequestHook):
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, call):
+        self.events.append(('start', call.endpoint, call.status))
+
+    def on_request_end(self, call):
+        self.events.append(('end', call.endpoint, call.status))
+
+    def on_error(self, call, error):
+        self.events.append(('error', call.endpoint, call.status))
+
+
+class TestConnectionHooks():
+    @responses.activate
+    def test_hooks_success(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            json=EMARSYS_SETTINGS_RESPONSE,
+            status=200,
+            content_type='application/json'
+        )
+        hook = RecordingHook()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            EMARSYS_URI,
+            hooks=[hook]
+        )
+
+        connection.make_call('GET', 'api/v2/settings')
+        assert hook.events == [
+            ('start', 'api/v2/settings', None),
+            ('end', 'api/v2/settings', 200),
+        ]
+
+    @responses.activate
+    def test_hooks_error(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            json={'replyCode': 1, 'replyText': 'Unauthorized'},
+            status=401,
+            content_type='application/json'
+        )
+        hook = RecordingHook()
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET, EMARSYS_URI)
+        connection.add_hook(hook)
+
+        with pytest.raises(ApiCallError):
+            connection.make_call('GET', 'api/v2/settings')
+        assert hook.events == [
+            ('start', 'api/v2/settings', None),
+            ('error', 'api/v2/settings', 401),
+        ]
@@ -1,9 +1,17 @@
+import asyncio
+import json
+
 import pytest
 import responses
 from urllib.parse import urljoin
 
-from pymarsys.connections import SyncConnection
-from pymarsys.contact import Contact
+from pymarsys.connections import AsyncConnection, SyncConnection
+from pymarsys.contact import Contact, date_windows
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
 
 EMARSYS_URI = 'https://api.emarsys.net/'
 CONTACT_ENDPOINT = 'api/v2/contact/'
@@ -132,6 +140,31 @@ EMARSYS_CONTACTS_DELETE_RESPONSE = {
 }
 
 
+def make_history_emulator():
+    emulator = EmarsysEmulator()
+    emulator.history = [
+        {
+            'contactId': str(contact_id),
+            'emailId': email_id,
+            'launch_date': '2017-01-{:02d} 10:00:00'.format(day),
+        }
+        for contact_id in range(10)
+        for email_id, day in enumerate(range(1, 32, 3))
+    ]
+    return emulator
+
+
+def record_key(record):
+    return record['contactId'], record['emailId']
+
+
+def expected_history(emulator, start_date, end_date):
+    return sorted(
+        record_key(record) for record in emulator.history
+        if start_date <= record['launch_date'][:10] <= end_date
+    )
+
+
 class TestContact:
     def test_init_no_exception(self):
         connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
@@ -156,6 +189,15 @@ class TestContact:
         response = contacts.create({'3': 'squirrel@squirrelmail.com'})
         assert response == EMARSYS_CONTACTS_CREATE_RESPONSE
 
+    def test_deferred_payload_is_a_copy(self):
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+        contact = {'3': 'squirrel@squirrelmail.com'}
+
+        spec = Contact(connection).defer().create(contact)
+        contact['3'] = 'chipmunk@squirrelmail.com'
+        assert spec.payload == {'3': 'squirrel@squirrelmail.com'}
+        assert spec.payload is not contact
+
     @responses.activate
     def test_create_many(self):
         responses.add(
@@ -240,6 +282,72 @@ class TestContact:
         )
         assert response == EMARSYS_CONTACTS_GET_CONTACT_HISTORY_RESPONSE
 
+        contacts.get_history([723005829], '2016-11-24', '2016-12-31')
+        assert json.loads(responses.calls[1].request.body) == {
+            'contacts': [723005829],
+            'startDate': '2016-11-24',
+            'endDate': '2016-12-31',
+        }
+
+    def test_date_windows(self):
+        assert date_windows('2017-01-30', '2017-02-05', 3) == [
+            ('2017-01-30', '2017-02-01'),
+            ('2017-02-02', '2017-02-04'),
+            ('2017-02-05', '2017-02-05'),
+        ]
+        with pytest.raises(ValueError):
+            date_windows('2017-01-30', '2017-02-05', 0)
+
+    def test_iter_history(self):
+        emulator = make_history_emulator()
+        contacts = Contact(SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        ))
+
+        records = contacts.iter_history(
+            range(10),
+            start_date='2017-01-01',
+            end_date='2017-01-31',
+            chunk_size=3,
+            window_days=10,
+            concurrency=4
+        )
+        assert sorted(record_key(record) for record in records) == \
+            expected_history(emulator, '2017-01-01', '2017-01-31')
+        assert emulator.requests == 4 * 4
+
+        assert len(contacts.defer().iter_history(range(10))) == 1
+        with pytest.raises(ValueError):
+            contacts.iter_history(range(10), window_days=10)
+
+    def test_iter_history_async(self):
+        emulator = make_history_emulator()
+
+        async def iter_history():
+            contacts = Contact(AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            ))
+            records = []
+            async for record in contacts.iter_history(
+                    range(10),
+                    start_date='2017-01-05',
+                    end_date='2017-01-25',
+                    chunk_size=4,
+                    window_days=7
+            ):
+                records.append(record_key(record))
+            return records
+
+        loop = asyncio.get_event_loop()
+        records = loop.run_until_complete(iter_history())
+        assert sorted(records) == \
+            expected_history(emulator, '2017-01-05', '2017-01-25')
+        assert emulator.requests == 3 * 3
+
     @responses.activate
     def test_get_internal_id(self):
         responses.add(
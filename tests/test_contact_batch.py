@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from pymarsys.connections import SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.contact_batch import SKIP, ContactBatch
+from pymarsys.encoding import JSONFragment, StreamedBody, encode_payload
+from pymarsys.hooks import CallInfo
+from pymarsys.memory_transport import EmarsysEmulator, InMemoryTransport
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+CONTACTS = [
+    {'3': 'squirrel1@squirrelmail.com', '1': 'Squirrél', '31': 1},
+    {'3': 'squirrel2@squirrelmail.com', '1': None},
+]
+
+
+class TestContactBatch:
+    def test_from_dicts(self):
+        batch = ContactBatch.from_dicts(CONTACTS)
+
+        assert len(batch) == 2
+        assert batch.field_ids == ('3', '1', '31')
+        assert batch.column(31) == [1, SKIP]
+        assert list(batch) == CONTACTS
+
+    def test_append_wrong_length(self):
+        batch = ContactBatch([3, 1])
+
+        with pytest.raises(ValueError):
+            batch.append('squirrel@squirrelmail.com')
+
+    def test_columns_length(self):
+        with pytest.raises(ValueError):
+            ContactBatch([3, 1], [['a', 'b'], ['c']])
+
+    def test_to_json(self):
+        batch = ContactBatch.from_dicts(CONTACTS)
+
+        assert json.loads(batch.to_json()) == CONTACTS
+
+    def test_chunks(self):
+        batch = ContactBatch.from_rows(
+            [3],
+            [['squirrel{}@squirrelmail.com'.format(i)] for i in range(5)]
+        )
+
+        assert [len(chunk) for chunk in batch.chunks(2)] == [2, 2, 1]
+        assert list(batch.chunks(2))[2][0] == {
+            '3': 'squirrel4@squirrelmail.com'
+        }
+
+    def test_encode_payload(self):
+        batch = ContactBatch.from_dicts(CONTACTS)
+
+        encoded = encode_payload({'key_id': 3, 'contacts': batch})
+        assert json.loads(encoded) == {'key_id': 3, 'contacts': CONTACTS}
+
+    def test_json_fragment_is_abstract(self):
+        with pytest.raises(TypeError):
+            JSONFragment()
+
+    def test_iter_json_parts(self):
+        batch = ContactBatch.from_dicts(CONTACTS * 3)
+
+        assert ''.join(batch.iter_json_parts(rows=2)) == batch.to_json()
+        assert ''.join(ContactBatch([3]).iter_json_parts()) == '[]'
+
+    def test_streamed_body(self):
+        batch = ContactBatch.from_dicts(CONTACTS * 100)
+        payload = {'key_id': 3, 'contacts': batch, 'empty': []}
+        call = CallInfo('PUT', 'api/v2/contact/')
+        body = StreamedBody(payload, chunk_size=1024, call=call)
+
+        chunks = list(body)
+        assert len(chunks) > 1
+        assert all(len(chunk) < 2048 for chunk in chunks)
+        assert b''.join(chunks) == encode_payload(payload).encode('utf-8')
+        assert list(body) == chunks
+        assert call.request_bytes == sum(len(chunk) for chunk in chunks)
+
+    def test_streamed_update_many(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator),
+            stream_threshold=2
+        )
+        contacts = [{'3': 'squirrel{}@squirrelmail.com'.format(index)}
+                    for index in range(3)]
+
+        response = Contact(connection).update_many(3, contacts, upsert=True)
+        assert response['data']['ids'] == ['1', '2', '3']
+        assert connection.prepare_call(
+            'PUT', 'api/v2/contact/', None, {'contacts': contacts}, None
+        )[2].__class__ is StreamedBody
+
+    def test_update_many(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        contacts = Contact(connection)
+        batch = ContactBatch.from_dicts(CONTACTS)
+
+        response = contacts.update_many(3, batch, upsert=True)
+        assert response['data']['ids'] == ['1', '2']
+        assert emulator.contacts[1] == CONTACTS[0]
@@ -1,9 +1,16 @@
+import asyncio
+
 import pytest
 import responses
 from urllib.parse import urljoin
 
-from pymarsys.connections import SyncConnection
+from pymarsys.connections import AsyncConnection, SyncConnection
 from pymarsys.contact_field import ContactField
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
 
 EMARSYS_URI = 'https://api.emarsys.net/'
 CONTACT_ENDPOINT = 'api/v2/contact/'
@@ -53,6 +60,21 @@ EMARSYS_CONTACT_FIELDS_LAST_CHANGE = {
 }
 
 
+def make_audit_emulator():
+    emulator = EmarsysEmulator()
+    for index in range(1, 6):
+        emulator._write(index, {'3': 'squirrel{}@squirrelmail.com'
+                                     .format(index)})
+    for index in range(1, 5):
+        emulator._write(index, {'31': '1'})
+    return emulator
+
+
+def squirrels():
+    return ['squirrel{}@squirrelmail.com'.format(index)
+            for index in range(1, 7)]
+
+
 class TestContactField:
     def test_init_no_exception(self):
         connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
@@ -139,3 +161,97 @@ class TestContactField:
             1
         )
         assert response == EMARSYS_CONTACT_FIELDS_LAST_CHANGE
+
+    def test_last_change_many(self):
+        emulator = make_audit_emulator()
+        contact_fields = ContactField(SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        ))
+
+        result = contact_fields.last_change_many(3, squirrels(), 31,
+                                                 concurrency=3)
+        assert sorted(result['changes']) == [
+            ('squirrel{}@squirrelmail.com'.format(index), 31)
+            for index in range(1, 5)
+        ]
+        assert result['changes'][('squirrel1@squirrelmail.com', 31)][
+            'current_value'] == '1'
+        assert sorted(result['errors']) == [
+            ('squirrel5@squirrelmail.com', 31),
+            ('squirrel6@squirrelmail.com', 31),
+        ]
+        assert emulator.requests == 6
+
+        result = contact_fields.last_change_many(3, squirrels(), [31])
+        assert len(result['changes']) == 4
+        assert emulator.requests == 8
+
+        contact_fields.last_change_many(3, squirrels(), 31, use_cache=False)
+        assert emulator.requests == 14
+
+    def test_last_change_many_async(self):
+        emulator = make_audit_emulator()
+
+        async def last_change_many():
+            contact_fields = ContactField(
+                AsyncConnection(
+                    TEST_USERNAME,
+                    TEST_SECRET,
+                    transport=AsyncInMemoryTransport(emulator, latency=0.001)
+                ),
+                last_change_ttl=0
+            )
+            first = await contact_fields.last_change_many(
+                3,
+                squirrels(),
+                [3, 31],
+                concurrency=4
+            )
+            second = await contact_fields.last_change_many(
+                3,
+                squirrels(),
+                [3, 31]
+            )
+            return first, second
+
+        loop = asyncio.get_event_loop()
+        first, second = loop.run_until_complete(last_change_many())
+        assert len(first['changes']) == 9
+        assert len(first['errors']) == 3
+        assert first == second
+        assert emulator.requests == 24
+
+    def test_schema(self):
+        emulator = EmarsysEmulator()
+        contact_fields = ContactField(SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        ))
+
+        schema = contact_fields.schema()
+        assert schema.types['4'] == 'date'
+        assert schema.choices == {'31': {'1', '2'}}
+        assert emulator.requests == 2
+        assert contact_fields.schema() is schema
+        assert emulator.requests == 2
+        contact_fields.schema(use_cache=False)
+        assert emulator.requests == 4
+
+    def test_schema_async(self):
+        emulator = EmarsysEmulator()
+
+        async def schema():
+            contact_fields = ContactField(AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator)
+            ))
+            return await contact_fields.schema()
+
+        loop = asyncio.get_event_loop()
+        assert loop.run_until_complete(schema()).check_column(31, [3]) == {
+            0: 'Unknown choice 3.'
+        }
@@ -1,9 +1,22 @@
+import asyncio
+
 import pytest
 import responses
 from urllib.parse import urljoin
 
-from pymarsys.connections import SyncConnection
-from pymarsys.contact_list import ContactList
+from pymarsys.connections import (
+    AsyncConnection,
+    ReplyCodeError,
+    SyncConnection,
+)
+from pymarsys.contact import Contact
+from pymarsys.contact_list import CALL_FAILED_REPLY_CODE, ContactList
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
+from pymarsys.transports import TransportResponse
 
 EMARSYS_URI = "https://api.emarsys.net/"
 CONTACT_LIST_ENDPOINT = "api/v2/contactlist/"
@@ -25,6 +38,24 @@ EMARSYS_ADD_TO_CONTACT_LIST_RESPONSE = {
     "data": {"inserted_contacts": 1},
 }
 
+
+class FailingTransport(InMemoryTransport):
+    """
+    Answers the first `failures` calls with a 503, only counting the calls
+    whose url contains `path` if given.
+    """
+    def __init__(self, emulator=None, failures=0, path=None):
+        super().__init__(emulator)
+        self.failures = failures
+        self.path = path
+
+    def send(self, method, url, headers, data, params):
+        if self.failures and (self.path is None or self.path in url):
+            self.failures -= 1
+            return TransportResponse(503, b"{}", reason="Unavailable")
+        return super().send(method, url, headers, data, params)
+
+
 class TestContactList:
     def test_init_no_exception(self):
         connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
@@ -62,3 +93,244 @@ class TestContactList:
 
         response = contact_list.add_contacts(1, ["squirrel1@squirrelmail.com"])
         assert response == EMARSYS_ADD_TO_CONTACT_LIST_RESPONSE
+
+    def test_add_contacts_chunked(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        emails = ["squirrel{}@squirrelmail.com".format(i) for i in range(10)]
+        Contact(connection).create_many([{3: email} for email in emails[:8]],
+                                        key_id=3)
+        contact_list = ContactList(connection)
+        list_id = contact_list.create("test_list")["data"]["id"]
+
+        response = contact_list.add_contacts(list_id, emails, chunk_size=3)
+        assert response["data"]["inserted_contacts"] == 8
+        assert sorted(response["data"]["errors"]) == emails[8:]
+        assert emulator.requests == 1 + 1 + 4
+
+    def test_add_contacts_chunked_failed_calls(self):
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport()
+        )
+        contact_list = ContactList(connection)
+
+        with pytest.raises(ReplyCodeError) as error:
+            contact_list.add_contacts(404, [1, 2, 3], chunk_size=2)
+        assert error.value.reply_code == 3004
+
+    def test_add_contacts_chunked_partly_failed(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        emails = ["squirrel{}@squirrelmail.com".format(i) for i in range(4)]
+        Contact(connection).create_many([{3: email} for email in emails],
+                                        key_id=3)
+        contact_list = ContactList(connection)
+        list_id = contact_list.create("test_list")["data"]["id"]
+        connection.transport = FailingTransport(emulator, failures=1)
+
+        response = contact_list.add_contacts(list_id, emails, chunk_size=2)
+        assert response["replyCode"] == CALL_FAILED_REPLY_CODE
+        assert response["replyText"] == "1 of 2 calls failed."
+        assert response["data"]["inserted_contacts"] == 2
+        assert sorted(response["data"]["errors"]) == emails[:2]
+
+    def test_add_contacts_iterator(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        emails = ["squirrel{}@squirrelmail.com".format(i) for i in range(2)]
+        Contact(connection).create_many([{3: email} for email in emails],
+                                        key_id=3)
+        contact_list = ContactList(connection)
+        list_id = contact_list.create("test_list")["data"]["id"]
+
+        response = contact_list.add_contacts(list_id, iter(emails))
+        assert response["data"]["inserted_contacts"] == 2
+
+    def test_add_contacts_chunked_async(self):
+        emulator = EmarsysEmulator()
+
+        async def add_contacts():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            )
+            await Contact(connection).create_many(
+                [{3: str(i)} for i in range(100)],
+                key_id=3
+            )
+            contact_list = ContactList(connection)
+            response = await contact_list.create("test_list")
+            return await contact_list.add_contacts(
+                response["data"]["id"],
+                [str(i) for i in range(100)],
+                chunk_size=10,
+                concurrency=5
+            )
+
+        loop = asyncio.get_event_loop()
+        response = loop.run_until_complete(add_contacts())
+        assert response["data"] == {"inserted_contacts": 100, "errors": {}}
+
+    def test_sync_members(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        Contact(connection).create_many(
+            [{3: str(i)} for i in range(1, 21)],
+            key_id=3
+        )
+        contact_list = ContactList(connection)
+        list_id = contact_list.create(
+            "test_list",
+            key_id="id",
+            with_contacts_ids=list(range(1, 11))
+        )["data"]["id"]
+        emulator.requests = 0
+
+        response = contact_list.sync_members(
+            list_id,
+            range(6, 16),
+            page_size=3,
+            chunk_size=2
+        )
+        assert response["data"] == {
+            "inserted_contacts": 5,
+            "deleted_contacts": 5,
+            "errors": {},
+        }
+        assert sorted(emulator.lists[list_id]) == list(range(6, 16))
+        assert emulator.requests == 4 + 3 + 3
+
+        emulator.requests = 0
+        response = contact_list.sync_members(list_id, range(6, 16))
+        assert response["data"]["inserted_contacts"] == 0
+        assert emulator.requests == 1
+
+    def test_sync_members_failed_adds(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        Contact(connection).create_many(
+            [{3: str(i)} for i in range(1, 11)],
+            key_id=3
+        )
+        contact_list = ContactList(connection)
+        list_id = contact_list.create(
+            "test_list",
+            key_id="id",
+            with_contacts_ids=list(range(1, 6))
+        )["data"]["id"]
+        connection.transport = FailingTransport(
+            emulator,
+            failures=10,
+            path="/add/"
+        )
+
+        response = contact_list.sync_members(
+            list_id,
+            range(4, 11),
+            chunk_size=2
+        )
+        assert response["replyCode"] == CALL_FAILED_REPLY_CODE
+        assert response["replyText"] == "3 of 3 calls failed."
+        assert response["data"]["inserted_contacts"] == 0
+        assert response["data"]["deleted_contacts"] == 3
+        assert sorted(response["data"]["errors"]) == [
+            "10", "6", "7", "8", "9"
+        ]
+        assert sorted(emulator.lists[list_id]) == [4, 5]
+
+    def test_sync_members_async(self):
+        emulator = EmarsysEmulator()
+
+        async def sync_members():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator)
+            )
+            await Contact(connection).create_many(
+                [{3: str(i)} for i in range(1, 101)],
+                key_id=3
+            )
+            contact_list = ContactList(connection)
+            response = await contact_list.create(
+                "test_list",
+                key_id="id",
+                with_contacts_ids=list(range(1, 51))
+            )
+            return await contact_list.sync_members(
+                response["data"]["id"],
+                range(26, 101),
+                page_size=10,
+                chunk_size=10
+            )
+
+        loop = asyncio.get_event_loop()
+        response = loop.run_until_complete(sync_members())
+        assert response["data"]["inserted_contacts"] == 50
+        assert response["data"]["deleted_contacts"] == 25
+        assert sorted(emulator.lists[1]) == list(range(26, 101))
+
+    def test_iter_members(self):
+        emulator = EmarsysEmulator()
+        emulator.lists[1] = dict.fromkeys(range(1, 11))
+        emulator.contacts.update((i, {}) for i in range(1, 11))
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        contact_list = ContactList(connection)
+
+        members = contact_list.iter_members(1, page_size=4)
+        assert next(members) == "1"
+        assert list(members) == [str(i) for i in range(2, 11)]
+        assert emulator.requests == 3
+
+        members = contact_list.iter_members(1, page_size=5, prefetch=False)
+        assert len(list(members)) == 10
+
+    def test_iter_members_async(self):
+        emulator = EmarsysEmulator()
+        emulator.lists[1] = dict.fromkeys(range(1, 11))
+
+        async def iter_members():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            )
+            members = []
+            async for contact_id in ContactList(connection).iter_members(
+                    1,
+                    page_size=5
+            ):
+                members.append(contact_id)
+            return members
+
+        loop = asyncio.get_event_loop()
+        members = loop.run_until_complete(iter_members())
+        assert members == [str(i) for i in range(1, 11)]
+        assert emulator.requests == 3
@@ -1,6 +1,8 @@
 from pymarsys.contact import Contact
+from pymarsys.contact_list import ContactList
 from pymarsys.connections import SyncConnection
 from pymarsys.emarsys import Emarsys
+from pymarsys.export import Export
 
 EMARSYS_URI = 'https://api.emarsys.net/'
 TEST_USERNAME = 'test_username'
@@ -14,3 +16,5 @@ class TestEmarsys:
 
         isinstance(client.connection, SyncConnection)
         isinstance(client.contacts, Contact)
+        assert isinstance(client.contact_lists, ContactList)
+        assert isinstance(client.exports, Export)
@@ -0,0 +1,170 @@
+import asyncio
+import io
+
+import pytest
+import responses
+from urllib.parse import urljoin
+
+from pymarsys.connections import ApiCallError, AsyncConnection, SyncConnection
+from pymarsys.export import CSVRowDecoder, Export, ExportError
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
+
+EMARSYS_URI = 'https://api.emarsys.net/'
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+def make_emulator(export_polls=1):
+    emulator = EmarsysEmulator(export_polls=export_polls)
+    emulator.contacts[1] = {'1': 'Donald', '3': 'donald@squirrelmail.com'}
+    emulator.contacts[2] = {'1': 'Barack, "44"',
+                            '3': 'barack@squirrelmail.com'}
+    emulator.lists[1] = dict.fromkeys([1, 2])
+    return emulator
+
+
+def make_export(emulator):
+    connection = SyncConnection(
+        TEST_USERNAME,
+        TEST_SECRET,
+        transport=InMemoryTransport(emulator)
+    )
+    return Export(connection)
+
+
+EXPECTED_ROWS = [
+    {'First Name': 'Donald', 'E-Mail': 'donald@squirrelmail.com'},
+    {'First Name': 'Barack, "44"', 'E-Mail': 'barack@squirrelmail.com'},
+]
+
+
+class TestCSVRowDecoder:
+    def test_split_chunks(self):
+        data = 'a,b\n1,"x\ny"\n2,"é"\n'.encode('utf-8')
+        decoder = CSVRowDecoder()
+
+        rows = []
+        for start in range(len(data)):
+            rows.extend(decoder.feed(data[start:start + 1]))
+        rows.extend(decoder.close())
+
+        assert rows == [{'a': '1', 'b': 'x\ny'}, {'a': '2', 'b': 'é'}]
+
+    def test_no_header_no_final_newline(self):
+        decoder = CSVRowDecoder(delimiter=';', header=False)
+
+        assert decoder.feed(b'a;b\r\n1;') == [['a', 'b']]
+        assert decoder.close() == [['1', '']]
+
+
+class TestExport:
+    def test_init_no_exception(self):
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+        Export(connection)
+
+    @responses.activate
+    def test_filter(self):
+        responses.add(
+            responses.POST,
+            urljoin(EMARSYS_URI, 'api/v2/export/filter/'),
+            json={'replyCode': 0, 'replyText': 'OK', 'data': {'id': 2140}},
+            status=200,
+        )
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+
+        response = Export(connection).filter(123, [1, 2, 3])
+
+        assert response['data'] == {'id': 2140}
+        assert responses.calls[0].request.body == (
+            '{"filter": 123, "contact_fields": [1, 2, 3], '
+            '"distribution_method": "local"}'
+        )
+
+    def test_wait_download_and_iter_rows(self, tmpdir):
+        emulator = make_emulator(export_polls=3)
+        export = make_export(emulator)
+        first = export.filter(1, [1, 3])['data']['id']
+        second = export.responses('opened', [1, 3])['data']['id']
+
+        jobs = export.wait([first, second], poll_interval=0.001)
+
+        assert sorted(jobs) == [first, second]
+        assert jobs[first]['status'] == 'done'
+        assert emulator.requests == 2 + 3 * 2
+
+        path = str(tmpdir.join('export.csv'))
+        size = export.download(first, path, chunk_size=7)
+        with open(path, 'rb') as file:
+            assert file.read() == emulator.exports[first]['data']
+        assert size == len(emulator.exports[first]['data'])
+
+        assert list(export.iter_rows(second, chunk_size=5)) == EXPECTED_ROWS
+
+    def test_wait_timeout(self):
+        export = make_export(make_emulator(export_polls=100))
+        export_id = export.filter(1, [1])['data']['id']
+
+        with pytest.raises(ExportError):
+            export.wait([export_id], poll_interval=0.01, timeout=0.03)
+
+    @responses.activate
+    def test_wait_unknown_status(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/export/1/'),
+            json={
+                'replyCode': 0,
+                'replyText': 'OK',
+                'data': {'id': 1, 'status': 'cancelled'},
+            },
+            status=200,
+        )
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+
+        with pytest.raises(ExportError):
+            Export(connection).wait([1], poll_interval=0.01, timeout=10)
+        assert len(responses.calls) == 1
+
+    def test_download_error(self):
+        export = make_export(make_emulator(export_polls=2))
+        export_id = export.filter(1, [1])['data']['id']
+
+        with pytest.raises(ApiCallError):
+            export.download(export_id, io.BytesIO())
+
+    def test_deferred(self):
+        export = make_export(make_emulator()).defer()
+
+        assert export.status(1).endpoint == 'api/v2/export/1/'
+        with pytest.raises(TypeError):
+            export.iter_rows(1)
+
+    def test_async(self):
+        emulator = make_emulator(export_polls=2)
+
+        async def run():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator)
+            )
+            export = Export(connection)
+            response = await export.filter(1, [1, 3])
+            export_id = response['data']['id']
+            jobs = await export.wait([export_id], poll_interval=0.001)
+            file = io.BytesIO()
+            await export.download(export_id, file, chunk_size=10)
+            rows = []
+            async for row in export.iter_rows(export_id, chunk_size=3):
+                rows.append(row)
+            return jobs, file.getvalue(), rows
+
+        loop = asyncio.get_event_loop()
+        jobs, data, rows = loop.run_until_complete(run())
+        assert jobs == {1: {'id': 1, 'status': 'done'}}
+        assert data == emulator.exports[1]['data']
+        assert rows == EXPECTED_ROWS
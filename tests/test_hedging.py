@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from pymarsys.connections import ApiCallError, AsyncConnection
+from pymarsys.contact import Contact
+from pymarsys.hedging import HedgingPolicy
+from pymarsys.memory_transport import AsyncInMemoryTransport
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class SlowFirstTransport(AsyncInMemoryTransport):
+    """
+    Answers the first call after `slow` seconds, the others immediately.
+    """
+    def __init__(self, slow):
+        super().__init__()
+        self.emulator._write(1, {'3': 'squirrel@squirrelmail.com'})
+        self.slow = slow
+        self.sent = 0
+
+    async def send(self, method, url, headers, data, params):
+        self.sent += 1
+        if self.sent == 1:
+            await asyncio.sleep(self.slow)
+        return await super().send(method, url, headers, data, params)
+
+
+def make_policy(**options):
+    policy = HedgingPolicy(min_delay=0.001, min_samples=5, **options)
+    for _ in range(5):
+        policy.record('GET', 'api/v2/contact/', 0.001)
+        policy.record('POST', 'api/v2/contact/', 0.001)
+    return policy
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestHedgingPolicy:
+    def test_delay(self):
+        policy = HedgingPolicy(percentile=50, min_delay=0.01, max_delay=1,
+                               min_samples=4)
+        assert policy.delay('GET', 'api/v2/contactlist/1/contacts/') is None
+
+        for latency in (0.1, 0.2, 0.3, 5):
+            policy.record('GET', 'api/v2/contactlist/1/contacts/', latency)
+        assert policy.delay('GET', 'api/v2/contactlist/2/contacts/') == 0.3
+
+        policy.record('GET', 'api/v2/contactlist/1/contacts/', 5)
+        policy.record('GET', 'api/v2/contactlist/1/contacts/', 5)
+        assert policy.delay('GET', 'api/v2/contactlist/1/contacts/') == 1
+
+    def test_budget(self):
+        policy = HedgingPolicy(budget=0.25, burst=1)
+        for _ in range(3):
+            policy.start('GET', 'api/v2/field/')
+            assert not policy.acquire()
+        policy.start('GET', 'api/v2/field/')
+        assert policy.acquire()
+        assert (policy.calls, policy.hedges) == (4, 1)
+
+
+class TestHedgedCalls:
+    def test_hedge_wins(self):
+        transport = SlowFirstTransport(slow=5)
+        policy = make_policy(budget=1)
+
+        async def get_internal_id():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         transport=transport, hedging=policy)
+            contacts = Contact(connection)
+            return await asyncio.wait_for(
+                contacts.get_internal_id(3, 'squirrel@squirrelmail.com'),
+                timeout=1
+            )
+
+        response = run(get_internal_id())
+        assert response['data'] == {'id': '1'}
+        assert transport.sent == 2
+        assert policy.hedges == 1
+
+    def test_no_budget_no_hedge(self):
+        transport = SlowFirstTransport(slow=0.05)
+        policy = make_policy(budget=0)
+
+        async def get_data():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         transport=transport, hedging=policy)
+            return await Contact(connection).get_data(3, ['a'])
+
+        run(get_data())
+        assert transport.sent == 1
+        assert policy.hedges == 0
+
+    def test_writes_are_not_hedged_and_errors_propagate(self):
+        transport = SlowFirstTransport(slow=0.05)
+        policy = make_policy(budget=1)
+
+        async def calls():
+            connection = AsyncConnection(TEST_USERNAME, TEST_SECRET,
+                                         transport=transport, hedging=policy)
+            contacts = Contact(connection)
+            await contacts.create({3: 'squirrel2@squirrelmail.com'})
+            with pytest.raises(ApiCallError):
+                await contacts.get_internal_id(3, 'missing@squirrelmail.com')
+
+        run(calls())
+        assert transport.sent == 2
+        assert policy.hedges == 0
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from pymarsys.connections import (
+    ApiCallError,
+    AsyncConnection,
+    SyncConnection,
+)
+from pymarsys.contact_list import ContactList
+from pymarsys.emarsys import Emarsys
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+@pytest.fixture
+def emulator():
+    return EmarsysEmulator()
+
+
+@pytest.fixture
+def client(emulator):
+    connection = SyncConnection(
+        TEST_USERNAME,
+        TEST_SECRET,
+        transport=InMemoryTransport(emulator)
+    )
+    return Emarsys(connection)
+
+
+class TestEmarsysEmulator:
+    def test_create_and_get_internal_id(self, client, emulator):
+        response = client.contacts.create({3: 'squirrel@squirrelmail.com'})
+        assert response == {'data': {'id': 1}, 'replyCode': 0,
+                            'replyText': 'OK'}
+        assert emulator.contacts == {1: {'3': 'squirrel@squirrelmail.com'}}
+
+        response = client.contacts.get_internal_id(
+            3,
+            'squirrel@squirrelmail.com'
+        )
+        assert response['data'] == {'id': '1'}
+
+    def test_create_duplicate(self, client):
+        client.contacts.create({3: 'squirrel@squirrelmail.com'})
+
+        with pytest.raises(ApiCallError) as excinfo:
+            client.contacts.create({3: 'squirrel@squirrelmail.com'})
+        assert '2009' in str(excinfo.value)
+
+    def test_update_many_partial_errors(self, client):
+        client.contacts.create_many(
+            [{3: 'squirrel1@squirrelmail.com'}],
+            key_id=3
+        )
+
+        response = client.contacts.update_many(
+            3,
+            [
+                {3: 'squirrel1@squirrelmail.com', 1: 'Squirrel'},
+                {3: 'squirrel2@squirrelmail.com', 1: 'Squirrou'},
+            ]
+        )
+        assert response['data']['ids'] == ['1']
+        assert response['data']['errors'] == {
+            'squirrel2@squirrelmail.com': {
+                '2008': 'No contact found with the external id: 3'
+            }
+        }
+
+        response = client.contacts.update_many(
+            3,
+            [{3: 'squirrel2@squirrelmail.com', 1: 'Squirrou'}],
+            upsert=True
+        )
+        assert response['data']['ids'] == ['2']
+
+    def test_get_data_and_query(self, client):
+        client.contacts.create_many(
+            [
+                {3: 'squirrel1@squirrelmail.com', 1: 'Squirrel', 2: 'One'},
+                {3: 'squirrel2@squirrelmail.com', 1: 'Squirrel', 2: 'Two'},
+            ],
+            key_id=3
+        )
+
+        response = client.contacts.get_data(
+            3,
+            ['squirrel2@squirrelmail.com'],
+            [1, 2]
+        )
+        assert response['data']['result'] == [
+            {'1': 'Squirrel', '2': 'Two', 'id': '2', 'uid': 'u2'}
+        ]
+
+        response = client.contacts.query(2, (1, 'Squirrel'))
+        assert response['data']['result'] == [
+            {'2': 'One', 'id': '1'},
+            {'2': 'Two', 'id': '2'},
+        ]
+
+    def test_last_change(self, client):
+        client.contacts.create({3: 'squirrel@squirrelmail.com', 31: 1})
+        client.contacts.update({3: 'squirrel@squirrelmail.com', 31: 2}, 3)
+
+        response = client.contact_fields.last_change(
+            3,
+            'squirrel@squirrelmail.com',
+            31
+        )
+        assert response['data']['old_value'] == 1
+        assert response['data']['current_value'] == 2
+
+    def test_contact_lists(self, client, emulator):
+        client.contacts.create_many(
+            [{3: 'squirrel1@squirrelmail.com'},
+             {3: 'squirrel2@squirrelmail.com'}],
+            key_id=3
+        )
+        contact_list = ContactList(client.connection)
+
+        response = contact_list.create(
+            'squirrels',
+            with_contacts_ids=['squirrel1@squirrelmail.com']
+        )
+        list_id = response['data']['id']
+        response = contact_list.add_contacts(
+            list_id,
+            ['squirrel1@squirrelmail.com', 'squirrel2@squirrelmail.com']
+        )
+        assert response['data']['inserted_contacts'] == 1
+        assert list(emulator.lists[list_id]) == [1, 2]
+
+    def test_async(self, emulator):
+        async def create_and_fetch():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            )
+            client = Emarsys(connection)
+            await client.contacts.create({3: 'squirrel@squirrelmail.com'})
+            return await client.contacts.get_internal_id(
+                3,
+                'squirrel@squirrelmail.com'
+            )
+
+        loop = asyncio.get_event_loop()
+        response = loop.run_until_complete(create_and_fetch())
+        assert response['data'] == {'id': '1'}
+        assert emulator.requests == 2
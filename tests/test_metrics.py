@@ -0,0 +1,85 @@
+import pytest
+import responses
+from urllib.parse import urljoin
+
+from pymarsys.connections import ApiCallError, SyncConnection
+from pymarsys.hooks import CallInfo
+from pymarsys.metrics import MetricsCollector, normalize_endpoint
+
+EMARSYS_URI = 'https://api.emarsys.net/'
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+EMARSYS_ADD_TO_CONTACT_LIST_RESPONSE = {
+    'replyCode': 0,
+    'replyText': 'OK',
+    'data': {'inserted_contacts': 1},
+}
+
+
+def test_normalize_endpoint():
+    assert normalize_endpoint('api/v2/contactlist/123/add/') == \
+        'api/v2/contactlist/{id}/add/'
+    assert normalize_endpoint('api/v2/field/31/choice') == \
+        'api/v2/field/{id}/choice'
+    assert normalize_endpoint('api/v2/contact//getdata/') == \
+        'api/v2/contact/getdata/'
+
+
+class TestMetricsCollector:
+    def test_histogram(self):
+        metrics = MetricsCollector(buckets=(0.1, 1.0))
+        for elapsed in (0.05, 0.5, 5.0):
+            call = CallInfo('GET', 'api/v2/field/1/choice', 10)
+            call.elapsed = elapsed
+            call.status = 200
+            call.response_bytes = 100
+            metrics.on_request_end(call)
+
+        stats = metrics.snapshot()[('api/v2/field/{id}/choice', 'GET')]
+        assert stats['count'] == 3
+        assert stats['request_bytes'] == 30
+        assert stats['response_bytes'] == 300
+        assert stats['statuses'] == {200: 3}
+
+        exported = metrics.to_prometheus()
+        labels = 'endpoint="api/v2/field/{id}/choice",method="GET"'
+        assert 'pymarsys_request_duration_seconds_bucket{{{},le="0.1"}} 1' \
+            .format(labels) in exported
+        assert 'pymarsys_request_duration_seconds_bucket{{{},le="1.0"}} 2' \
+            .format(labels) in exported
+        assert 'pymarsys_request_duration_seconds_bucket{{{},le="+Inf"}} 3' \
+            .format(labels) in exported
+        assert 'pymarsys_request_bytes_total{{{}}} 30'.format(labels) \
+            in exported
+
+    @responses.activate
+    def test_with_connection(self):
+        responses.add(
+            responses.POST,
+            urljoin(EMARSYS_URI, 'api/v2/contactlist/1/add/'),
+            json=EMARSYS_ADD_TO_CONTACT_LIST_RESPONSE,
+            status=200,
+            content_type='application/json'
+        )
+        responses.add(
+            responses.POST,
+            urljoin(EMARSYS_URI, 'api/v2/contactlist/2/add/'),
+            status=500,
+        )
+        metrics = MetricsCollector()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            hooks=[metrics]
+        )
+
+        connection.make_call('POST', 'api/v2/contactlist/1/add/')
+        with pytest.raises(ApiCallError):
+            connection.make_call('POST', 'api/v2/contactlist/2/add/')
+
+        stats = metrics.snapshot()[('api/v2/contactlist/{id}/add/', 'POST')]
+        assert stats['count'] == 2
+        assert stats['errors'] == 1
+        assert stats['statuses'] == {200: 1, 500: 1}
+        assert 'status="500"} 1' in metrics.to_prometheus()
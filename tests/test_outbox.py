@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+from pymarsys.connections import ApiCallError, SyncConnection
+from pymarsys.memory_transport import EmarsysEmulator, InMemoryTransport
+from pymarsys.outbox import Outbox
+from pymarsys.transports import TransportResponse
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class FailingTransport(InMemoryTransport):
+    """
+    Answers the first `failures` calls with `status`, a 503 by default.
+    """
+    def __init__(self, emulator=None, failures=0, status=503):
+        super().__init__(emulator)
+        self.failures = failures
+        self.status = status
+
+    def send(self, method, url, headers, data, params):
+        if self.failures:
+            self.failures -= 1
+            return TransportResponse(self.status, b'{}', reason='Error')
+        return super().send(method, url, headers, data, params)
+
+
+def make_outbox(tmpdir, transport, **kwargs):
+    connection = SyncConnection(TEST_USERNAME, TEST_SECRET,
+                                transport=transport)
+    return Outbox(str(tmpdir.join('outbox.db')), connection, **kwargs)
+
+
+def contact_fields(emulator, email):
+    for fields in emulator.contacts.values():
+        if fields.get('3') == email:
+            return fields
+
+
+class TestOutbox:
+    def test_enqueue_and_flush(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com', 1: 'Squirrel'},
+                       upsert=True)
+        outbox.enqueue_many(
+            [{3: 'squirrel{}@squirrelmail.com'.format(index)}
+             for index in range(3)],
+            upsert=True
+        )
+
+        assert outbox.pending() == 4
+        assert outbox.flush() == 0
+        assert len(transport.emulator.contacts) == 4
+        assert transport.emulator.requests == 1
+        outbox.close()
+
+    def test_coalesce_updates(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com', 1: 'Squirrel',
+                        2: 'Nuts'}, upsert=True)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com', 1: 'Chipmunk'},
+                       upsert=True)
+
+        assert outbox.flush_once() == (2, 0)
+        fields = contact_fields(transport.emulator,
+                                'squirrel@squirrelmail.com')
+        assert (fields['1'], fields['2']) == ('Chipmunk', 'Nuts')
+        assert len(transport.emulator.contacts) == 1
+        outbox.close()
+
+    def test_batches_keep_order_of_options(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com'}, upsert=True)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com', 1: 'Squirrel'})
+
+        assert outbox.flush_once() == (1, 0)
+        assert outbox.flush_once() == (1, 0)
+        fields = contact_fields(transport.emulator,
+                                'squirrel@squirrelmail.com')
+        assert fields['1'] == 'Squirrel'
+        outbox.close()
+
+    def test_dead_letters(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        outbox.enqueue({3: 'unknown@squirrelmail.com', 1: 'Squirrel'})
+        outbox.enqueue({3: 'squirrel@squirrelmail.com', 999: 'malformed'},
+                       upsert=True)
+        outbox.enqueue({3: 'chipmunk@squirrelmail.com'}, upsert=True)
+
+        assert outbox.flush() == 0
+        dead_letters = outbox.dead_letters()
+        assert [letter['contact']['3'] for letter in dead_letters] == [
+            'unknown@squirrelmail.com',
+            'squirrel@squirrelmail.com',
+        ]
+        assert '2008' in dead_letters[0]['error']
+        assert dead_letters[1]['error']['status'] == 400
+        assert len(transport.emulator.contacts) == 1
+        outbox.close()
+
+    def test_key_id_type(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        outbox.enqueue({3: 'unknown@squirrelmail.com'})
+        outbox.enqueue({'id': 'unknown'}, key_id='id')
+
+        assert outbox.flush() == 0
+        assert [letter['key_id'] for letter in outbox.dead_letters()] == [
+            3,
+            'id',
+        ]
+        outbox.close()
+
+    def test_synchronous(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport)
+        assert outbox._db.execute('PRAGMA synchronous').fetchone()[0] == 2
+        outbox.close()
+
+        outbox = make_outbox(tmpdir, transport, synchronous='normal')
+        assert outbox._db.execute('PRAGMA synchronous').fetchone()[0] == 1
+        outbox.close()
+
+        with pytest.raises(ValueError):
+            make_outbox(tmpdir, transport, synchronous='FULL; DROP')
+
+    def test_retry_transient_errors(self, tmpdir):
+        transport = FailingTransport(failures=2)
+        outbox = make_outbox(tmpdir, transport, max_attempts=2)
+        outbox.enqueue({3: 'squirrel@squirrelmail.com'}, upsert=True)
+
+        assert outbox.flush_once() == (0, 1)
+        assert outbox.pending() == 1
+        assert outbox.flush_once() == (1, 0)
+        assert outbox.pending() == 0
+        assert outbox.dead_letters()[0]['attempts'] == 2
+        assert '503' in outbox.dead_letters()[0]['error']['call_error']
+        outbox.close()
+
+    def test_auth_errors_keep_updates_queued(self, tmpdir):
+        transport = FailingTransport(failures=3, status=401)
+        outbox = make_outbox(tmpdir, transport, max_attempts=1,
+                             retry_delay=0.01)
+        outbox.enqueue_many(
+            [{3: 'squirrel{}@squirrelmail.com'.format(index)}
+             for index in range(10)],
+            upsert=True
+        )
+
+        with pytest.raises(ApiCallError) as error:
+            outbox.flush_once()
+        assert error.value.status == 401
+        assert outbox.pending() == 10
+        assert transport.failures == 2
+
+        outbox.start()
+        deadline = time.monotonic() + 5
+        while outbox.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert outbox.pending() == 0
+        assert outbox.dead_letters() == []
+        assert outbox.last_error.status == 401
+        outbox.close()
+        assert len(transport.emulator.contacts) == 10
+
+    def test_survives_restart(self, tmpdir):
+        emulator = EmarsysEmulator()
+        outbox = make_outbox(tmpdir, FailingTransport(emulator, failures=1))
+        outbox.enqueue({3: 'squirrel@squirrelmail.com'}, upsert=True)
+        outbox.close()
+
+        outbox = make_outbox(tmpdir, InMemoryTransport(emulator))
+        assert outbox.pending() == 1
+        outbox.close()
+        assert len(emulator.contacts) == 1
+
+    def test_background_flusher(self, tmpdir):
+        transport = InMemoryTransport()
+        outbox = make_outbox(tmpdir, transport, flush_interval=10)
+        with outbox:
+            outbox.enqueue({3: 'squirrel@squirrelmail.com'}, upsert=True)
+            outbox.wake_up()
+            deadline = time.monotonic() + 5
+            while outbox.pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert outbox.pending() == 0
+
+        assert len(transport.emulator.contacts) == 1
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+
+from pymarsys.connections import ApiCallError, AsyncConnection, SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.memory_transport import (
+    AsyncInMemoryTransport,
+    EmarsysEmulator,
+    InMemoryTransport,
+)
+from pymarsys.request_spec import ExecutionPlan, RequestSpec
+
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+
+class TestRequestSpec:
+    def test_idempotent_default(self):
+        assert RequestSpec('GET', 'api/v2/field/').idempotent
+        assert not RequestSpec('POST', 'api/v2/contact/').idempotent
+        assert RequestSpec('POST', 'api/v2/contact/getdata/',
+                           idempotent=True).idempotent
+
+    def test_apply(self):
+        spec = RequestSpec('GET', 'api/v2/field/',
+                           transform=lambda result: result['data'])
+        assert spec.apply({'data': [1]}) == [1]
+
+
+class TestExecutionPlan:
+    def test_deduplicate_reads(self):
+        specs = [
+            RequestSpec('GET', 'api/v2/contact/', params={3: 'a'}),
+            RequestSpec('GET', 'api/v2/contact/', params={3: 'b'}),
+            RequestSpec('GET', 'api/v2/contact/', params={3: 'a'}),
+            RequestSpec('POST', 'api/v2/contact/', payload={3: 'a'}),
+            RequestSpec('POST', 'api/v2/contact/', payload={3: 'a'}),
+        ]
+        plan = ExecutionPlan(specs)
+
+        assert len(plan.specs) == 4
+        assert plan.positions == [0, 1, 0, 2, 3]
+        assert plan.results({0: 'a', 1: 'b', 2: 'c', 3: 'd'}) == \
+            ['a', 'b', 'a', 'c', 'd']
+
+    def test_ordered_lanes(self):
+        specs = [
+            RequestSpec('PUT', 'api/v2/contact/', payload={3: 'a'}),
+            RequestSpec('GET', 'api/v2/field/'),
+            RequestSpec('PUT', 'api/v2/contact/', payload={3: 'b'}),
+        ]
+
+        assert ExecutionPlan(specs).lanes == [[0], [1], [2]]
+        assert ExecutionPlan(specs, ordered=True).lanes == [[0, 2], [1]]
+
+
+class TestExecute:
+    def test_defer(self):
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+        contacts = Contact(connection)
+
+        spec = contacts.defer().get_data(3, ['squirrel@squirrelmail.com'])
+        assert isinstance(spec, RequestSpec)
+        assert spec.method == 'POST'
+        assert spec.endpoint == 'api/v2/contact//getdata/'
+        assert spec.idempotent
+        assert not contacts.deferred
+
+    def test_sync_execute(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        contacts = Contact(connection).defer()
+        emails = ['squirrel{}@squirrelmail.com'.format(i) for i in range(5)]
+
+        connection.execute(
+            [contacts.create({3: email}) for email in emails],
+            concurrency=3,
+            ordered=True
+        )
+        results = connection.execute(
+            [contacts.get_internal_id(3, email) for email in emails * 2],
+            concurrency=3,
+            aggregate=lambda results: [r['data']['id'] for r in results]
+        )
+        assert results == ['1', '2', '3', '4', '5'] * 2
+        assert emulator.requests == 10
+
+    def test_sync_execute_return_exceptions(self):
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport()
+        )
+        contacts = Contact(connection).defer()
+        specs = [
+            contacts.create({3: 'squirrel@squirrelmail.com'}),
+            contacts.create({3: 'squirrel@squirrelmail.com'}),
+        ]
+
+        results = connection.execute(specs, ordered=True,
+                                     return_exceptions=True)
+        assert results[0]['data'] == {'id': 1}
+        assert isinstance(results[1], ApiCallError)
+
+    def test_async_execute(self):
+        emulator = EmarsysEmulator()
+
+        async def execute():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            )
+            contacts = Contact(connection).defer()
+            await connection.execute(
+                [contacts.create({3: 'squirrel{}@squirrelmail.com'.format(i)})
+                 for i in range(20)],
+                concurrency=5
+            )
+            with pytest.raises(ApiCallError):
+                await connection.execute([
+                    contacts.create({3: 'squirrel0@squirrelmail.com'}),
+                ])
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(execute())
+        assert len(emulator.contacts) == 20
+
+    def test_sync_iter_execute(self):
+        emulator = EmarsysEmulator()
+        connection = SyncConnection(
+            TEST_USERNAME,
+            TEST_SECRET,
+            transport=InMemoryTransport(emulator)
+        )
+        contacts = Contact(connection).defer()
+        specs = [contacts.create({3: 'squirrel{}@squirrelmail.com'.format(i)})
+                 for i in range(6)]
+
+        results = connection.iter_execute(specs, concurrency=3)
+        assert sorted(result['data']['id'] for result in results) == \
+            list(range(1, 7))
+
+        with pytest.raises(ApiCallError):
+            list(connection.iter_execute(specs[:1]))
+
+    def test_async_iter_execute(self):
+        emulator = EmarsysEmulator()
+
+        async def iter_execute():
+            connection = AsyncConnection(
+                TEST_USERNAME,
+                TEST_SECRET,
+                transport=AsyncInMemoryTransport(emulator, latency=0.001)
+            )
+            contacts = Contact(connection).defer()
+            ids = []
+            async for result in connection.iter_execute(
+                    [contacts.create({3: 'squirrel{}@squirrelmail.com'
+                                         .format(i)})
+                     for i in range(6)],
+                    concurrency=2
+            ):
+                ids.append(result['data']['id'])
+            with pytest.raises(ApiCallError):
+                async for _ in connection.iter_execute(
+                        [contacts.create({3: 'squirrel0@squirrelmail.com'})]
+                ):
+                    pass
+            return ids
+
+        loop = asyncio.get_event_loop()
+        assert sorted(loop.run_until_complete(iter_execute())) == \
+            list(range(1, 7))
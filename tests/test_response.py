@@ -0,0 +1,44 @@
+import json
+
+from pymarsys.response import EmarsysResponse
+
+BODY = b'{"replyCode": 0, "replyText": "OK", "data": {"id": 1}}'
+
+
+class TestEmarsysResponse:
+    def test_reply_code_without_decoding(self):
+        response = EmarsysResponse(BODY)
+
+        assert response.reply_code == 0
+        assert response.reply_text == 'OK'
+        assert response._document is None
+
+    def test_decode_lazily(self):
+        response = EmarsysResponse(BODY)
+
+        assert response.data == {'id': 1}
+        assert response['replyCode'] == 0
+        assert response == json.loads(BODY.decode())
+        assert dict(response) == json.loads(BODY.decode())
+
+    def test_nested_reply_code_is_not_trusted(self):
+        response = EmarsysResponse(
+            b'{"data": {"replyCode": 1, "replyText": "Nested"}, '
+            b'"replyCode": 2008, "replyText": "No contact found: \\"a\\""}'
+        )
+
+        assert response.reply_code == 2008
+        assert response.reply_text == 'No contact found: "a"'
+
+    def test_escaped_reply_text(self):
+        response = EmarsysResponse(
+            b'{"replyCode": 1, "replyText": "Invalid \\"3\\" \\u00e9"}'
+        )
+
+        assert response.reply_text == 'Invalid "3" é'
+        assert response._document is None
+
+    def test_body_without_reply_code(self):
+        assert EmarsysResponse(b'').reply_code is None
+        assert EmarsysResponse(b'<html></html>').reply_text is None
+        assert EmarsysResponse(b'{"data": []}').reply_code is None
@@ -0,0 +1,95 @@
+import pytest
+import responses
+from urllib.parse import urljoin
+
+from pymarsys.connections import SyncConnection
+from pymarsys.contact import Contact
+from pymarsys.result_frame import ResultFrame
+
+EMARSYS_URI = 'https://api.emarsys.net/'
+CONTACT_ENDPOINT = 'api/v2/contact/'
+TEST_USERNAME = 'test_username'
+TEST_SECRET = 'test_secret'
+
+EMARSYS_CONTACTS_GET_DATA_RESPONSE = {
+    'data': {
+        'errors': [],
+        'result': [
+            {
+                '1': 'Squirrel1',
+                '2': 'Squirrou1',
+                'id': '748473102',
+                'uid': 'hVXGDiKg6d'
+            },
+            {
+                '1': 'Squirrel2',
+                'id': '752469438',
+                'uid': 'g8XS7T1weS'
+            }
+        ]
+    },
+    'replyCode': 0,
+    'replyText': 'OK'
+}
+
+
+class TestResultFrame:
+    def test_from_response(self):
+        frame = ResultFrame.from_response(EMARSYS_CONTACTS_GET_DATA_RESPONSE)
+
+        assert len(frame) == 2
+        assert list(frame.ids) == [748473102, 752469438]
+        assert frame[1] == ['Squirrel1', 'Squirrel2']
+        assert frame['2'] == ['Squirrou1', None]
+        assert frame['uid'] == ['hVXGDiKg6d', 'g8XS7T1weS']
+
+    def test_empty_result(self):
+        frame = ResultFrame.from_response(
+            {'data': {'errors': [{'key': 'x'}], 'result': False}}
+        )
+
+        assert len(frame) == 0
+        assert frame.errors == [{'key': 'x'}]
+
+    def test_extend(self):
+        frame = ResultFrame.from_response(EMARSYS_CONTACTS_GET_DATA_RESPONSE)
+        other = ResultFrame()
+        other.extend_rows([{'3': 'squirrel@squirrelmail.com', 'id': '1'}])
+
+        frame.extend(other)
+        assert list(frame.ids) == [748473102, 752469438, 1]
+        assert frame[3] == [None, None, 'squirrel@squirrelmail.com']
+        assert frame[1] == ['Squirrel1', 'Squirrel2', None]
+
+    def test_to_pandas(self):
+        pytest.importorskip('pandas')
+        frame = ResultFrame.from_response(EMARSYS_CONTACTS_GET_DATA_RESPONSE)
+
+        data_frame = frame.to_pandas()
+        assert list(data_frame['id']) == [748473102, 752469438]
+        assert list(data_frame['1']) == ['Squirrel1', 'Squirrel2']
+
+    def test_to_arrow(self):
+        pytest.importorskip('pyarrow')
+        frame = ResultFrame.from_response(EMARSYS_CONTACTS_GET_DATA_RESPONSE)
+
+        table = frame.to_arrow()
+        assert table.column('id').to_pylist() == [748473102, 752469438]
+        assert table.column('2').to_pylist() == ['Squirrou1', None]
+
+    @responses.activate
+    def test_get_data_columnar(self):
+        responses.add(
+            responses.POST,
+            urljoin(EMARSYS_URI, '{}/{}/'.format(CONTACT_ENDPOINT, 'getdata')),
+            json=EMARSYS_CONTACTS_GET_DATA_RESPONSE,
+            status=200,
+            content_type='application/json'
+        )
+        connection = SyncConnection(TEST_USERNAME, TEST_SECRET)
+        contacts = Contact(connection)
+
+        frame = contacts.get_data('id', [748473102, 752469438], [1, 2],
+                                  columnar=True)
+        assert isinstance(frame, ResultFrame)
+        assert list(frame.ids) == [748473102, 752469438]
@@ -0,0 +1,229 @@
+import asyncio
+import subprocess
+import sys
+from urllib.parse import urljoin
+
+from aioresponses import aioresponses
+import pytest
+import responses
+
+from pymarsys.transports import (
+    AiohttpTransport,
+    AsyncHttpxTransport,
+    HttpxTransport,
+    RequestsTransport,
+)
+
+EMARSYS_URI = 'https://api.emarsys.net/'
+
+
+class TestRequestsTransport:
+    @responses.activate
+    def test_send(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            body='{"replyCode": 0}',
+            status=200,
+            content_type='application/json'
+        )
+        transport = RequestsTransport()
+
+        response = transport.send(
+            'GET',
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            {},
+            '{}',
+            {}
+        )
+        assert response.status == 200
+        assert response.body == b'{"replyCode": 0}'
+        transport.close()
+
+    @responses.activate
+    def test_stream(self):
+        responses.add(
+            responses.GET,
+            urljoin(EMARSYS_URI, 'api/v2/export/1/data/'),
+            body='a,b\n1,2\n',
+            status=200,
+            content_type='text/csv'
+        )
+        transport = RequestsTransport()
+
+        response = transport.stream(
+            'GET',
+            urljoin(EMARSYS_URI, 'api/v2/export/1/data/'),
+            {},
+            '{}',
+            {},
+            chunk_size=4
+        )
+        assert response.status == 200
+        assert list(response.chunks) == [b'a,b\n', b'1,2\n']
+        response.close()
+        transport.close()
+
+    @responses.activate
+    def test_warmup(self):
+        responses.add(responses.HEAD, EMARSYS_URI, status=401)
+        transport = RequestsTransport()
+
+        assert transport.warmup(EMARSYS_URI, 12) == 12
+        assert len(responses.calls) == 12
+        assert transport.session.get_adapter(EMARSYS_URI)._pool_maxsize == 12
+        transport.close()
+
+    @responses.activate
+    def test_warmup_keeps_adapter_settings(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        responses.add(responses.HEAD, EMARSYS_URI, status=401)
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=3, pool_maxsize=2)
+        session.mount('https://', adapter)
+        transport = RequestsTransport(session)
+
+        assert transport.warmup(EMARSYS_URI, 6) == 6
+        assert session.get_adapter(EMARSYS_URI) is adapter
+        assert adapter.max_retries.total == 3
+        assert adapter._pool_maxsize == 6
+        assert transport.warmup(EMARSYS_URI, 0) == 0
+        transport.close()
+
+
+class TestAiohttpTransport:
+    def test_session_is_lazy(self):
+        transport = AiohttpTransport()
+
+        assert transport._session is None
+
+    def test_send(self):
+        async def send():
+            transport = AiohttpTransport()
+            response = await transport.send(
+                'GET',
+                urljoin(EMARSYS_URI, 'api/v2/settings'),
+                {},
+                '{}',
+                {}
+            )
+            await transport.close()
+            return response
+
+        with aioresponses() as m:
+            m.get(
+                urljoin(EMARSYS_URI, 'api/v2/settings'),
+                status=200,
+                body='{"replyCode": 0}'
+            )
+            loop = asyncio.get_event_loop()
+            response = loop.run_until_complete(send())
+        assert response.status == 200
+        assert response.body == b'{"replyCode": 0}'
+
+    def test_stream(self):
+        async def stream():
+            transport = AiohttpTransport()
+            response = await transport.stream(
+                'GET',
+                urljoin(EMARSYS_URI, 'api/v2/export/1/data/'),
+                {},
+                '{}',
+                {},
+                chunk_size=4
+            )
+            chunks = []
+            async for chunk in response.chunks:
+                chunks.append(chunk)
+            await response.aclose()
+            await transport.close()
+            return response.status, chunks
+
+        with aioresponses() as m:
+            m.get(
+                urljoin(EMARSYS_URI, 'api/v2/export/1/data/'),
+                status=200,
+                body='a,b\n1,2\n'
+            )
+            loop = asyncio.get_event_loop()
+            status, chunks = loop.run_until_complete(stream())
+        assert status == 200
+        assert b''.join(chunks) == b'a,b\n1,2\n'
+
+    def test_warmup(self):
+        async def warmup():
+            transport = AiohttpTransport()
+            warmed = await transport.warmup(EMARSYS_URI, 4)
+            await transport.close()
+            return warmed
+
+        with aioresponses() as m:
+            m.head(EMARSYS_URI, status=401, repeat=True)
+            loop = asyncio.get_event_loop()
+            assert loop.run_until_complete(warmup()) == 4
+
+
+class TestHttpxTransport:
+    def test_send(self):
+        httpx = pytest.importorskip('httpx')
+
+        def handler(request):
+            assert request.url.params['limit'] == '2'
+            assert request.content == b'{}'
+            return httpx.Response(200, content=b'{"replyCode": 0}')
+
+        transport = HttpxTransport(
+            client=httpx.Client(transport=httpx.MockTransport(handler))
+        )
+        response = transport.send(
+            'GET',
+            urljoin(EMARSYS_URI, 'api/v2/settings'),
+            {},
+            '{}',
+            {'limit': 2}
+        )
+        assert response.status == 200
+        assert response.body == b'{"replyCode": 0}'
+        transport.close()
+
+    def test_async_send(self):
+        httpx = pytest.importorskip('httpx')
+
+        def handler(request):
+            return httpx.Response(200, content=b'{"replyCode": 0}')
+
+        async def send():
+            transport = AsyncHttpxTransport(
+                client=httpx.AsyncClient(
+                    transport=httpx.MockTransport(handler)
+                )
+            )
+            response = await transport.send(
+                'GET',
+                urljoin(EMARSYS_URI, 'api/v2/settings'),
+                {},
+                '{}',
+                {}
+            )
+            await transport.close()
+            return response
+
+        loop = asyncio.get_event_loop()
+        response = loop.run_until_complete(send())
+        assert response.status == 200
+
+
+def test_http_libraries_are_imported_lazily():
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            '-c',
+            'import sys, pymarsys; '
+            'print(sorted({"aiohttp", "requests", "httpx"} '
+            '& set(sys.modules)))'
+        ],
+        universal_newlines=True
+    )
+    assert output.strip() == '[]'
@@ -0,0 +1,36 @@
+import pytest
+
+from pymarsys.utils import TTLCache, chunked
+
+
+def test_chunked():
+    assert list(chunked([1, 2, 3], 2)) == [[1, 2], [3]]
+    assert list(chunked(iter([1, 2, 3]), 2)) == [[1, 2], [3]]
+    with pytest.raises(ValueError):
+        list(chunked([1], 0))
+
+
+class TestTTLCache:
+    def test_expiry(self):
+        now = [0]
+        cache = TTLCache(10, clock=lambda: now[0])
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        now[0] = 10
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_maxsize(self):
+        cache = TTLCache(10, maxsize=2)
+        for key in 'abc':
+            cache.set(key, key)
+
+        assert cache.get('a') is None
+        assert cache.get('c') == 'c'
+
+    def test_disabled(self):
+        cache = TTLCache(0)
+        cache.set('a', 1)
+
+        assert cache.get('a') is None
@@ -0,0 +1,72 @@
+from pymarsys.contact_batch import SKIP, ContactBatch
+from pymarsys.validation import FieldSchema
+
+FIELDS = [
+    {'id': 1, 'name': 'First Name', 'application_type': 'shorttext'},
+    {'id': 3, 'name': 'E-Mail', 'application_type': 'longtext'},
+    {'id': 4, 'name': 'Date of Birth', 'application_type': 'date'},
+    {'id': 31, 'name': 'Opt-In', 'application_type': 'singlechoice'},
+    {'id': 40, 'name': 'Interests', 'application_type': 'multichoice'},
+    {'id': 50, 'name': 'Score', 'application_type': 'numeric'},
+    {'id': 60, 'name': 'Notes', 'application_type': 'largetext'},
+]
+CHOICES = {31: ['1', '2'], 40: [1, 2, 3]}
+
+
+class TestFieldSchema:
+    def setup_method(self):
+        self.schema = FieldSchema(FIELDS, CHOICES)
+
+    def test_check_column(self):
+        schema = self.schema
+
+        assert schema.check_column(1, ['a' * 60, 'a' * 61, None, SKIP]) == {
+            1: 'Longer than 60 characters.'
+        }
+        assert list(schema.check_column(3, ['a' * 255, 'a' * 256])) == [1]
+        assert list(schema.check_column(4, [
+            '2017-01-31', '2017-02-30', '31/01/2017', 20170131
+        ])) == [1, 2, 3]
+        assert list(schema.check_column(31, [1, '2', 3])) == [2]
+        assert list(schema.check_column(40, [[1, 3], ['4'], 2])) == [1]
+        assert list(schema.check_column(50, [
+            12, '-1.5', '1' * 24, '1' * 25, 'abc', True
+        ])) == [3, 4, 5]
+        assert schema.check_column(60, ['a' * 10000]) == {}
+        assert schema.check_column('uid', ['abc']) == {}
+        assert schema.check_column(999, ['a']) == {0: 'Unknown field.'}
+
+    def test_validate_dicts(self):
+        contacts = [
+            {3: 'squirrel@squirrelmail.com', 4: '2017-01-31'},
+            {3: 'chipmunk@squirrelmail.com', 4: '31/01/2017', 31: 3},
+            {3: 'marmot@squirrelmail.com', 1: 'Marmot'},
+        ]
+
+        valid, errors = self.schema.validate(contacts)
+        assert valid == [contacts[0], contacts[2]]
+        assert errors == {1: {
+            '4': 'Not a date, expected YYYY-MM-DD.',
+            '31': "Unknown choice 3.",
+        }}
+
+    def test_validate_batch(self):
+        batch = ContactBatch.from_rows([3, 1], [
+            ['squirrel@squirrelmail.com', 'Squirrel'],
+            ['chipmunk@squirrelmail.com', 'C' * 61],
+            ['marmot@squirrelmail.com', SKIP],
+        ])
+
+        valid, errors = self.schema.validate(batch)
+        assert isinstance(valid, ContactBatch)
+        assert valid.column(3) == ['squirrel@squirrelmail.com',
+                                   'marmot@squirrelmail.com']
+        assert valid.column(1) == ['Squirrel', SKIP]
+        assert list(errors) == [1]
+
+    def test_validate_valid_contacts(self):
+        contacts = [{3: 'squirrel@squirrelmail.com'}]
+
+        valid, errors = self.schema.validate(contacts)
+        assert valid is contacts
+        assert errors == {}